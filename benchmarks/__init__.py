@@ -0,0 +1 @@
+"""Benchmarks for rcpack (run from the repository root after `pip install -e .`)."""
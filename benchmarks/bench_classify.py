@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Benchmark: per-file classification + decoding overhead.
+
+Compares the previous two-open pipeline (is_binary_file with a Python-level
+byte loop, then read_text_safely trying codecs in turn) with the single-open
+io_utils.read_classified. Run from the repository root (after `pip install -e .`):
+
+    python benchmarks/bench_classify.py --files 2000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from rcpack.io_utils import read_classified
+
+
+def legacy_is_binary_file(path: Path, sniff_bytes: int = 2048) -> bool:
+    try:
+        with open(path, 'rb') as fb:
+            chunk = fb.read(sniff_bytes)
+        if b"\x00" in chunk:
+            return True
+        text_byte_count = sum(32 <= b <= 126 or b in (9, 10, 13) for b in chunk)
+        return (len(chunk) - text_byte_count) > max(1, len(chunk) // 3)
+    except Exception:
+        return True
+
+
+def legacy_read_text_safely(path: Path, max_bytes: int = 16_384):
+    truncated = False
+    with open(path, 'rb') as fb:
+        raw = fb.read(max_bytes + 1)
+    if len(raw) > max_bytes:
+        truncated = True
+        raw = raw[:max_bytes]
+    for enc in ("utf-8", "utf-16", "utf-16-le", "utf-16-be", "latin-1"):
+        try:
+            return raw.decode(enc), enc, truncated
+        except Exception:
+            continue
+    return raw.decode("utf-8", errors="replace"), "utf-8", truncated
+
+
+def legacy(path: Path, max_bytes: int):
+    if legacy_is_binary_file(path):
+        return None
+    return legacy_read_text_safely(path, max_bytes)[0]
+
+
+def current(path: Path, max_bytes: int):
+    return read_classified(path, max_bytes)[0]
+
+
+def make_files(root: Path, count: int, binary_ratio: float, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    words = ["def", "return", "self", "value", "import", "class", "for", "in", "if", "else"]
+    paths = []
+    for i in range(count):
+        path = root / f"f{i:06d}"
+        if rng.random() < binary_ratio:
+            path.write_bytes(os.urandom(rng.randint(512, 65536)))
+        else:
+            n_words = rng.randint(50, 8000)
+            text = " ".join(rng.choice(words) for _ in range(n_words))
+            if rng.random() < 0.1:
+                text += " café naïve"  # some non-ASCII UTF-8
+            path.write_text(text, encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--binary-ratio", type=float, default=0.2)
+    parser.add_argument("--max-bytes", type=int, default=16_384)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rcpack-bench-") as tmp:
+        paths = make_files(Path(tmp), args.files, args.binary_ratio)
+        results = {}
+        for name, fn in (("legacy", legacy), ("single-open", current)):
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                out = [fn(p, args.max_bytes) for p in paths]
+                best = min(best, time.perf_counter() - start)
+            results[name] = best
+            binaries = sum(o is None for o in out)
+            print(f"{name:>11}: {best * 1e6 / len(paths):8.1f} us/file  "
+                  f"({binaries} binary of {len(paths)})")
+        print(f"    speedup: {results['legacy'] / results['single-open']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Benchmark: CLI startup cost from `python -X importtime`.
+
+Runs `repo-contextor --help` and a plain text run over a small synthetic
+repository in fresh processes, and reports the total import time, the slowest
+modules and which optional modules were loaded. Timings are noisy, so the
+regression check compares against a saved baseline with a tolerance, and also
+fails if a scenario imports a module it should never need (PyYAML for text
+output, for example). Run from the repository root (after `pip install -e .`):
+
+    python -m benchmarks.bench_import --json imports.json
+    python -m benchmarks.bench_import --baseline imports.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synth import generate_repo
+
+# modules each scenario must not import; loading one of them is a regression
+FORBIDDEN = {
+    "help": ["yaml", "datetime", "subprocess", "sqlite3", "concurrent.futures",
+             "tomllib", "ctypes", "rcpack.renderer.markdown", "rcpack.renderer.jsonyaml"],
+    "run": ["yaml", "ctypes", "concurrent.futures", "rcpack.renderer.jsonyaml"],
+}
+
+_CLI = "import sys; from rcpack.cli import main; sys.argv[0] = 'repo-contextor'; main()"
+
+
+def _scenarios(repo: Path, out: Path):
+    return {
+        "help": ["--help"],
+        "run": [str(repo), "-o", str(out)],
+    }
+
+
+def parse_importtime(stderr: str):
+    """Return [(module, self_us, cumulative_us)] from -X importtime output."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def measure(args, env, repeat: int) -> dict:
+    """Best-of-`repeat` import and wall time for one CLI invocation."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _CLI, *args],
+            capture_output=True, text=True, env=env,
+        )
+        wall = time.perf_counter() - start
+        if proc.returncode != 0:
+            raise RuntimeError(f"repo-contextor {' '.join(args)} failed:\n{proc.stderr[-2000:]}")
+        modules = parse_importtime(proc.stderr)
+        total_us = sum(self_us for _, self_us, _ in modules)
+        if best is None or total_us < best["import_us"]:
+            best = {
+                "import_us": total_us,
+                "wall_s": round(wall, 4),
+                "modules": [name for name, _, _ in modules],
+                "slowest": [
+                    {"module": name, "self_us": s, "cumulative_us": c}
+                    for name, s, c in sorted(modules, key=lambda m: -m[1])[:10]
+                ],
+            }
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure repo-contextor import time")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scenario; the best is kept")
+    parser.add_argument("--files", type=int, default=50, help="Files in the synthetic repository")
+    parser.add_argument("--json", metavar="FILE", help="Write results to FILE (default: stdout)")
+    parser.add_argument("--baseline", metavar="FILE", help="Fail if slower than this earlier result")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown over the baseline, as a fraction (default: 0.25)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rcpack-import-") as tmp:
+        repo = Path(tmp) / "repo"
+        generate_repo(repo, files=args.files, depth=2, decoy_ratio=0)
+        # keep the run's content cache out of the user's home directory
+        env = dict(os.environ, XDG_CACHE_HOME=str(Path(tmp) / "cache"))
+        results = {
+            name: measure(cli_args, env, args.repeat)
+            for name, cli_args in _scenarios(repo, Path(tmp) / "out.md").items()
+        }
+
+    failures = []
+    for name, result in results.items():
+        loaded = set(result.pop("modules"))
+        result["forbidden_imported"] = sorted(m for m in FORBIDDEN[name] if m in loaded)
+        for module in result["forbidden_imported"]:
+            failures.append(f"{name}: imports {module}")
+        print(f"{name:<6} imports {result['import_us'] / 1000:7.1f} ms  "
+              f"wall {result['wall_s'] * 1000:7.1f} ms", file=sys.stderr)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())["results"]
+        for name, result in results.items():
+            if name in baseline:
+                limit = baseline[name]["import_us"] * (1 + args.tolerance)
+                if result["import_us"] > limit:
+                    failures.append(
+                        f"{name}: {result['import_us']} us of imports, baseline "
+                        f"{baseline[name]['import_us']} us (+{args.tolerance:.0%} allowed)"
+                    )
+
+    text = json.dumps({"python": sys.version.split()[0], "results": results}, indent=2)
+    if args.json:
+        Path(args.json).write_text(text + "\n")
+    else:
+        print(text)
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Microbenchmark: per-pattern fnmatch loop vs. the compiled PathFilter.
+
+Run from the repository root (after `pip install -e .`):
+
+    python benchmarks/bench_patterns.py --files 200000 --patterns 30
+"""
+
+import argparse
+import fnmatch
+import random
+import time
+
+from rcpack.patterns import PathFilter
+
+
+def make_paths(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    dirs = ["src", "lib", "tests", "docs", "vendor", "pkg", "internal", "web"]
+    exts = [".py", ".js", ".ts", ".md", ".json", ".go", ".rs", ".txt", ".min.js", ".lock"]
+    paths = []
+    for i in range(count):
+        depth = rng.randint(1, 6)
+        parts = [rng.choice(dirs) + str(rng.randint(0, 20)) for _ in range(depth)]
+        paths.append("/".join(parts) + f"/file{i}" + rng.choice(exts))
+    return paths
+
+
+def make_patterns(count: int) -> tuple:
+    base = ["*.min.js", "*.lock", "vendor*/*", "docs*/*.md", "*/tests1*/*", "*generated*",
+            "*.snap", "*/fixtures/*", "web1*/*.json", "*.pb.go"]
+    # pad with distinct, rarely matching patterns so every one has to be tried
+    excludes = (base + [f"*/gen{i}/*.out" for i in range(count)])[:count]
+    includes = ["*.py", "*.js", "*.ts", "*.go", "*.rs", "*.md", "*.json"]
+    return includes, excludes
+
+
+def bench_fnmatch(paths, includes, excludes) -> int:
+    def matches_any(patterns, rel):
+        return any(fnmatch.fnmatch(rel, pat) for pat in patterns)
+
+    taken = 0
+    for rel in paths:
+        if excludes and matches_any(excludes, rel):
+            continue
+        if matches_any(includes, rel):
+            taken += 1
+    return taken
+
+
+def bench_compiled(paths, includes, excludes) -> int:
+    path_filter = PathFilter(includes, excludes)
+    taken = 0
+    for rel in paths:
+        if path_filter.excluded(rel):
+            continue
+        if path_filter.included(rel):
+            taken += 1
+    return taken
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200_000)
+    parser.add_argument("--patterns", type=int, default=30, help="number of exclude patterns")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = make_paths(args.files)
+    includes, excludes = make_patterns(args.patterns)
+
+    results = {}
+    for name, fn in (("fnmatch", bench_fnmatch), ("compiled", bench_compiled)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            taken = fn(paths, includes, excludes)
+            best = min(best, time.perf_counter() - start)
+        results[name] = (best, taken)
+        print(f"{name:>9}: {best * 1000:8.1f} ms  ({taken} of {len(paths)} paths taken)")
+
+    if results["fnmatch"][1] != results["compiled"][1]:
+        raise SystemExit("mismatch: matchers selected different paths")
+    print(f"  speedup: {results['fnmatch'][0] / results['compiled'][0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Per-stage benchmarks over synthetic repositories.
+
+Each stage runs in a fresh Python process so its peak RSS is its own. Results
+are written as JSON (one object per run) so they can be diffed between commits:
+
+    python -m benchmarks.run --files 1000,10000 --json results.json
+    python -m benchmarks.run --files 100000 --stages discovery,tree --repeat 3
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synth import generate_repo
+
+STAGES = [
+    "discovery", "classify", "read", "tree",
+    "render_markdown", "render_json", "render_yaml", "cli",
+]
+
+
+def _discover(root: Path):
+    from rcpack.discover import discover_files
+    return discover_files([root], root, [], [])
+
+
+def _sections(root: Path, files):
+    from rcpack.packager import _read_section
+    sections = []
+    for f in files:
+        section, _, error = _read_section(f, f.relative_to(root).as_posix(), 16_384)
+        if error is None:
+            sections.append(section)
+    return sections
+
+
+def _render(fmt: str, root: Path, files):
+    from rcpack.renderer.jsonyaml import render_json, render_yaml
+    from rcpack.renderer.markdown import render_markdown
+    from rcpack.treeview import render_tree
+
+    sections = _sections(root, files)
+    tree = render_tree([s["path"] for s in sections])
+    lines = sum(s["content"].count("\n") for s in sections)
+    render = {"markdown": render_markdown, "json": render_json, "yaml": render_yaml}[fmt]
+    return lambda: render(str(root), {"is_repo": False}, tree, sections, len(sections), lines)
+
+
+def _prepare(stage: str, root: Path):
+    """Return a zero-argument callable that runs `stage`; setup is not timed."""
+    if stage == "discovery":
+        return lambda: _discover(root)
+    if stage == "cli":
+        from rcpack.cli import main as cli_main
+        out = root.parent / f"{root.name}-cli-output.md"
+
+        def run_cli():
+            argv = sys.argv
+            sys.argv = ["repo-contextor", str(root), "-o", str(out), "--no-cache"]
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    cli_main()
+            finally:
+                sys.argv = argv
+        return run_cli
+
+    files = _discover(root)
+    if stage == "classify":
+        from rcpack.io_utils import is_binary_file
+        return lambda: [is_binary_file(f) for f in files]
+    if stage == "read":
+        from rcpack.io_utils import is_binary_file, read_text_safely
+        text_files = [f for f in files if not is_binary_file(f)]
+        return lambda: [read_text_safely(f) for f in text_files]
+    if stage == "tree":
+        from rcpack.treeview import render_tree
+        rel = [f.relative_to(root).as_posix() for f in files]
+        return lambda: render_tree(rel)
+    if stage.startswith("render_"):
+        return _render(stage[len("render_"):], root, files)
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def run_stage(stage: str, root: Path, repeat: int) -> dict:
+    """Run one stage in this process and measure it (used by the child process)."""
+    fn = _prepare(stage, root)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_kb = rss // 1024 if sys.platform == "darwin" else rss
+    return {"stage": stage, "wall_s": round(best, 6), "peak_rss_kb": rss_kb}
+
+
+def _run_in_child(stage: str, root: Path, repeat: int) -> dict:
+    cmd = [sys.executable, "-m", "benchmarks.run", "--child", stage, "--root", str(root),
+           "--repeat", str(repeat)]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"stage": stage, "error": proc.stderr.strip().splitlines()[-1:]}
+    return json.loads(proc.stdout)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run rcpack per-stage benchmarks")
+    parser.add_argument("--files", default="1000",
+                        help="Comma-separated repository sizes, e.g. 1000,10000,100000")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help=f"Comma-separated stages (default: all of {','.join(STAGES)})")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--mean-bytes", type=int, default=4096)
+    parser.add_argument("--binary-ratio", type=float, default=0.05)
+    parser.add_argument("--decoy-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per stage; the best is kept")
+    parser.add_argument("--keep", metavar="DIR",
+                        help="Generate repositories under DIR and keep them (reused if present)")
+    parser.add_argument("--json", metavar="FILE", help="Write results to FILE (default: stdout)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--root", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_stage(args.child, Path(args.root), args.repeat)))
+        return
+
+    stages = args.stages.split(",")
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    base = Path(args.keep) if args.keep else Path(tempfile.mkdtemp(prefix="rcpack-bench-"))
+    runs = []
+    try:
+        for count in (int(n) for n in args.files.split(",")):
+            root = base / f"repo-{count}-d{args.depth}-s{args.seed}"
+            params = dict(
+                files=count, depth=args.depth, mean_bytes=args.mean_bytes,
+                binary_ratio=args.binary_ratio, decoy_ratio=args.decoy_ratio, seed=args.seed,
+            )
+            marker = base / f"{root.name}.json"
+            if marker.exists():
+                repo = json.loads(marker.read_text())
+            else:
+                repo = generate_repo(root, **params)
+                marker.write_text(json.dumps(repo))
+            for stage in stages:
+                result = _run_in_child(stage, root, args.repeat)
+                if "wall_s" in result:
+                    result["files_per_s"] = round(count / result["wall_s"], 1) if result["wall_s"] else None
+                result["repo"] = repo
+                runs.append(result)
+                print(f"{count:>7} files  {stage:<16} {result.get('wall_s', 'error')}",
+                      file=sys.stderr)
+    finally:
+        if not args.keep:
+            shutil.rmtree(base, ignore_errors=True)
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.json:
+        Path(args.json).write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Deterministic synthetic repository generator for the benchmarks.
+
+The same parameters and seed always produce the same tree, byte for byte:
+
+    python -m benchmarks.synth /tmp/synth --files 10000 --depth 5 --binary-ratio 0.05
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+
+_WORDS = (
+    "def class return import self value result config path file data index "
+    "render tree token cache stream write read parse build package repo"
+).split()
+_TEXT_EXTS = [".py", ".js", ".ts", ".md", ".json", ".go", ".rs", ".txt", ".yaml", ".toml"]
+_BINARY_EXTS = [".png", ".jpg", ".bin", ".so", ".zip"]
+
+
+def _corpus(rng: random.Random, size: int = 1 << 20) -> str:
+    """A block of code-like text that file bodies are sliced from."""
+    lines = []
+    total = 0
+    while total < size:
+        indent = "    " * rng.randint(0, 3)
+        line = indent + " ".join(rng.choice(_WORDS) for _ in range(rng.randint(2, 12)))
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+
+def _size(rng: random.Random, mean_bytes: int, max_bytes: int) -> int:
+    # log-normal: mostly small files with a long tail of large ones
+    return int(min(max_bytes, rng.lognormvariate(0, 1.0) * mean_bytes / 1.65))
+
+
+def generate_repo(
+    root: Path,
+    files: int = 1000,
+    depth: int = 4,
+    fanout: int = 6,
+    mean_bytes: int = 4096,
+    max_bytes: int = 1 << 20,
+    binary_ratio: float = 0.05,
+    decoy_ratio: float = 0.2,
+    seed: int = 0,
+) -> dict:
+    """Create a synthetic repository under `root` and return its parameters and totals.
+
+    `files` source files are spread over a directory tree up to `depth` levels
+    deep with `fanout` subdirectories per level; `binary_ratio` of them are
+    binary. `decoy_ratio * files` extra files go into node_modules/ and .git/
+    trees that discovery is expected to prune.
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    corpus = _corpus(rng)
+
+    dirs = [""]
+    frontier = [""]
+    for level in range(depth):
+        next_frontier = []
+        for parent in frontier:
+            for i in range(rng.randint(1, fanout)):
+                child = f"{parent}/d{level}_{i}" if parent else f"d{level}_{i}"
+                next_frontier.append(child)
+        dirs.extend(next_frontier)
+        frontier = next_frontier
+
+    total_bytes = 0
+    binary_files = 0
+    for i in range(files):
+        directory = root / rng.choice(dirs)
+        directory.mkdir(parents=True, exist_ok=True)
+        size = _size(rng, mean_bytes, max_bytes)
+        if rng.random() < binary_ratio:
+            (directory / f"blob{i}{rng.choice(_BINARY_EXTS)}").write_bytes(
+                b"\x00" + rng.randbytes(max(size - 1, 0))
+            )
+            binary_files += 1
+        else:
+            start = rng.randrange(0, len(corpus) - 1)
+            body = (corpus[start:] + corpus)[:size]
+            (directory / f"file{i}{rng.choice(_TEXT_EXTS)}").write_text(body, encoding="utf-8")
+        total_bytes += size
+    (root / "README.md").write_text("# Synthetic repository\n\n" + corpus[:2000], encoding="utf-8")
+
+    decoys = int(files * decoy_ratio)
+    for i in range(decoys):
+        if i % 2:
+            directory = root / "node_modules" / f"pkg{i % 50}" / "lib"
+            name = f"index{i}.js"
+        else:
+            directory = root / ".git" / "objects" / f"{i % 256:02x}"
+            name = f"{i:038x}"
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / name).write_text(corpus[: rng.randint(100, 2000)], encoding="utf-8")
+
+    return {
+        "files": files,
+        "depth": depth,
+        "fanout": fanout,
+        "mean_bytes": mean_bytes,
+        "binary_ratio": binary_ratio,
+        "decoy_files": decoys,
+        "seed": seed,
+        "directories": len(dirs),
+        "binary_files": binary_files,
+        "total_bytes": total_bytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic repository")
+    parser.add_argument("root", help="Directory to create the repository in")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fanout", type=int, default=6)
+    parser.add_argument("--mean-bytes", type=int, default=4096)
+    parser.add_argument("--binary-ratio", type=float, default=0.05)
+    parser.add_argument("--decoy-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    info = generate_repo(
+        Path(args.root), args.files, args.depth, args.fanout, args.mean_bytes,
+        binary_ratio=args.binary_ratio, decoy_ratio=args.decoy_ratio, seed=args.seed,
+    )
+    print(json.dumps(info, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""`repo-contextor batch`: package many repositories on a process pool.
+
+One interpreter per worker is started once and reused for many repositories,
+so a nightly run over hundreds of repositories pays for startup a handful of
+times instead of once per repository. Each repository is packaged with
+build_package and written to its own file; a failure (including a worker that
+runs out of memory or dies) only fails that repository.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .argtypes import positive_int
+from .cache import ContentCache
+from .compress import CODECS, SUFFIXES, check_codec
+from .io_utils import write_output
+from .packager import DEFAULT_LIMITS, build_package, load_limits
+from .renderer import get_binary_writer, is_format
+
+_EXTENSIONS = {"markdown": "md", "json": "json", "yaml": "yaml"}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="repo-contextor batch",
+        description="Package many repositories in parallel, one output file per repository"
+    )
+    parser.add_argument("paths", nargs="*", help="Repository paths")
+    parser.add_argument(
+        "-m", "--manifest",
+        help="File listing repository paths, one per line ('#' comments; '-' reads stdin)"
+    )
+    parser.add_argument(
+        "-o", "--output-dir",
+        default="rcpack-out",
+        help="Directory for the packages, named after each repository (default: rcpack-out)"
+    )
+    parser.add_argument(
+        "-f", "--format",
+        default="markdown",
+        help="Output format: markdown (default), json, yaml or an installed renderer plugin"
+    )
+    parser.add_argument(
+        "-w", "--workers",
+        type=positive_int,
+        default=None,
+        help="Worker processes (default: number of CPUs)"
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=positive_int,
+        default=None,
+        metavar="MB",
+        help="Address-space limit per worker in MiB; a repository that exceeds it fails alone"
+    )
+    parser.add_argument("--max-file-bytes", type=positive_int, default=None, metavar="BYTES",
+                        help="Truncate files larger than this (default: 1 MiB)")
+    parser.add_argument("--max-files", type=positive_int, default=None, metavar="N",
+                        help="Package at most N files per repository")
+    parser.add_argument("--max-total-bytes", type=positive_int, default=None, metavar="BYTES",
+                        help="Stop adding files to a package once their content reaches BYTES")
+    parser.add_argument("-j", "--jobs", type=positive_int, default=None,
+                        help="Threads reading files within each repository (default: 1)")
+    parser.add_argument("--compress", choices=CODECS, default=None,
+                        help="Compress each package (adds .gz, .bz2, .xz or .zst to its name)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not use the persistent file content cache")
+    parser.add_argument("--json", metavar="FILE", help="Also write the summary to FILE as JSON")
+    args = parser.parse_args(argv)
+
+    if args.format == "text":
+        args.format = "markdown"
+    if not is_format(args.format):
+        parser.error(f"unknown format: {args.format}")
+    if get_binary_writer(args.format) is not None:
+        parser.error(f"batch mode does not support the {args.format} format")
+    repos = list(args.paths)
+    if args.manifest:
+        repos.extend(read_manifest(args.manifest))
+    if not repos:
+        parser.error("no repositories given (pass paths or --manifest)")
+    try:
+        check_codec(args.compress)
+    except RuntimeError as e:
+        parser.error(str(e))
+    try:
+        limits = load_limits({key: getattr(args, key, None) for key in DEFAULT_LIMITS})
+    except ValueError as e:
+        parser.error(f"{e} (check .repo-contextor.toml)")
+
+    tasks = plan_tasks(
+        repos, Path(args.output_dir), args.format, limits, not args.no_cache, args.compress
+    )
+    workers = min(args.workers or os.cpu_count() or 1, len(tasks))
+    start = time.perf_counter()
+    results = run_batch(tasks, workers, args.max_memory)
+    wall = time.perf_counter() - start
+
+    print_summary(results, wall)
+    if args.json:
+        import json
+
+        summary = {"wall_s": round(wall, 3), "workers": workers, "repos": results}
+        Path(args.json).write_text(json.dumps(summary, indent=2) + "\n", encoding="utf-8")
+    if any(not r["ok"] for r in results):
+        sys.exit(1)
+
+
+def read_manifest(manifest: str) -> List[str]:
+    """Repository paths from a manifest; relative paths are relative to the manifest."""
+    if manifest == "-":
+        lines, base = sys.stdin.read().splitlines(), Path.cwd()
+    else:
+        lines, base = Path(manifest).read_text(encoding="utf-8").splitlines(), Path(manifest).parent
+    paths = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            paths.append(str(base / line))
+    return paths
+
+
+def plan_tasks(repos: List[str], output_dir: Path, fmt: str, limits: Dict[str, Any],
+               use_cache: bool = True, compress: Optional[str] = None) -> List[Dict[str, Any]]:
+    """One picklable task per repository, with a unique output file name.
+
+    With `compress` the codec's suffix is appended (api.md.gz), which is what
+    selects compression when the package is written.
+    """
+    ext = _EXTENSIONS.get(fmt, fmt) + (SUFFIXES[compress] if compress else "")
+    taken: Dict[str, int] = {}
+    tasks = []
+    for repo in repos:
+        name = Path(repo).resolve().name or "root"
+        taken[name] = taken.get(name, 0) + 1
+        if taken[name] > 1:
+            # two repositories with the same directory name: api.md, api-2.md, ...
+            name = f"{name}-{taken[name]}"
+        tasks.append({
+            "repo": repo,
+            "output": str(output_dir / f"{name}.{ext}"),
+            "format": fmt,
+            "limits": limits,
+            "cache": use_cache,
+        })
+    return tasks
+
+
+def run_batch(tasks: List[Dict[str, Any]], workers: int,
+              max_memory_mb: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Package every task on a process pool; returns one result per task, in task order.
+
+    A worker that dies (for example killed for exceeding its memory) breaks the
+    whole pool and fails every task still in it, mostly innocent ones. Those
+    tasks are resubmitted to a fresh pool of the same size; only the tasks
+    caught in a broken pool a second time are retried one per worker, and a
+    task that kills its worker alone is reported as failed.
+    """
+    results: Dict[int, Dict[str, Any]] = {}
+    broken = _run_pool(tasks, range(len(tasks)), workers, max_memory_mb, results)
+    if broken:
+        broken = _run_pool(tasks, broken, workers, max_memory_mb, results)
+    for i in broken:
+        if not _run_pool(tasks, [i], 1, max_memory_mb, results):
+            continue
+        results[i] = _failure(tasks[i], "worker process died (memory limit exceeded?)", 0.0)
+        _progress(results[i])
+    return [results[i] for i in range(len(tasks))]
+
+
+def _run_pool(tasks: List[Dict[str, Any]], indexes, workers: int, max_memory_mb: Optional[int],
+              results: Dict[int, Dict[str, Any]]) -> List[int]:
+    """Run tasks[i] for each index on a new pool, into `results`; returns the indexes it broke on."""
+    broken = []
+    with _pool(max(1, min(workers, len(indexes))), max_memory_mb) as pool:
+        futures = {pool.submit(package_one, tasks[i]): i for i in indexes}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except BrokenProcessPool:
+                broken.append(i)
+                continue
+            _progress(results[i])
+    return sorted(broken)
+
+
+def package_one(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Package one repository and write its output; never raises (runs in a worker)."""
+    start = time.perf_counter()
+    cache = None
+    try:
+        if not Path(task["repo"]).is_dir():
+            raise FileNotFoundError(f"not a directory: {task['repo']}")
+        limits = task["limits"]
+        cache = ContentCache() if task["cache"] else None
+        text, stats = build_package(
+            [task["repo"]], None, None, limits["max_file_bytes"],
+            fmt=task["format"], jobs=limits["jobs"], max_in_flight=limits["max_in_flight"],
+            cache=cache, max_files=limits["max_files"], max_total_bytes=limits["max_total_bytes"],
+        )
+        write_output(task["output"], text)
+    except MemoryError:
+        return _failure(task, "memory limit exceeded", time.perf_counter() - start)
+    except Exception as e:
+        return _failure(task, f"{type(e).__name__}: {e}", time.perf_counter() - start)
+    finally:
+        if cache is not None:
+            cache.close()
+    return {
+        "repo": task["repo"],
+        "output": task["output"],
+        "ok": True,
+        "seconds": round(time.perf_counter() - start, 3),
+        "files": stats["files"],
+        "tokens": stats["tokens"],
+        "error": None,
+    }
+
+
+def print_summary(results: List[Dict[str, Any]], wall: float, out=None) -> None:
+    """Per-repository table plus totals; failures list their error."""
+    out = out or sys.stdout
+    width = max([len("repository")] + [len(r["repo"]) for r in results])
+    print(f"{'repository':<{width}}  status  {'files':>7}  {'seconds':>8}  output", file=out)
+    for r in results:
+        status = "ok" if r["ok"] else "FAILED"
+        files = r["files"] if r["files"] is not None else "-"
+        detail = r["output"] if r["ok"] else r["error"]
+        print(f"{r['repo']:<{width}}  {status:<6}  {files:>7}  {r['seconds']:>8.3f}  {detail}",
+              file=out)
+    failed = sum(1 for r in results if not r["ok"])
+    busy = sum(r["seconds"] for r in results)
+    noun = "repository" if len(results) == 1 else "repositories"
+    print(f"{len(results)} {noun}: {len(results) - failed} ok, {failed} failed "
+          f"in {wall:.2f} s ({busy:.2f} s of work)", file=out)
+
+
+def _pool(workers: int, max_memory_mb: Optional[int]) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=workers, initializer=_limit_memory, initargs=(max_memory_mb,)
+    )
+
+
+def _limit_memory(max_memory_mb: Optional[int]) -> None:
+    """Worker initializer: cap the address space so a runaway repository hits MemoryError."""
+    if max_memory_mb is None:
+        return
+    try:
+        import resource
+
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        # no RLIMIT_AS (e.g. Windows, some macOS versions): run without the cap
+        print(f"Warning: cannot apply --max-memory in this worker: {e}", file=sys.stderr)
+
+
+def _failure(task: Dict[str, Any], error: str, seconds: float) -> Dict[str, Any]:
+    return {
+        "repo": task["repo"],
+        "output": None,
+        "ok": False,
+        "seconds": round(seconds, 3),
+        "files": None,
+        "tokens": None,
+        "error": error,
+    }
+
+
+def _progress(result: Optional[Dict[str, Any]]) -> None:
+    if result is not None:
+        status = "ok" if result["ok"] else f"failed: {result['error']}"
+        print(f"[{result['seconds']:.2f}s] {result['repo']}: {status}", file=sys.stderr)
@@ -0,0 +1,205 @@
+"""Persistent per-file content cache for incremental repackaging.
+
+Entries are keyed by absolute path plus a reader "variant" (e.g. the size
+limit in effect) and are only served while the file's size, mtime_ns and inode
+are unchanged. The cache lives in one SQLite database under
+$XDG_CACHE_HOME/rcpack (or ~/.cache/rcpack) and is trimmed to a byte budget,
+least recently used first, when it is closed.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from .profiling import count
+
+if TYPE_CHECKING:
+    import sqlite3
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Files modified this recently may change again within the same mtime tick,
+# so they are read normally but not stored.
+_RACY_WINDOW_NS = 2_000_000_000
+
+# Seconds to wait for another run holding the database lock before giving up.
+_BUSY_TIMEOUT = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    nbytes INTEGER NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (path, variant)
+)
+"""
+
+
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "rcpack"
+
+
+class ContentCache:
+    """Thread-safe cache of per-file read results (JSON-serializable dicts).
+
+    If the database cannot be opened, or another run holds its lock, the cache
+    silently does nothing, so a read-only home directory never breaks packaging.
+    A corrupt database file is discarded and recreated.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        rebuild: bool = False,
+    ):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[Any, ...]] = []
+        self._touched: List[Tuple[float, str, str]] = []
+        self._db: Optional[sqlite3.Connection] = None
+        import sqlite3  # deferred with the cache itself: --help and --no-cache never load it
+
+        db_path = (cache_dir or default_cache_dir()) / "contents.sqlite3"
+        try:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            if rebuild and db_path.exists():
+                db_path.unlink()
+            self._db = self._connect(db_path)
+        except sqlite3.OperationalError:
+            # locked by another run (or unreadable): never delete it, just skip caching
+            self._db = None
+        except sqlite3.DatabaseError:
+            # corrupt database: start over once
+            try:
+                db_path.unlink()
+                self._db = self._connect(db_path)
+            except (OSError, sqlite3.Error):
+                self._db = None
+        except OSError:
+            self._db = None
+
+    @staticmethod
+    def _connect(db_path: Path) -> sqlite3.Connection:
+        import sqlite3
+
+        db = sqlite3.connect(str(db_path), timeout=_BUSY_TIMEOUT, check_same_thread=False)
+        db.execute(_SCHEMA)
+        return db
+
+    def get(self, path: str, st: os.stat_result, variant: str) -> Optional[Dict[str, Any]]:
+        if self._db is None:
+            return None
+        import sqlite3
+
+        with self._lock:
+            try:
+                row = self._db.execute(
+                    "SELECT size, mtime_ns, inode, record FROM entries WHERE path = ? AND variant = ?",
+                    (path, variant),
+                ).fetchone()
+            except sqlite3.Error:
+                # locked or damaged underneath us: treat as a miss
+                row = None
+            if row is None or tuple(row[:3]) != (st.st_size, st.st_mtime_ns, st.st_ino):
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched.append((time.time(), path, variant))
+        return json.loads(row[3])
+
+    def put(self, path: str, st: os.stat_result, variant: str, record: Dict[str, Any]) -> None:
+        if self._db is None or st.st_mtime_ns > time.time_ns() - _RACY_WINDOW_NS:
+            return
+        blob = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._pending.append(
+                (path, variant, st.st_size, st.st_mtime_ns, st.st_ino, blob, len(blob), time.time())
+            )
+
+    def close(self) -> None:
+        """Write pending entries, evict down to max_bytes and close the database."""
+        if self._db is None:
+            return
+        import sqlite3
+
+        with self._lock:
+            db, self._db = self._db, None
+            try:
+                with db:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        self._pending,
+                    )
+                    db.executemany(
+                        "UPDATE entries SET used = ? WHERE path = ? AND variant = ?",
+                        self._touched,
+                    )
+                    self._evict(db)
+            except sqlite3.Error:
+                pass
+            finally:
+                db.close()
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        total = db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for path, variant, nbytes in db.execute(
+            "SELECT path, variant, nbytes FROM entries ORDER BY used"
+        ):
+            doomed.append((path, variant))
+            total -= nbytes
+            if total <= self.max_bytes:
+                break
+        db.executemany("DELETE FROM entries WHERE path = ? AND variant = ?", doomed)
+
+    def __enter__(self) -> "ContentCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def cached_read(
+    cache: Optional[ContentCache],
+    path: Path,
+    variant: str,
+    read: Callable[[], Dict[str, Any]],
+    st: Optional[os.stat_result] = None,
+) -> Dict[str, Any]:
+    """Return read() for `path`, served from `cache` while the file is unchanged.
+
+    `st` may carry a stat result the caller already has. Exceptions raised by
+    read() propagate and are never cached.
+    """
+    if cache is None:
+        return read()
+    if st is None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return read()
+    key = str(path)
+    record = cache.get(key, st, variant)
+    if record is None:
+        count("cache_misses")
+        record = read()
+        cache.put(key, st, variant, record)
+    else:
+        count("cache_hits")
+    return record
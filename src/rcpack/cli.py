@@ -1,21 +1,52 @@
 #!/usr/bin/env python3
 """CLI for Repository Context Packager."""
 
-from .config_loader import load_config
+from __future__ import annotations
 
 import argparse
+import io
 import sys
+from functools import partial
 from pathlib import Path
-from .gitinfo import get_git_info
+from .gitinfo import (
+    get_changed_files, get_diff_patch, get_file_commits, get_git_info, range_end, read_blobs,
+)
 from .discover import discover_files
-from .treeview import create_tree_view
-from .renderer.markdown import render_markdown
-from .renderer.jsonyaml import render_json, render_yaml
-from .io_utils import write_output
-from datetime import datetime, timedelta
+from .treeview import create_tree_view, render_tree
+from .renderer import call_renderer, get_binary_writer, get_renderer, get_writer, is_format
+from .io_utils import open_binary_output, open_output, replace_output, write_output
+from .argtypes import positive_int
+from .ingest import bounded_map
+from .cache import ContentCache, cached_read
+from .packager import DEFAULT_LIMITS, binary_placeholder, load_bytes, load_file, load_limits
+from .recent import DEFAULT_WINDOW, human_readable_age, parse_window, recent_changes
+from .tokens import FILE_OVERHEAD_TOKENS, get_estimator, pack_to_budget, reserve_for
+from .profiling import Profiler, count, profiling, span
+from .compress import CODECS, check_codec, codec_for
+from .shard import (
+    FILE_OVERHEAD_BYTES, manifest_name, parse_shard_size, plan_shards, shard_names,
+    write_manifest, write_shards,
+)
+
+# renderers, PyYAML, datetime, subprocess and the watcher are imported on first
+# use: the CLI runs from hooks many times a day, so startup time matters
+
+# Files larger than this are shown as a head and tail excerpt
+DEFAULT_MAX_FILE_BYTES = DEFAULT_LIMITS["max_file_bytes"]
 
 
 def main():
+    if sys.argv[1:2] == ["batch"]:
+        # subcommand; a repository directory named "batch" can be given as ./batch
+        from .batch import main as batch_main
+        return batch_main(sys.argv[2:])
+    if sys.argv[1:2] == ["extract"]:
+        from .extract import main as extract_main
+        return extract_main(sys.argv[2:])
+    if sys.argv[1:2] == ["serve"]:
+        from .serve import main as serve_main
+        return serve_main(sys.argv[2:])
+
     parser = argparse.ArgumentParser(
         description="Package repository content for LLM context"
     )
@@ -31,141 +62,751 @@ def main():
     )
     parser.add_argument(
         "-f", "--format", 
-        choices=["text", "json", "yaml"], 
         default="text",
-        help="Output format (default: text)"
+        help="Output format: text (default), json, jsonl, yaml, rcpack (indexed binary, read "
+             "with `repo-contextor extract`) or an installed renderer plugin; jsonl and rcpack "
+             "are always streamed"
     )
 
     """ This will read -r from the console and able to search it with this"""
     parser.add_argument(
     "-r", "--recent",
     action="store_true",
-    help="Include only files modified in the last 7 days"
+    help="Include only files changed in the last 7 days (or the --since window)"
+    )
+    parser.add_argument(
+        "--since",
+        type=parse_window,
+        default=None,
+        metavar="WINDOW",
+        help="Recent-changes window such as 3d, 12h or 2w; implies --recent"
     )
     parser.add_argument(
         "-v", "--verbose",
         action="store_true",
         help="Print detailed progress information to stderr"
     )
+    parser.add_argument(
+        "--file-commits",
+        action="store_true",
+        help="Show the last commit (author, date) for each file, from one git log pass"
+    )
+    diff_mode = parser.add_mutually_exclusive_group()
+    diff_mode.add_argument(
+        "--since-ref",
+        metavar="REF",
+        help="Package only files changed since REF, compared with the working tree "
+             "(untracked files included)"
+    )
+    diff_mode.add_argument(
+        "--diff",
+        metavar="A..B",
+        help="Package only files changed in a commit range such as main..HEAD or main...feature, "
+             "with their contents at B"
+    )
+    parser.add_argument(
+        "--patch",
+        action="store_true",
+        help="With --since-ref or --diff, also include the diff hunks"
+    )
+    parser.add_argument(
+        "--compress",
+        choices=[*CODECS, "none"],
+        default=None,
+        help="Compress the output with gzip, bz2, xz or zstd (default: from the -o extension, "
+             "e.g. .gz, .bz2, .xz, .zst)"
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=_shard_size,
+        default=None,
+        metavar="SIZE",
+        help="Split the output into numbered files of about SIZE bytes (2M, 500000) or "
+             "tokens (150k tokens), never splitting a file; needs -o, writes a manifest too"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write output incrementally while files are read (text and json formats)"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and rewrite the output file whenever repository files change (requires -o)"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.5,
+        help="Polling interval in seconds for --watch when inotify is unavailable (default: 0.5)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not use the persistent file content cache"
+    )
+    parser.add_argument(
+        "--rebuild-cache",
+        action="store_true",
+        help="Discard the file content cache and rebuild it from this run"
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=positive_int,
+        default=None,
+        help="Number of files to read in parallel (default: 1)"
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=positive_int,
+        default=None,
+        help="Maximum number of files read ahead of the output (default: 4 x jobs)"
+    )
+    parser.add_argument(
+        "--tree-depth",
+        type=positive_int,
+        default=None,
+        metavar="N",
+        help="Show at most N levels in the directory structure; deeper contents are summarized"
+    )
+    parser.add_argument(
+        "--tree-max-entries",
+        type=positive_int,
+        default=None,
+        metavar="K",
+        help="List at most K entries per directory in the structure; the rest become one summary line"
+    )
+    parser.add_argument(
+        "--max-file-bytes",
+        type=positive_int,
+        default=None,
+        metavar="BYTES",
+        help="Show larger files as an excerpt of this many bytes from their start and end "
+             "(default: 1 MiB)"
+    )
+    parser.add_argument(
+        "--max-files",
+        type=positive_int,
+        default=None,
+        metavar="N",
+        help="Package at most N files, in path order (default: no limit)"
+    )
+    parser.add_argument(
+        "--max-total-bytes",
+        type=positive_int,
+        default=None,
+        metavar="BYTES",
+        help="Stop adding files once their content reaches BYTES (default: no limit)"
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=positive_int,
+        default=None,
+        metavar="N",
+        help="Fit the package into about N tokens: README/config files first, then recent, then smaller files"
+    )
+    parser.add_argument(
+        "--tokenizer",
+        default="heuristic",
+        help="Token counter for --max-tokens: heuristic (default), tiktoken or tiktoken:<encoding>"
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="Write per-stage timings and counters (files, bytes, binaries, fallbacks) to FILE"
+    )
+    parser.add_argument(
+        "--profile-format",
+        choices=["json", "chrome"],
+        default="json",
+        help="Format of the --profile file: json summary or chrome trace (default: json)"
+    )
     
     args = parser.parse_args()
+    if not is_format(args.format):
+        parser.error(f"unknown format: {args.format}")
+    binary = get_binary_writer(args.format) is not None
+    if args.stream and get_writer(args.format) is None and not binary:
+        parser.error(f"--stream is not supported with the {args.format} format")
+    if binary and (args.watch or args.shard_size is not None):
+        parser.error(f"--watch and --shard-size are not supported with the {args.format} format")
+    try:
+        check_codec(codec_for(args.output, args.compress))
+    except RuntimeError as e:
+        parser.error(str(e))
+    if args.watch and not args.output:
+        parser.error("--watch requires -o/--output")
+    if args.shard_size is not None and (not args.output or args.stream or args.watch):
+        parser.error("--shard-size needs -o/--output and cannot be combined with --stream or --watch")
+    if args.diff is not None and ".." not in args.diff:
+        parser.error("--diff needs a range such as main..HEAD (use --since-ref to compare "
+                     "with the working tree)")
+    if (args.since_ref or args.diff) and (args.stream or args.watch or args.recent
+                                          or args.since is not None):
+        parser.error("--since-ref and --diff cannot be combined with --stream, --watch or --recent")
+    if args.patch and not (args.since_ref or args.diff):
+        parser.error("--patch needs --since-ref or --diff")
+    if args.patch and args.shard_size is not None:
+        parser.error("--patch cannot be combined with --shard-size")
+    if args.stream and args.max_tokens is not None:
+        parser.error("--stream cannot be combined with --max-tokens")
+    try:
+        args.estimate = get_estimator(args.tokenizer)
+    except (RuntimeError, ValueError) as e:
+        parser.error(str(e))
+    # size, count and concurrency limits: CLI > .repo-contextor.toml > defaults
+    try:
+        vars(args).update(load_limits({key: getattr(args, key) for key in DEFAULT_LIMITS}))
+    except ValueError as e:
+        parser.error(f"{e} (check .repo-contextor.toml)")
+    if args.since is not None:
+        args.recent = True
+    else:
+        args.since = parse_window(DEFAULT_WINDOW)
     
+    profiler = Profiler() if args.profile else None
     try:
-        repo_path = Path(args.path).resolve()
-        if not repo_path.exists():
-            print(f"Error: Path {repo_path} does not exist", file=sys.stderr)
-            sys.exit(1)
-            
-        # Get repository information
-        if args.verbose:
-            print(f"Analyzing repository: {repo_path}", file=sys.stderr)
+        with profiling(profiler):
+            _package(args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if profiler is not None:
+            profiler.write(args.profile, args.profile_format)
+
+
+def _package(args):
+    """Run one packaging pass (or --watch loop) for parsed arguments."""
+    repo_path = Path(args.path).resolve()
+    if not repo_path.exists():
+        print(f"Error: Path {repo_path} does not exist", file=sys.stderr)
+        sys.exit(1)
+
+    # Get repository information
+    if args.verbose:
+        print(f"Analyzing repository: {repo_path}", file=sys.stderr)
+    with span("git_info"):
         repo_info = get_git_info(repo_path)
-        
-        # Discover files
-        if args.verbose:
-            print(f"Discovering files in: {repo_path}", file=sys.stderr)
+
+    if args.since_ref or args.diff:
+        _diff_package(args, repo_path, repo_info)
+        return
+
+    if args.watch:
+        _watch_package(args, repo_path)
+        return
+
+    # Discover files
+    if args.verbose:
+        print(f"Discovering files in: {repo_path}", file=sys.stderr)
+    with span("discover"):
         discovered_files = discover_files([repo_path], repo_path, [], [])
-        if args.verbose:
-            print(f"Found {len(discovered_files)} files", file=sys.stderr)
-        
-        # will check the file in last 7 days
-        recent_files_info = {}
-        if args.recent:
-            seven_days_ago = datetime.now() - timedelta(days=7)
-            recent_files = []
-            for f in discovered_files:
-                try:
-                    mtime = datetime.fromtimestamp(f.stat().st_mtime)
-                    if mtime >= seven_days_ago:
-                        recent_files.append(f)
-                        recent_files_info[str(f.relative_to(repo_path))] = human_readable_age(mtime)     
-                except Exception:
-                    continue
-            discovered_files = recent_files
-        
-        # Read file contents
-        files_data = {}
-        file_sizes = {}
-        for file_path in discovered_files:
-            try:
-                relative_path = file_path.relative_to(repo_path)
-                if args.verbose:
-                    print(f"Reading file: {relative_path}", file=sys.stderr)
-                file_sizes[str(relative_path)] = file_path.stat().st_size
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                files_data[str(relative_path)] = content
-            except (UnicodeDecodeError, PermissionError):
-                if args.verbose:
-                    print(f"Skipping binary/unreadable file: {relative_path}", file=sys.stderr)
-                file_sizes[str(relative_path)] = file_path.stat().st_size if file_path.exists() else 0
-                files_data[str(relative_path)] = f"[Binary or unreadable file: {file_path.name}]"
-            except Exception:
-                if args.verbose:
-                    print(f"Error reading file: {relative_path}", file=sys.stderr)
-                continue
-        
-        # Create tree view
-        if args.verbose:
-            print("Generating directory tree", file=sys.stderr)
-        tree_text = create_tree_view(repo_path, files_data)
-        
-        # Count totals
-        total_files = len(files_data)
-        total_lines = sum(len(content.splitlines()) for _, content in files_data.items())
-        
-        # Render based on format
-        if args.verbose:
-            print(f"Rendering output in {args.format} format", file=sys.stderr)
-        if args.format == "json":
-            content = render_json(
-                str(repo_path), repo_info, tree_text, 
-                files_data, total_files, total_lines,
-                recent_files=recent_files_info if args.recent else {},
-                file_sizes=file_sizes
-            )
-        elif args.format == "yaml":
-            content = render_yaml(
-                str(repo_path), repo_info, tree_text, 
-                files_data, total_files, total_lines,
-                recent_files=recent_files_info if args.recent else {},
-                file_sizes=file_sizes
-            )
-        else:  # text/markdown
-            content = render_markdown(
-                str(repo_path), repo_info, tree_text, 
-                files_data, total_files, total_lines,
-                recent_files=recent_files_info if args.recent else {},
-                file_sizes=file_sizes
+    if args.verbose:
+        print(f"Found {len(discovered_files)} files", file=sys.stderr)
+
+    # will check the file in the recent window (last 7 days by default)
+    recent_files_info = {}
+    stats = {}
+    if args.recent:
+        with span("recent"):
+            discovered_files, recent_files_info = _filter_recent(
+                discovered_files, repo_path, args.since, stats
             )
-        
+    discovered_files = _limit_files(args, discovered_files)
+
+    # a token budget needs every file before choosing, so jsonl and rcpack are buffered then
+    streamed = args.format == "jsonl" or get_binary_writer(args.format) is not None
+    if args.stream or (streamed and args.max_tokens is None):
+        with span("stream"):
+            _stream_package(args, repo_path, repo_info, discovered_files, recent_files_info, stats)
+        return
+
+    # Read file contents
+    files_data = {}
+    file_sizes = {}
+    with span("read"):
+        for relative_path, size, content in _iter_contents(discovered_files, repo_path, args, stats):
+            file_sizes[relative_path] = size
+            files_data[relative_path] = content
+
+    file_commits = _file_commits(args, repo_path, repo_info, discovered_files)
+    _emit(args, repo_path, repo_info, files_data, file_sizes, recent_files_info, file_commits)
+
+
+def _emit(args, repo_path, repo_info, files_data, file_sizes, recent_files_info, file_commits=None,
+          extras=None) -> None:
+    """Write already-read files as shards, as a binary container or as one document."""
+    if args.shard_size is not None:
+        _write_shards(
+            args, repo_path, repo_info, files_data, file_sizes, recent_files_info, file_commits,
+            extras
+        )
+        return
+    if get_binary_writer(args.format) is not None:
+        files_data, tree_text = _fit_and_tree(
+            args, repo_path, files_data, file_sizes, recent_files_info
+        )
+        sections = (
+            {"path": path, "content": content, "size": file_sizes.get(path)}
+            for path, content in sorted(files_data.items())
+        )
+        _write_binary(
+            args, str(repo_path), repo_info, tree_text, sections,
+            recent_files_info if args.recent else {}, file_commits, extras
+        )
+        return
+    content = _render(
+        args, repo_path, repo_info, files_data, file_sizes, recent_files_info, file_commits, extras
+    )
+    _write_content(args, content)
+
+
+def _write_binary(args, root, repo_info, tree_text, sections, recent_files, file_commits=None,
+                  extras=None) -> None:
+    """Stream sections into a binary container such as rcpack, to -o or stdout.
+
+    --compress picks the codec for each file's blob (gzip by default; none
+    stores them as they are): compressing the whole file would defeat random
+    access.
+    """
+    writer = get_binary_writer(args.format)
+    compression = "gzip" if args.compress is None else codec_for(None, args.compress)
+    with span("write"), open_binary_output(args.output) as out:
+        writer(
+            out, root, repo_info, tree_text, sections,
+            recent_files=recent_files, file_commits=file_commits, compression=compression,
+            **(extras or {})
+        )
+    if args.output:
+        print(f"Context package created: {args.output}")
+
+
+def _write_content(args, content: str) -> None:
+    """Write a rendered package to -o (compressed as asked) or stdout."""
+    with span("write"):
         if args.output:
             # Write to file
-            write_output(args.output, content)
+            write_output(args.output, content, args.compress)
             print(f"Context package created: {args.output}")
+        elif args.compress:
+            write_output(None, content + "\n", args.compress)
         else:
             # Output to stdout
             print(content)
-        
-    except Exception as e:
-        print(f"Error: {e}", file=sys.stderr)
-        sys.exit(1)
 
-# this will convert age and give us the difference
-def human_readable_age(mtime: datetime) -> str:
-    delta = datetime.now() - mtime
-    days = delta.days
-    seconds = delta.seconds
-    if days > 0:
-        return f"{days} day{'s' if days != 1 else ''} ago"
-    elif seconds >= 3600:
-        hours = seconds // 3600
-        return f"{hours} hour{'s' if hours != 1 else ''} ago"
-    elif seconds >= 60:
-        minutes = seconds // 60
-        return f"{minutes} minute{'s' if minutes != 1 else ''} ago"
+
+def _diff_package(args, repo_path: Path, repo_info):
+    """Package only the files changed since --since-ref or in the --diff range.
+
+    The changed paths come from one `git diff --name-status` call. With
+    --since-ref the files are read from the working tree; with --diff they are
+    read at the end of the range in one `git cat-file --batch` call. Deleted
+    files are listed under the changes but have no content, and the tree only
+    shows the directories that hold changed files.
+    """
+    rev = args.diff or args.since_ref
+    if args.verbose:
+        print(f"Collecting changes for {rev}", file=sys.stderr)
+    with span("diff"):
+        changed = get_changed_files(repo_path, rev)
+    if changed is None:
+        raise ValueError(f"cannot diff {rev}: not a git repository or unknown revision")
+    if args.verbose:
+        print(f"Found {len(changed)} changed files", file=sys.stderr)
+
+    paths = _limit_files(args, sorted({c["path"] for c in changed if c["status"] != "D"}))
+    end = range_end(rev)
+    files_data = {}
+    file_sizes = {}
+    with span("read"):
+        if end is None:
+            contents = _iter_contents([repo_path / p for p in paths], repo_path, args)
+        else:
+            contents = _iter_blobs(args, repo_path, end, paths)
+        for relative_path, size, content in contents:
+            file_sizes[relative_path] = size
+            files_data[relative_path] = content
+
+    extras = {"changes": {"range" if args.diff else "since": rev, "files": changed}}
+    if args.patch:
+        with span("patch"):
+            patch = get_diff_patch(repo_path, rev)
+        if patch is None:
+            raise ValueError(f"cannot read the patch for {rev}")
+        extras["patch"] = patch
+
+    file_commits = _file_commits(args, repo_path, repo_info, [repo_path / p for p in paths])
+    _emit(args, repo_path, repo_info, files_data, file_sizes, {}, file_commits, extras)
+
+
+def _iter_blobs(args, repo_path: Path, rev: str, paths):
+    """Yield (relative_path, size, content) for `paths` as they are at commit `rev`."""
+    blobs = read_blobs(repo_path, rev, paths)
+    if blobs is None:
+        raise ValueError(f"cannot read files at {rev}")
+
+    def load(rel):
+        raw = blobs.get(rel)
+        if raw is None:
+            return rel, None, None, "error"
+        record = load_bytes(raw, Path(rel).name, args.max_file_bytes)
+        return rel, len(raw), record["content"], _problem(record)
+
+    results = bounded_map(load, paths, _content_bytes, max_total=args.max_total_bytes)
+    yield from _iter_results(results, len(paths), args)
+
+
+def _filter_recent(discovered_files, repo_path: Path, window_seconds: float, stats=None):
+    """Keep files changed within the window; returns (files, {relative_path: age}).
+
+    Uses commit times from git history when available (see rcpack.recent);
+    stat results taken along the way are stored in `stats`.
+    """
+    from datetime import datetime
+
+    changed = recent_changes(repo_path, discovered_files, window_seconds, stats)
+    recent_files = []
+    recent_files_info = {}
+    for f in discovered_files:
+        if f in changed:
+            recent_files.append(f)
+            recent_files_info[str(f.relative_to(repo_path))] = human_readable_age(
+                datetime.fromtimestamp(changed[f])
+            )
+    return recent_files, recent_files_info
+
+
+def _file_commits(args, repo_path: Path, repo_info, files):
+    """Per-file last commits for --file-commits, else None."""
+    if not args.file_commits or not repo_info.get("is_repo"):
+        return None
+    if args.verbose:
+        print("Collecting per-file commit information", file=sys.stderr)
+    with span("file_commits"):
+        return get_file_commits(repo_path, [f.relative_to(repo_path).as_posix() for f in files])
+
+
+def _render(args, repo_path, repo_info, files_data, file_sizes, recent_files_info, file_commits=None,
+            extras=None) -> str:
+    """Render already-read files in the selected format."""
+    files_data, tree_text = _fit_and_tree(args, repo_path, files_data, file_sizes, recent_files_info)
+
+    # Render based on format
+    if args.verbose:
+        print(f"Rendering output in {args.format} format", file=sys.stderr)
+    with span("render"):
+        return _render_format(
+            args.format, str(repo_path), repo_info, tree_text, files_data, file_sizes,
+            recent_files_info if args.recent else {}, file_commits, extras
+        )
+
+
+def _fit_and_tree(args, repo_path, files_data, file_sizes, recent_files_info):
+    """Apply --max-tokens, then build the tree of what is left; returns (files_data, tree_text)."""
+    if args.max_tokens is not None:
+        with span("token_budget"):
+            files_data = _fit_budget(args, repo_path, files_data, recent_files_info)
+
+    # Create tree view
+    if args.verbose:
+        print("Generating directory tree", file=sys.stderr)
+    with span("tree"):
+        tree_text = create_tree_view(
+            repo_path, files_data, args.tree_depth, args.tree_max_entries, file_sizes
+        )
+    return files_data, tree_text
+
+
+def _render_format(fmt, root, repo_info, tree_text, files_data, file_sizes, recent_files,
+                   file_commits=None, extras=None) -> str:
+    """Render {path: content} as one document in format `fmt`.
+
+    `extras` are extra keyword arguments for the renderer, such as the changes
+    of a diff-scoped package; they are only passed when given, so renderer
+    plugins that do not know them keep working.
+    """
+    extras = extras or {}
+    if fmt == "jsonl":
+        buf = io.StringIO()
+        sections = (
+            {"path": path, "content": content, "size": file_sizes.get(path)}
+            for path, content in files_data.items()
+        )
+        get_writer("jsonl")(
+            buf, root, repo_info, tree_text, sections,
+            recent_files=recent_files, file_commits=file_commits, **extras
+        )
+        return buf.getvalue()
+
+    # Count totals
+    total_files = len(files_data)
+    total_lines = sum(len(content.splitlines()) for _, content in files_data.items())
+    return call_renderer(
+        get_renderer(fmt), root, repo_info, tree_text,
+        files_data, total_files, total_lines,
+        recent_files=recent_files, file_sizes=file_sizes, file_commits=file_commits, **extras
+    )
+
+
+def _write_shards(args, repo_path, repo_info, files_data, file_sizes, recent_files_info,
+                  file_commits=None, extras=None):
+    """Split the package into --shard-size pieces, write them in parallel, then the manifest."""
+    files_data, tree_text = _fit_and_tree(args, repo_path, files_data, file_sizes, recent_files_info)
+    root = str(repo_path)
+    recent = recent_files_info if args.recent else {}
+    paths = sorted(files_data)
+
+    # every shard repeats the header: the document with no files in it
+    header = _render_format(args.format, root, repo_info, tree_text, {}, {}, recent, extras=extras)
+    limit, unit = args.shard_size
+    if unit == "tokens":
+        header_cost = args.estimate(header)
+        costs = [args.estimate(files_data[p]) + FILE_OVERHEAD_TOKENS for p in paths]
     else:
-        return "just now"
+        header_cost = len(header.encode("utf-8"))
+        costs = [
+            len(files_data[p].encode("utf-8")) + 2 * len(p.encode("utf-8")) + FILE_OVERHEAD_BYTES
+            for p in paths
+        ]
+    shard_paths = [[paths[i] for i in shard] for shard in plan_shards(costs, limit, header_cost)]
+    if header_cost > limit:
+        print(f"Warning: the header alone is larger than --shard-size ({header_cost} {unit}); "
+              "try --tree-depth", file=sys.stderr)
+
+    names = shard_names(args.output, len(shard_paths))
+    if args.verbose:
+        print(f"Rendering {len(names)} shards in {args.format} format", file=sys.stderr)
+    count("shards", len(names))
+    # each worker is sent the header once and then only the files of its shards
+    render = partial(_render_shard, args.format, root, repo_info, tree_text, recent, extras)
+    shards = [
+        (
+            {p: files_data[p] for p in paths},
+            {p: file_sizes[p] for p in paths if p in file_sizes},
+            {p: file_commits[p] for p in paths if p in file_commits} if file_commits else file_commits,
+        )
+        for paths in shard_paths
+    ]
+    with span("render"):
+        sizes = write_shards(render, shards, names, args.compress)
+    manifest = manifest_name(args.output)
+    write_manifest(manifest, root, limit, unit, names, shard_paths, sizes)
+    written = names[0] if len(names) == 1 else f"{len(names)} shards, {names[0]} to {names[-1]}"
+    print(f"Context package created: {written} (manifest: {manifest})")
+
+
+def _render_shard(fmt, root, repo_info, tree_text, recent_files, extras, shard) -> str:
+    """Render one shard, a (files_data, file_sizes, file_commits) tuple.
+
+    Module level so shard workers can run it.
+    """
+    files_data, file_sizes, file_commits = shard
+    return _render_format(
+        fmt, root, repo_info, tree_text, files_data, file_sizes, recent_files, file_commits, extras
+    )
+
+
+def _fit_budget(args, repo_path, files_data, recent_files_info):
+    """Keep the files (possibly truncated) that fit in --max-tokens."""
+    sections = [{"path": path, "content": content} for path, content in sorted(files_data.items())]
+    tree_text = create_tree_view(repo_path, files_data, args.tree_depth, args.tree_max_entries)
+    reserved = reserve_for(tree_text, args.estimate)
+    selected, used, dropped = pack_to_budget(
+        sections, args.max_tokens, args.estimate, recent=recent_files_info, reserved=reserved
+    )
+    if args.verbose:
+        print(f"Token budget: ~{used} of {args.max_tokens} tokens, {dropped} files left out",
+              file=sys.stderr)
+    return {section["path"]: section["content"] for section in selected}
+
+
+def _watch_package(args, repo_path: Path):
+    """Build the package once, then rewrite it whenever inputs change."""
+    from .watch import LiveIndex, watch
+
+    output_abs = Path(args.output).resolve()
+    cache = None if args.no_cache else ContentCache(rebuild=args.rebuild_cache)
+
+    def discover(inputs):
+        # never package our own output, or every write would trigger another
+        return [f for f in discover_files(inputs, repo_path, [], []) if f != output_abs]
+
+    def emit():
+        files = index.files
+        recent_files_info = {}
+        if args.recent:
+            files, recent_files_info = _filter_recent(files, repo_path, args.since)
+        files = _limit_files(args, files)
+        files_data = {}
+        file_sizes = {}
+        entries = bounded_map(
+            index.entries.__getitem__, files, _content_bytes, max_total=args.max_total_bytes
+        )
+        consumed = 0
+        for relative_path, size, content, problem in entries:
+            consumed += 1
+            if problem == "error":
+                continue
+            file_sizes[str(relative_path)] = size
+            files_data[str(relative_path)] = content
+        if consumed < len(files):
+            _note_limit("max_total_bytes", args.max_total_bytes, len(files) - consumed)
+        repo_info = get_git_info(repo_path)
+        file_commits = _file_commits(args, repo_path, repo_info, files)
+        content = _render(
+            args, repo_path, repo_info, files_data, file_sizes, recent_files_info, file_commits
+        )
+        replace_output(args.output, content, args.compress)
+        print(f"Context package updated: {args.output} ({len(files_data)} files)", file=sys.stderr)
+
+    try:
+        try:
+            index = LiveIndex(
+                repo_path, discover,
+                lambda f: _read_file(f, repo_path, cache, max_file_bytes=args.max_file_bytes)
+            )
+        finally:
+            # the initial load is the expensive part; a closed cache is a no-op
+            if cache is not None:
+                cache.close()
+        emit()
+        watch(index, emit, interval=args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+def _stream_package(args, repo_path, repo_info, discovered_files, recent_files_info, stats=None):
+    """Render straight to the output sink while files are still being read."""
+    if args.format == "text":
+        # Same order as the non-streaming renderer, which sorts by path string
+        discovered_files = sorted(discovered_files, key=lambda f: str(f.relative_to(repo_path)))
+    if args.verbose:
+        print("Generating directory tree", file=sys.stderr)
+    tree_text = render_tree(
+        [f.relative_to(repo_path).as_posix() for f in discovered_files],
+        args.tree_depth, args.tree_max_entries
+    )
+
+    sections = (
+        {"path": relative_path, "content": content, "size": size}
+        for relative_path, size, content in _iter_contents(discovered_files, repo_path, args, stats)
+    )
+    file_commits = _file_commits(args, repo_path, repo_info, discovered_files)
+    recent_files = recent_files_info if args.recent else {}
+    if get_binary_writer(args.format) is not None:
+        _write_binary(args, str(repo_path), repo_info, tree_text, sections, recent_files,
+                      file_commits)
+        return
+    writer = get_writer(args.format)
+    with open_output(args.output, args.compress) as out:
+        writer(
+            out, str(repo_path), repo_info, tree_text, sections,
+            recent_files=recent_files, file_commits=file_commits
+        )
+        if not args.output and args.format == "json":
+            out.write("\n")  # as print() does for the non-streaming output
+    if args.output:
+        print(f"Context package created: {args.output}")
+
+
+def _iter_contents(discovered_files, repo_path: Path, args, stats=None):
+    """Read files (in parallel with --jobs), yielding (relative_path, size, content) in order.
+
+    `stats` holds stat results already taken (by the recent filter), keyed by path.
+    """
+    cache = None if args.no_cache else ContentCache(rebuild=args.rebuild_cache)
+    try:
+        yield from _iter_read(discovered_files, repo_path, args, cache, stats or {})
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def _iter_read(discovered_files, repo_path: Path, args, cache, stats):
+    results = bounded_map(
+        lambda fp: _read_file(fp, repo_path, cache, stats.get(fp), args.max_file_bytes),
+        discovered_files, _content_bytes,
+        jobs=args.jobs, max_in_flight=args.max_in_flight, max_total=args.max_total_bytes
+    )
+    yield from _iter_results(results, len(discovered_files), args)
+
+
+def _iter_results(results, total: int, args):
+    """Report and filter (relative_path, size, content, problem) results of `total` files."""
+    consumed = 0
+    for relative_path, size, content, problem in results:
+        consumed += 1
+        if args.verbose:
+            print(f"Reading file: {relative_path}", file=sys.stderr)
+        if problem == "error":
+            if args.verbose:
+                print(f"Error reading file: {relative_path}", file=sys.stderr)
+            continue
+        if problem == "binary":
+            count("binary_skipped")
+            if args.verbose:
+                print(f"Skipping binary/unreadable file: {relative_path}", file=sys.stderr)
+        yield str(relative_path), size, content
+    if consumed < total:
+        _note_limit("max_total_bytes", args.max_total_bytes, total - consumed)
+
+
+def _content_bytes(result) -> int:
+    content = result[2]
+    return len(content.encode("utf-8")) if content is not None else 0
+
+
+def _limit_files(args, files):
+    """Keep the first --max-files files (discovery order is path order)."""
+    if args.max_files is None or len(files) <= args.max_files:
+        return files
+    _note_limit("max_files", args.max_files, len(files) - args.max_files)
+    return files[:args.max_files]
+
+
+def _note_limit(key: str, value: int, left_out: int) -> None:
+    count("files_over_limit", left_out)
+    print(f"Limit {key}={value} reached: {left_out} file{'s' if left_out != 1 else ''} left out",
+          file=sys.stderr)
+
+
+def _read_file(file_path: Path, repo_path: Path, cache=None, st=None,
+               max_file_bytes=DEFAULT_MAX_FILE_BYTES):
+    """Read one file; returns (relative_path, size, content, problem).
+
+    `problem` is None, "binary" or "error". The file is stat'ed at most once
+    (not at all if `st` is given). Runs on worker threads with --jobs.
+    """
+    relative_path = file_path
+    try:
+        # a symlink can resolve outside the root: skip it like an unreadable file
+        relative_path = file_path.relative_to(repo_path)
+        if st is None:
+            st = file_path.stat()
+        record = cached_read(
+            cache, file_path, f"file:{max_file_bytes}",
+            lambda: load_file(file_path, max_file_bytes, st.st_size), st
+        )
+        return relative_path, record["size"], record["content"], _problem(record)
+    except PermissionError:
+        # not cached: permissions can change without touching mtime
+        size = st.st_size if st is not None else 0
+        return relative_path, size, binary_placeholder(file_path.name), "binary"
+    except Exception:
+        return relative_path, None, None, "error"
+
+
+def _problem(record: dict):
+    return "binary" if record["binary"] else None
+
+
+def _shard_size(value: str):
+    try:
+        return parse_shard_size(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,229 @@
+"""Compressed package files: a streaming writer and a matching reader.
+
+gzip, bz2 and xz come from the standard library; zstd needs the `zstandard`
+package (or Python 3.14's compression.zstd). The writer encodes text on the
+caller's thread and compresses on a background thread, so compression overlaps
+with reading and rendering the next files; a bounded queue keeps memory flat
+when the compressor is the slower side.
+"""
+
+from __future__ import annotations
+
+import io
+import queue
+import threading
+from pathlib import Path
+from typing import BinaryIO, Optional, TextIO, Union
+
+from .profiling import count
+
+CODECS = ("gzip", "bz2", "xz", "zstd")
+
+# file suffix written for each codec (batch mode appends it to the output name)
+SUFFIXES = {"gzip": ".gz", "bz2": ".bz2", "xz": ".xz", "zstd": ".zst"}
+
+_EXTENSIONS = {
+    ".gz": "gzip", ".gzip": "gzip",
+    ".bz2": "bz2",
+    ".xz": "xz", ".lzma": "xz",
+    ".zst": "zstd", ".zstd": "zstd",
+}
+
+# first bytes of each format, for reading files whatever their name
+_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
+
+_CHUNK = 1 << 20  # text is handed to the compressor in about 1 MiB pieces
+_QUEUE_CHUNKS = 8
+
+
+def codec_for(path: Optional[str], compress: Optional[str] = None) -> Optional[str]:
+    """The codec to write `path` with: `compress` if given ("none" disables), else by extension."""
+    if compress is not None:
+        if compress == "none":
+            return None
+        if compress not in CODECS:
+            raise ValueError(f"Unknown compression: {compress} (choose from {', '.join(CODECS)})")
+        return compress
+    if path is None:
+        return None
+    return _EXTENSIONS.get(Path(path).suffix.lower())
+
+
+def check_codec(codec: Optional[str]) -> None:
+    """Raise RuntimeError early if `codec` needs a module that is not installed."""
+    if codec == "zstd":
+        _zstd()
+
+
+class CompressedWriter(io.TextIOBase):
+    """Text sink that UTF-8 encodes and compresses into `raw` on a background thread.
+
+    close() finishes the stream and closes `raw` unless `close_raw` is False
+    (e.g. for stdout); errors from the compressor thread surface on the next
+    write() or on close().
+    """
+
+    def __init__(self, raw: BinaryIO, codec: str, level: Optional[int] = None,
+                 close_raw: bool = True):
+        self._raw = raw
+        self._close_raw = close_raw
+        try:
+            self._stream = _compressor(codec, raw, level)
+        except BaseException:
+            if close_raw:
+                raw.close()
+            raise
+        self._pending: list = []
+        self._pending_chars = 0
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=_QUEUE_CHUNKS)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="rcpack-compress", daemon=True)
+        self._thread.start()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+        if self._error is not None:
+            raise self._error
+        self._pending.append(text)
+        self._pending_chars += len(text)
+        if self._pending_chars >= _CHUNK:
+            self._hand_off()
+        return len(text)
+
+    def flush(self) -> None:
+        # data is only guaranteed on disk after close(); flushing mid-stream
+        # would cost compression ratio for no benefit
+        pass
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            self._hand_off()
+        finally:
+            self._queue.put(None)
+            self._thread.join()
+            super().close()
+        if self._error is not None:
+            raise self._error
+
+    def _hand_off(self) -> None:
+        if self._pending:
+            text = "".join(self._pending)
+            self._pending = []
+            self._pending_chars = 0
+            # one big write still reaches the compressor in pieces, so it can
+            # start while the rest is being encoded
+            for start in range(0, len(text), _CHUNK):
+                self._put(text[start:start + _CHUNK].encode("utf-8"))
+
+    def _put(self, data: bytes) -> None:
+        # block while the compressor is behind, but notice if it has died
+        while True:
+            if self._error is not None:
+                raise self._error
+            try:
+                self._queue.put(data, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self) -> None:
+        finished = False
+        try:
+            while True:
+                data = self._queue.get()
+                if data is None:
+                    finished = True
+                    break
+                count("bytes_compressed", len(data))
+                self._stream.write(data)
+            self._stream.close()
+            if self._close_raw:
+                self._raw.close()
+            else:
+                self._raw.flush()
+        except BaseException as exc:  # reported to the writing thread
+            self._error = exc
+            # keep draining so a blocked put() can see the error; once close()
+            # has sent the end marker nothing more will come
+            while not finished and self._queue.get() is not None:
+                pass
+
+
+def open_package(path: Union[str, Path], encoding: str = "utf-8") -> TextIO:
+    """Open a package for reading as text, decompressing gzip, bz2, xz or zstd.
+
+    The format is detected from the file's first bytes, so the name does not
+    matter; uncompressed files are opened as they are. Line endings are not
+    translated, so the text is exactly what was written.
+    """
+    with open(path, "rb") as f:
+        head = f.read(8)
+    codec = next((name for magic, name in _MAGIC if head.startswith(magic)), None)
+    if codec is None:
+        return open(path, "r", encoding=encoding, newline="")
+    return io.TextIOWrapper(_decompressor(codec, path), encoding=encoding, newline="")
+
+
+def read_package(path: Union[str, Path], encoding: str = "utf-8") -> str:
+    """Read a whole (possibly compressed) package as text."""
+    with open_package(path, encoding) as f:
+        return f.read()
+
+
+def _compressor(codec: str, raw: BinaryIO, level: Optional[int]) -> BinaryIO:
+    if codec == "gzip":
+        import gzip
+        # no name or mtime in the header: identical input gives identical output
+        return gzip.GzipFile(filename="", fileobj=raw, mode="wb", compresslevel=level or 6, mtime=0)
+    if codec == "bz2":
+        import bz2
+        return bz2.BZ2File(raw, "wb", compresslevel=level or 9)
+    if codec == "xz":
+        import lzma
+        return lzma.LZMAFile(raw, "wb", preset=level)
+    if codec == "zstd":
+        zstd = _zstd()
+        if zstd.__name__ == "zstandard":
+            return zstd.ZstdCompressor(level=level or 3).stream_writer(raw, closefd=False)
+        return zstd.ZstdFile(raw, "wb", level=level)
+    raise ValueError(f"Unknown compression: {codec}")
+
+
+def _decompressor(codec: str, path: Union[str, Path]) -> BinaryIO:
+    if codec == "gzip":
+        import gzip
+        return gzip.open(path, "rb")
+    if codec == "bz2":
+        import bz2
+        return bz2.open(path, "rb")
+    if codec == "xz":
+        import lzma
+        return lzma.open(path, "rb")
+    zstd = _zstd()
+    if zstd.__name__ == "zstandard":
+        return zstd.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return zstd.ZstdFile(path, "rb")
+
+
+def _zstd():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        pass
+    try:
+        from compression import zstd  # Python 3.14+
+        return zstd
+    except ImportError:
+        raise RuntimeError("zstandard not installed; run `pip install zstandard`") from None
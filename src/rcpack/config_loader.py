@@ -5,41 +5,37 @@ TOML config loader for Repo-Contextor.
 Rules:
 - Look for .repo-contextor.toml in the CURRENT directory
 - If missing: ignore
-- If present but invalid: print a clear error and exit(1)
+- If present but invalid: raise ValueError naming the file (entry points report it)
 - Only recognized keys are applied; unknown keys ignored
 - Precedence: CLI > TOML > DEFAULTS
 """
 from __future__ import annotations
-import os, sys
+import os
 from typing import Dict, Iterable, Any
 
-try:
-    import tomllib
-    _loads = tomllib.loads
-except ModuleNotFoundError:
+def _need_toml():
+    # imported on demand: tomllib pulls in datetime and re, and most runs have no dotfile
     try:
-        import tomli
-        _loads = tomli.loads
+        import tomllib
+        return tomllib.loads
     except ModuleNotFoundError:
-        _loads = None
-
-def _need_toml():
-    if _loads is None:
-        print("Error: TOML parser not available. Use Python 3.11+ or `pip install tomli`.", file=sys.stderr)
-        sys.exit(1)
+        try:
+            import tomli
+            return tomli.loads
+        except ModuleNotFoundError:
+            raise ValueError("TOML parser not available; use Python 3.11+ or run `pip install tomli`") from None
 
 def _load_toml(dotfile: str) -> Dict[str, Any]:
-    _need_toml()
     if not os.path.exists(dotfile):
         return {}
+    _loads = _need_toml()
     try:
         with open(dotfile, "rb") as f:
             raw = f.read().decode("utf-8", errors="strict")
         data = _loads(raw)
         return data if isinstance(data, dict) else {}
     except Exception as e:
-        print(f"Error: failed to parse {dotfile} as TOML.\n{e}", file=sys.stderr)
-        sys.exit(1)
+        raise ValueError(f"failed to parse {dotfile} as TOML: {e}") from None
 
 def _filter_known(d: Dict[str, Any], known: Iterable[str]) -> Dict[str, Any]:
     ks = set(known)
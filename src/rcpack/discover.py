@@ -1,8 +1,12 @@
 """File discovery module for repository analysis."""
 
+import os
 from pathlib import Path
-from typing import List
-import fnmatch
+from typing import AbstractSet, Callable, Iterator, List, Optional, Tuple
+
+from .gitinfo import list_worktree_files
+from .patterns import PathFilter, load_git_ignores
+from .profiling import count
 
 
 def discover_files(
@@ -10,13 +14,19 @@ def discover_files(
     root: Path,
     include_patterns: List[str],
     exclude_patterns: List[str],
+    respect_gitignore: bool = True,
+    use_git: bool = True,
 ) -> List[Path]:
     """Discover relevant files.
 
     - inputs: list of files/dirs to scan
     - root: common project root; patterns are matched against POSIX paths relative to root
     - include_patterns: glob patterns to include (if empty, use sensible defaults)
-    - exclude_patterns: glob patterns to exclude
+    - exclude_patterns: glob patterns to exclude; a leading "!" re-includes
+    - respect_gitignore: also skip paths ignored by root/.gitignore and .git/info/exclude
+    - use_git: list directories inside a git work tree with one `git ls-files`
+      call instead of walking them (requires respect_gitignore); falls back to
+      the directory walker when git is unavailable
     Returns a list of absolute Paths to files.
     """
 
@@ -41,42 +51,158 @@ def discover_files(
         '.idea', '.vscode', '.vs', 'coverage', '.coverage'
     }
 
-    def matches_any(patterns: List[str], rel_posix: str) -> bool:
-        return any(fnmatch.fnmatch(rel_posix, pat) for pat in patterns)
+    def make_should_take(path_filter: PathFilter):
+        has_includes = bool(path_filter.includes)
+
+        def should_take(rel_posix: str, name: str, check_parents: bool = False) -> bool:
+            if path_filter.excluded(rel_posix, check_parents):
+                return False
+            if has_includes:
+                return path_filter.included(rel_posix)
+            # default include logic
+            return name in always_include_names or _suffix(name).lower() in default_include_exts
+
+        return should_take
+
+    walk_filter = PathFilter(
+        include_patterns,
+        exclude_patterns,
+        load_git_ignores(root) if respect_gitignore else None,
+    )
+    # git has already applied every ignore rule (nested .gitignore files
+    # included) and keeps tracked files even when they match one
+    git_take = None
+    if use_git and respect_gitignore:
+        git_take = make_should_take(PathFilter(include_patterns, exclude_patterns))
+
+    return sorted(_iter_discovered(
+        inputs, root, skip_dir_names, make_should_take(walk_filter), walk_filter.skip_dir, git_take
+    ))
 
-    def should_take(file_path: Path) -> bool:
-        rel_posix = file_path.relative_to(root).as_posix()
-        if exclude_patterns and matches_any(exclude_patterns, rel_posix):
-            return False
-        if include_patterns:
-            return matches_any(include_patterns, rel_posix)
-        # default include logic
-        return file_path.name in always_include_names or file_path.suffix.lower() in default_include_exts
 
-    discovered: list[Path] = []
+def _iter_discovered(
+    inputs, root, skip_dir_names, should_take, skip_dir, git_take=None
+) -> Iterator[Path]:
+    """Lazily yield unique absolute Paths of the files selected by `should_take`.
+
+    Candidate files are tallied locally and reported once, when the generator
+    finishes, as the "files_scanned" and "files_pruned" counters.
+    """
     seen = set()
+    scanned = 0
+    taken = 0
 
-    for item in inputs:
-        p = item.resolve()
-        if p.is_file():
+    try:
+        for item in inputs:
+            p = item.resolve()
             # Skip if excluded or in skipped directory
             if any(part in skip_dir_names for part in p.parts):
                 continue
-            if should_take(p):
-                key = p.as_posix()
-                if key not in seen:
-                    seen.add(key)
-                    discovered.append(p)
-        elif p.is_dir():
-            for child in p.rglob('*'):
-                if not child.is_file():
+            if p.is_file():
+                scanned += 1
+                if should_take(p.relative_to(root).as_posix(), p.name, check_parents=True):
+                    taken += 1
+                    key = p.as_posix()
+                    if key not in seen:
+                        seen.add(key)
+                        yield p
+            elif p.is_dir():
+                rel_dir = p.relative_to(root).as_posix()
+                prefix = "" if rel_dir == "." else rel_dir + "/"
+                listed = list_worktree_files(p) if git_take is not None else None
+                if listed is not None:
+                    scanned += len(listed)
+                    for rel in listed:
+                        parts = rel.split("/")
+                        if any(part in skip_dir_names for part in parts):
+                            continue
+                        if not git_take(prefix + rel, parts[-1]):
+                            continue
+                        taken += 1
+                        path = p / rel
+                        # git tracks a symlink itself, not what it points to; as in
+                        # the walker, follow it only if it stays inside the root
+                        if os.path.islink(path):
+                            path = path.resolve()
+                            if not path.is_relative_to(root):
+                                continue
+                        key = path.as_posix()
+                        if key not in seen:
+                            seen.add(key)
+                            yield path
                     continue
-                if any(part in skip_dir_names for part in child.parts):
+                if prefix and skip_dir(prefix[:-1]):
                     continue
-                if should_take(child):
-                    key = child.resolve().as_posix()
+                for entry, rel_posix in _scan_tree(str(p), prefix, skip_dir_names, skip_dir):
+                    scanned += 1
+                    if not should_take(rel_posix, entry.name):
+                        continue
+                    taken += 1
+                    # Only symlinks can point outside the (already resolved) walk root
+                    path = Path(entry.path)
+                    if entry.is_symlink():
+                        path = path.resolve()
+                        if not path.is_relative_to(root):
+                            continue
+                    key = path.as_posix()
                     if key not in seen:
                         seen.add(key)
-                        discovered.append(child.resolve())
+                        yield path
+    finally:
+        count("files_scanned", scanned)
+        count("files_pruned", scanned - taken)
+
+
+def _scan_tree(
+    top: str,
+    prefix: str,
+    skip_dir_names: AbstractSet[str],
+    skip_dir: Optional[Callable[[str], bool]] = None,
+) -> Iterator[Tuple[os.DirEntry, str]]:
+    """Walk `top` with os.scandir, yielding (entry, rel_posix) for every file.
+
+    Directories named in `skip_dir_names`, or whose relative path `skip_dir`
+    rejects, are pruned before they are opened, and
+    the type information cached on each DirEntry is reused instead of stat'ing
+    every child. Symlinked directories are not followed (matching Path.rglob).
+    Pruned directories are reported as the "dirs_pruned" counter.
+    """
+    stack = [(top, prefix)]
+    pruned = 0
+    try:
+        while stack:
+            dir_path, dir_prefix = stack.pop()
+            try:
+                with os.scandir(dir_path) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            subdirs = []
+            for entry in entries:
+                name = entry.name
+                if name in skip_dir_names:
+                    pruned += 1
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        rel_dir = dir_prefix + name
+                        if skip_dir is None or not skip_dir(rel_dir):
+                            subdirs.append((entry.path, rel_dir + "/"))
+                        else:
+                            pruned += 1
+                    elif entry.is_file():
+                        yield entry, dir_prefix + name
+                except OSError:
+                    continue
+            # reversed so the stack pops subdirectories in scandir order
+            stack.extend(reversed(subdirs))
+    finally:
+        count("dirs_pruned", pruned)
+
 
-    return sorted(discovered)
\ No newline at end of file
+def _suffix(name: str) -> str:
+    """Return the same suffix as PurePath(name).suffix without building a Path."""
+    i = name.rfind(".")
+    if 0 < i < len(name) - 1:
+        return name[i:]
+    return ""
@@ -0,0 +1,79 @@
+"""`repo-contextor extract`: read files out of an rcpack container.
+
+Extracting one file binary-searches the pack's index and decompresses only
+that file, however large the pack is. Without a path the pack is listed or
+converted, file by file, to one of the text formats.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from typing import List, Optional
+
+from .io_utils import open_binary_output, open_output
+from .packfile import PackError, PackReader, convert_pack
+
+_CONVERT_FORMATS = ("markdown", "text", "json", "jsonl")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="repo-contextor extract",
+        description="Extract files from an rcpack file (written with -f rcpack) or convert it"
+    )
+    parser.add_argument("pack", help="The .rcpack file")
+    parser.add_argument("paths", nargs="*", help="Files to extract, as listed by --list")
+    parser.add_argument("-o", "--output", help="Output file path (default: stdout)")
+    parser.add_argument(
+        "-f", "--format",
+        choices=_CONVERT_FORMATS,
+        default=None,
+        help="Convert the whole pack to this format instead of extracting files"
+    )
+    parser.add_argument("-l", "--list", action="store_true",
+                        help="List the files in the pack with their sizes")
+    args = parser.parse_args(argv)
+    if sum(bool(x) for x in (args.paths, args.format, args.list)) != 1:
+        parser.error("give file paths, --format or --list")
+
+    try:
+        with PackReader(args.pack) as pack:
+            if args.list:
+                _list(pack, args.output)
+            elif args.format:
+                _convert(pack, args.format, args.output)
+            else:
+                _extract(pack, args.paths, args.output)
+    except PackError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    except KeyError as e:
+        print(f"Error: not in {args.pack}: {e.args[0]}", file=sys.stderr)
+        sys.exit(1)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def _extract(pack: PackReader, paths: List[str], output: Optional[str]) -> None:
+    # look everything up first, so a bad path writes nothing
+    blobs = [pack.read_bytes(path) for path in paths]
+    with open_binary_output(output) as out:
+        for blob in blobs:
+            out.write(blob)
+
+
+def _list(pack: PackReader, output: Optional[str]) -> None:
+    with open_output(output) as out:
+        for entry in pack.entries():
+            codec = entry.codec or "stored"
+            out.write(f"{entry.length:>10}  {entry.stored:>10}  {codec:<6}  {entry.path}\n")
+
+
+def _convert(pack: PackReader, fmt: str, output: Optional[str]) -> None:
+    fmt = "markdown" if fmt == "text" else fmt
+    with open_output(output) as out:
+        convert_pack(pack, fmt, out)
+        if not output and fmt == "json":
+            out.write("\n")
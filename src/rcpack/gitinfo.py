@@ -1,20 +1,62 @@
 from __future__ import annotations
 
-import subprocess
+import os
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 
 
-def _git(cmd: list[str], cwd: Path) -> str:
+def _check_allowed(cmd: list[str]) -> None:
     # Validate git commands to prevent injection
     allowed_commands = {
-        "rev-parse", "show", "log", "status", "branch", "config"
+        "rev-parse", "show", "log", "status", "branch", "config", "ls-files", "diff",
+        "cat-file"
     }
     if not cmd or cmd[0] not in allowed_commands:
         raise ValueError(f"Git command not allowed: {cmd[0] if cmd else 'empty'}")
-    
-    out = subprocess.check_output(["git", *cmd], cwd=str(cwd), timeout=30)
-    return out.decode("utf-8", errors="replace").strip()
+
+
+def _git_bytes(cmd: list[str], cwd: Path, input: Optional[bytes] = None) -> bytes:
+    _check_allowed(cmd)
+    import subprocess  # deferred: only runs that actually call git pay for it
+
+    return subprocess.check_output(
+        ["git", *cmd], cwd=str(cwd), timeout=30, stderr=subprocess.DEVNULL, input=input
+    )
+
+
+def _git(cmd: list[str], cwd: Path) -> str:
+    return _git_bytes(cmd, cwd).decode("utf-8", errors="replace").strip()
+
+
+def _git_records(cmd: list[str], cwd: Path) -> Iterator[bytes]:
+    """Stream NUL-separated records from a git command's stdout.
+
+    Closing the iterator early terminates git, so long outputs (e.g. the whole
+    history) are only read as far as the caller needs.
+    """
+    _check_allowed(cmd)
+    import subprocess
+
+    proc = subprocess.Popen(
+        ["git", *cmd], cwd=str(cwd), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    try:
+        pending = b""
+        while True:
+            chunk = proc.stdout.read1(64 * 1024)
+            if not chunk:
+                break
+            *records, pending = (pending + chunk).split(b"\0")
+            yield from records
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, ["git", *cmd])
+        if pending:
+            yield pending
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
 
 
 def is_git_repo(path: Path) -> bool:
@@ -25,19 +67,53 @@ def is_git_repo(path: Path) -> bool:
         return False
 
 
+def list_worktree_files(path: Path) -> Optional[List[str]]:
+    """
+    List tracked plus untracked-but-not-ignored files under `path` with a single
+    `git ls-files` call, as POSIX paths relative to `path`. Tracked files that
+    were deleted from the working tree are left out.
+
+    Returns None if git is unavailable or `path` is not inside a work tree.
+    """
+    try:
+        out = _git_bytes(
+            ["ls-files", "-z", "-t", "--cached", "--others", "--deleted", "--exclude-standard"],
+            cwd=path,
+        )
+    except Exception:
+        return None
+
+    # Each record is "<tag> <path>"; deleted files are listed once as cached
+    # ("H") and once more as removed ("R").
+    listed: Dict[str, None] = {}
+    deleted = set()
+    for record in out.split(b"\0"):
+        if len(record) < 3:
+            continue
+        rel = os.fsdecode(record[2:])
+        if record[:1] == b"R":
+            deleted.add(rel)
+        else:
+            listed[rel] = None
+    return [rel for rel in listed if rel not in deleted]
+
+
 def get_git_info(path: Path) -> Dict[str, Any]:
     """
-    Return info for the current HEAD of a repo rooted at `path`.
+    Return info for the current HEAD of a repo rooted at `path`, read with a
+    single `git log -1` call.
     """
     try:
-        commit = _git(["rev-parse", "HEAD"], cwd=path)
-        branch = _git(["rev-parse", "--abbrev-ref", "HEAD"], cwd=path)
-        author = _git(["show", "-s", "--format=%an <%ae>"], cwd=path)
-        date = _git(["show", "-s", "--date=local", "--format=%ad"], cwd=path)
+        out = _git(
+            ["log", "-1", "--no-show-signature", "--date=local",
+             "--format=%H%x00%D%x00%an <%ae>%x00%ad"],
+            cwd=path,
+        )
+        commit, refs, author, date = out.split("\0")
         return {
             "is_repo": True,
             "commit": commit,
-            "branch": branch,
+            "branch": _branch_from_refs(refs),
             "author": author,
             "date": date,
             "note": None,
@@ -52,3 +128,259 @@ def get_git_info(path: Path) -> Dict[str, Any]:
             "date": None,
             "note": "Not a git repository",
         }
+
+
+def _branch_from_refs(refs: str) -> str:
+    """Pick the checked-out branch from %D decorations ("HEAD -> main, origin/main").
+
+    A detached HEAD yields "HEAD", like `git rev-parse --abbrev-ref HEAD`.
+    """
+    for ref in refs.split(", "):
+        if ref.startswith("HEAD -> "):
+            return ref[len("HEAD -> "):]
+    return "HEAD"
+
+
+def get_file_commits(path: Path, files: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, str]]:
+    """
+    Return {relative_path: {"author", "date"}} for the last commit touching each
+    file under `path`, from a single `git log --name-only` pass.
+
+    When `files` (POSIX paths relative to `path`) is given, only those are
+    reported and the history is read only until all of them have been seen.
+    Returns an empty dict when `path` is not in a git repository.
+    """
+    wanted = set(files) if files is not None else None
+    if wanted is not None and not wanted:
+        return {}
+    found: Dict[str, Dict[str, str]] = {}
+    entries = _log_name_only(path, "%an <%ae>%x00%ad", ["--date=local"])
+    try:
+        for (author, date), rel in entries:
+            if rel not in found and (wanted is None or rel in wanted):
+                # no shared objects (YAML would alias them)
+                found[rel] = {"author": author, "date": date}
+                if wanted is not None and len(found) == len(wanted):
+                    break
+    except Exception:
+        return {}
+    finally:
+        entries.close()
+    return found
+
+
+def get_recent_commits(path: Path, window_seconds: float) -> Optional[Dict[str, int]]:
+    """
+    Return {relative_path: commit_timestamp} for files under `path` committed
+    within the last `window_seconds`, newest commit per file, from one
+    `git log --since --name-only` pass. None if `path` is not in a git repository.
+    """
+    recent: Dict[str, int] = {}
+    entries = _log_name_only(path, "%ct", [f"--since={int(window_seconds)} seconds ago"])
+    try:
+        for (timestamp,), rel in entries:
+            recent.setdefault(rel, int(timestamp))
+    except Exception:
+        return None
+    finally:
+        entries.close()
+    return recent
+
+
+def get_dirty_files(path: Path) -> Optional[List[str]]:
+    """
+    Return files under `path` (POSIX, relative to `path`) whose working-tree
+    state differs from HEAD: modified, staged or untracked-but-not-ignored.
+    None if `path` is not in a git work tree.
+    """
+    top = _find_worktree_top(path)
+    if top is None:
+        return None
+    prefix = path.resolve().relative_to(top).as_posix()
+    prefix = "" if prefix == "." else prefix + "/"
+    try:
+        out = _git_bytes(["status", "--porcelain", "-z", "-uall", "--no-renames", "--", "."], cwd=path)
+    except Exception:
+        return None
+    dirty = []
+    # porcelain records are "XY <path>" relative to the top of the work tree
+    for record in out.split(b"\0"):
+        if len(record) < 4 or b"D" in record[:2]:
+            continue
+        rel = os.fsdecode(record[3:])
+        if rel.startswith(prefix):
+            dirty.append(rel[len(prefix):])
+    return dirty
+
+
+def get_worktree_state(path: Path) -> Optional[str]:
+    """
+    Return a digest of the uncommitted state of the work tree under `path`,
+    from one `git status --porcelain` call plus the size and modification time
+    of each modified or untracked file, so editing an already-modified file
+    changes it too. With the HEAD commit it identifies what a package of `path`
+    would hold. None if `path` is not in a git work tree.
+    """
+    top = _find_worktree_top(path)
+    if top is None:
+        return None
+    try:
+        out = _git_bytes(["status", "--porcelain", "-z", "-uall", "--no-renames", "--", "."], cwd=path)
+    except Exception:
+        return None
+    import hashlib
+
+    digest = hashlib.blake2b(out, digest_size=16)
+    # porcelain records are "XY <path>" relative to the top of the work tree
+    for record in out.split(b"\0"):
+        if len(record) < 4 or b"D" in record[:2]:
+            continue
+        try:
+            st = (top / os.fsdecode(record[3:])).stat()
+        except OSError:
+            continue
+        digest.update(b"%d:%d\0" % (st.st_size, st.st_mtime_ns))
+    return digest.hexdigest()
+
+
+def get_changed_files(path: Path, rev: str) -> Optional[List[Dict[str, str]]]:
+    """
+    Return the files under `path` that differ for `rev`, from one
+    `git diff --name-status` call. A range ("main..HEAD", "main...HEAD")
+    compares two commits; a single ref compares it with the working tree, and
+    untracked-but-not-ignored files are then listed as added too.
+
+    Each entry is {"status", "path"} plus "old_path" for renames and copies;
+    status is git's letter (A, C, D, M, R, T) and paths are POSIX, relative to
+    `path`, in git's order. None if `path` is not in a git repository or `rev`
+    is unknown.
+    """
+    _check_rev(rev)
+    try:
+        out = _git_bytes(
+            ["diff", "--name-status", "-z", "--relative", "-M", rev, "--", "."], cwd=path
+        )
+    except Exception:
+        return None
+
+    changes: List[Dict[str, str]] = []
+    records = iter(out.split(b"\0"))
+    for record in records:
+        if not record:
+            continue
+        # "R100" and "C075" carry a similarity score and two paths: old, new
+        status = record[:1].decode("ascii", errors="replace")
+        entry = {"status": status}
+        if status in ("R", "C"):
+            entry["old_path"] = os.fsdecode(next(records, b""))
+        entry["path"] = os.fsdecode(next(records, b""))
+        changes.append(entry)
+
+    if range_end(rev) is None:
+        try:
+            out = _git_bytes(["ls-files", "-z", "--others", "--exclude-standard"], cwd=path)
+        except Exception:
+            return None
+        changes.extend({"status": "A", "path": os.fsdecode(record)}
+                       for record in out.split(b"\0") if record)
+    return changes
+
+
+def get_diff_patch(path: Path, rev: str) -> Optional[str]:
+    """
+    Return the unified diff for `rev` under `path`, as get_changed_files
+    selects it (untracked files are not part of it). External diff drivers and
+    textconv filters are bypassed. None if git fails.
+    """
+    _check_rev(rev)
+    try:
+        out = _git_bytes(
+            ["diff", "--no-color", "--no-ext-diff", "--no-textconv", "--relative", "-M",
+             rev, "--", "."],
+            cwd=path,
+        )
+    except Exception:
+        return None
+    return out.decode("utf-8", errors="replace")
+
+
+def read_blobs(path: Path, rev: str, files: Iterable[str]) -> Optional[Dict[str, bytes]]:
+    """
+    Return {relative_path: bytes} for `files` (POSIX, relative to `path`) as
+    they are at commit `rev`, from one `git cat-file --batch` call. Files that
+    do not exist at `rev` (or are not blobs) are left out; None if git fails.
+    """
+    _check_rev(rev)
+    # the batch protocol is line based, so a name with a newline cannot be asked for
+    names = [rel for rel in files if "\n" not in rel]
+    request = b"".join(os.fsencode(f"{rev}:./{rel}") + b"\n" for rel in names)
+    try:
+        out = _git_bytes(["cat-file", "--batch"], cwd=path, input=request)
+    except Exception:
+        return None
+
+    blobs: Dict[str, bytes] = {}
+    pos = 0
+    for rel in names:
+        end = out.find(b"\n", pos)
+        if end < 0:
+            break
+        header = out[pos:end]
+        pos = end + 1
+        # "<oid> <type> <size>", or "<name> missing" (the name may contain spaces)
+        if header.endswith((b" missing", b" ambiguous")):
+            continue
+        _, kind, size = header.rsplit(b" ", 2)
+        body = out[pos:pos + int(size)]
+        pos += int(size) + 1
+        if kind == b"blob":
+            blobs[rel] = body
+    return blobs
+
+
+def range_end(rev: str) -> Optional[str]:
+    """The commit a diff range ends at ("HEAD" when omitted); None for a single ref."""
+    for sep in ("...", ".."):
+        if sep in rev:
+            return rev.split(sep, 1)[1] or "HEAD"
+    return None
+
+
+def _check_rev(rev: str) -> None:
+    # a revision starting with "-" would be taken as an option
+    if not rev or rev.startswith("-") or "\n" in rev:
+        raise ValueError(f"Invalid git revision: {rev!r}")
+
+
+def _find_worktree_top(path: Path) -> Optional[Path]:
+    for candidate in (path.resolve(), *path.resolve().parents):
+        if (candidate / ".git").exists():
+            return candidate
+    return None
+
+
+def _log_name_only(path: Path, fmt: str, extra: list[str]) -> Iterator[Tuple[List[str], str]]:
+    """Yield (commit_fields, relative_path) for each file of each commit, newest first.
+
+    `fmt` is a git pretty format whose fields are separated by %x00; paths are
+    relative to `path` and limited to it.
+    """
+    n_fields = fmt.count("%x00") + 1
+    records = _git_records(
+        ["log", "--no-show-signature", "--relative", "--name-only", "-z", "--no-renames",
+         *extra, f"--format=%x01{fmt}", "--", "."],
+        cwd=path,
+    )
+    try:
+        fields: List[str] = []
+        for record in records:
+            if record.startswith(b"\x01"):
+                fields = [record[1:].decode("utf-8", errors="replace")]
+            elif len(fields) < n_fields:
+                fields.append(record.decode("utf-8", errors="replace"))
+            else:
+                rel = os.fsdecode(record.lstrip(b"\n"))
+                if rel:
+                    yield fields, rel
+    finally:
+        records.close()
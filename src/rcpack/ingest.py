@@ -0,0 +1,70 @@
+"""Concurrent file ingestion with deterministic ordering."""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def ordered_map(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    jobs: int = 1,
+    max_in_flight: Optional[int] = None,
+) -> Iterator[R]:
+    """Yield fn(item) for every item, in input order.
+
+    With jobs > 1 the calls run on a thread pool (file reads release the GIL),
+    but results are still yielded in the order of `items`, so the output is
+    identical to a sequential run. At most `max_in_flight` items (default
+    4 * jobs) are submitted ahead of the consumer, which bounds how many file
+    contents are held in memory at once.
+    """
+    if jobs <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor  # not needed for sequential reads
+
+    window = max(max_in_flight or 4 * jobs, 1)
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="rcpack-read") as pool:
+        pending: deque = deque()
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def bounded_map(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    weigh: Callable[[R], int],
+    jobs: int = 1,
+    max_in_flight: Optional[int] = None,
+    max_total: Optional[int] = None,
+) -> Iterator[R]:
+    """ordered_map that stops before the results' combined weight passes `max_total`.
+
+    The first result that does not fit ends the run: it is not yielded and no
+    further items are submitted, so a total-output cap also bounds how much is
+    read. With `max_total` None this is plain ordered_map.
+    """
+    results = ordered_map(fn, items, jobs, max_in_flight)
+    if max_total is None:
+        yield from results
+        return
+    total = 0
+    try:
+        for result in results:
+            total += weigh(result)
+            if total > max_total:
+                return
+            yield result
+    finally:
+        results.close()
@@ -1,19 +1,104 @@
 """I/O utilities for file operations."""
 
+import codecs
+import hashlib
+import mmap
+import os
+import sys
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Tuple
+from typing import BinaryIO, Iterator, Optional, TextIO, Tuple
 
+from .compress import CompressedWriter, codec_for
+from .profiling import count
+
+
+def write_output(output_path: Optional[str], content: str, compress: Optional[str] = None) -> None:
+    """Write content to output file (stdout if None), compressed as codec_for decides."""
+    with open_output(output_path, compress) as f:
+        f.write(content)
+
+
+def replace_output(output_path: str, content: str, compress: Optional[str] = None) -> None:
+    """Write content to a temporary file and atomically move it over output_path.
+
+    Readers of output_path never observe a partially written package.
+    """
+    output_file = Path(output_path)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = output_file.with_name(f".{output_file.name}.{os.getpid()}.rcpack-tmp")
+    codec = codec_for(output_path, compress)
+    try:
+        if codec is None:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(content)
+        else:
+            with CompressedWriter(open(tmp_file, 'wb'), codec) as f:
+                f.write(content)
+        os.replace(tmp_file, output_file)
+    finally:
+        if tmp_file.exists():
+            tmp_file.unlink()
+
+
+@contextmanager
+def open_output(output_path: Optional[str], compress: Optional[str] = None) -> Iterator[TextIO]:
+    """Open a text sink for incremental writes: the output file, or stdout if None.
+
+    The sink compresses on a background thread when `compress` names a codec
+    or, without it, when the file name ends in .gz, .bz2, .xz or .zst.
+    """
+    codec = codec_for(output_path, compress)
+    if output_path is None:
+        if codec is None:
+            yield sys.stdout
+            sys.stdout.flush()
+            return
+        sys.stdout.flush()
+        with CompressedWriter(sys.stdout.buffer, codec, close_raw=False) as f:
+            yield f
+        return
 
-def write_output(output_path: str, content: str) -> None:
-    """Write content to output file."""
     output_file = Path(output_path)
-    
+
     # Create parent directories if they don't exist
     output_file.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Write content
+
+    if codec is not None:
+        with CompressedWriter(open(output_file, 'wb'), codec) as f:
+            yield f
+        return
     with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(content)
+        yield f
+
+
+@contextmanager
+def open_binary_output(output_path: Optional[str]) -> Iterator[BinaryIO]:
+    """Open a binary sink: the output file (parents created), or stdout if None."""
+    if output_path is None:
+        sys.stdout.flush()
+        yield sys.stdout.buffer
+        sys.stdout.buffer.flush()
+        return
+    output_file = Path(output_path)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'wb') as f:
+        yield f
+
+
+# Bytes that count as text for the binary heuristic: printable ASCII plus
+# tab, LF and CR. bytes.translate deletes them in C, leaving the rest to count.
+_TEXT_BYTES = bytes(range(32, 127)) + b"\t\n\r"
+_UTF8_TEXT_BYTES = _TEXT_BYTES + bytes(range(128, 256))
+
+# Longest BOMs first: the UTF-32-LE BOM starts with the UTF-16-LE one
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
 
 
 def is_binary_file(path: Path, sniff_bytes: int = 2048) -> bool:
@@ -21,11 +106,9 @@ def is_binary_file(path: Path, sniff_bytes: int = 2048) -> bool:
     try:
         with open(path, 'rb') as fb:
             chunk = fb.read(sniff_bytes)
-        if b"\x00" in chunk:
-            return True
-        # If the chunk has a lot of non-text bytes, consider it binary
-        text_byte_count = sum(32 <= b <= 126 or b in (9, 10, 13) for b in chunk)
-        return (len(chunk) - text_byte_count) > max(1, len(chunk) // 3)
+        # a short read is the whole file, so its end must decode too
+        truncated = len(chunk) == sniff_bytes
+        return _trusted_bom(chunk, truncated) is None and _looks_binary(chunk)
     except Exception:
         # If we cannot read, treat as binary to avoid further processing
         return True
@@ -36,20 +119,200 @@ def read_text_safely(path: Path, max_bytes: int = 16_384) -> Tuple[str, str, boo
 
     Returns (content, encoding_used, truncated).
     """
-    truncated = False
-    raw: bytes
+    raw, truncated = read_head(path, max_bytes)
+    text, enc = _decode(raw, truncated)
+    return text, enc, truncated
+
+
+def read_head(path: Path, max_bytes: int = 16_384) -> Tuple[bytes, bool]:
+    """Read at most `max_bytes` of a file; returns (raw, truncated)."""
     with open(path, 'rb') as fb:
         raw = fb.read(max_bytes + 1)
-    if len(raw) > max_bytes:
-        truncated = True
+    count("bytes_read", len(raw))
+    truncated = len(raw) > max_bytes
+    if truncated:
         raw = raw[:max_bytes]
+    return raw, truncated
+
+
+def read_classified(
+    path: Path, max_bytes: int = 16_384, sniff_bytes: int = 2048
+) -> Tuple[Optional[str], Optional[str], bool]:
+    """Classify and decode a file with a single open and read.
+
+    The first `sniff_bytes` of the same buffer feed the binary heuristic and
+    the whole buffer is then decoded. Returns (content, encoding, truncated);
+    content and encoding are None for binary files.
+    """
+    raw, truncated = read_head(path, max_bytes)
+    content, enc = classify_bytes(raw, truncated, sniff_bytes)
+    return content, enc, truncated if content is not None else False
+
+
+def classify_bytes(
+    raw: bytes, truncated: bool = False, sniff_bytes: int = 2048
+) -> Tuple[Optional[str], Optional[str]]:
+    """Decode a buffer read by read_head; returns (None, None) if it looks binary.
+
+    A BOM only marks the buffer as text if the rest decodes with its codec;
+    otherwise the buffer is sniffed like one without a BOM.
+    """
+    if _trusted_bom(raw, truncated) is None and _looks_binary(raw[:sniff_bytes]):
+        return None, None
+    return _decode(raw, truncated)
+
 
-    for enc in ("utf-8", "utf-16", "utf-16-le", "utf-16-be", "latin-1"):
+def content_digest(raw: bytes) -> str:
+    """Short blake2b hex digest identifying a file body, for dedup and caching."""
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def read_excerpt(
+    path: Path, head_bytes: int = 8192, tail_bytes: int = 4096, sniff_bytes: int = 2048
+) -> Tuple[Optional[str], Optional[str], int, bool]:
+    """Read a possibly huge file as a head and tail excerpt.
+
+    Files up to head_bytes + tail_bytes are read whole. Larger ones are
+    memory-mapped: only the head and tail windows are copied, joined by an
+    elision marker, and both cuts fall on a character boundary. Lines are
+    counted over the whole file from the raw bytes, without decoding.
+    Returns (content, encoding, total_lines, elided); content and encoding
+    are None for binary files.
+    """
+    with open(path, 'rb') as fb:
+        size = os.fstat(fb.fileno()).st_size
+        if size <= head_bytes + tail_bytes:
+            raw = fb.read()
+            count("bytes_read", len(raw))
+            return _whole_excerpt(raw, sniff_bytes)
+        with mmap.mmap(fb.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _excerpt(mm, size, head_bytes, tail_bytes, sniff_bytes)
+
+
+def excerpt_bytes(
+    raw: bytes, head_bytes: int = 8192, tail_bytes: int = 4096, sniff_bytes: int = 2048
+) -> Tuple[Optional[str], Optional[str], int, bool]:
+    """read_excerpt for content already in memory, such as a blob read from git."""
+    if len(raw) <= head_bytes + tail_bytes:
+        return _whole_excerpt(raw, sniff_bytes)
+    return _excerpt(raw, len(raw), head_bytes, tail_bytes, sniff_bytes)
+
+
+def _whole_excerpt(raw: bytes, sniff_bytes: int) -> Tuple[Optional[str], Optional[str], int, bool]:
+    content, enc = classify_bytes(raw, False, sniff_bytes)
+    lines = _line_count(raw.count(b"\n"), content) if content is not None else 0
+    return content, enc, lines, False
+
+
+def _excerpt(buf, size: int, head_bytes: int, tail_bytes: int,
+             sniff_bytes: int) -> Tuple[Optional[str], Optional[str], int, bool]:
+    """Head and tail of `buf` (an mmap or bytes) joined by an elision marker."""
+    bom_enc = _bom_encoding(buf[:4])
+    if _trusted_bom(buf[:sniff_bytes], truncated=True) is None and _looks_binary(buf[:sniff_bytes]):
+        return None, None, 0, False
+    head_end = _char_boundary(buf, head_bytes, bom_enc)
+    tail_start = _char_boundary(buf, size - tail_bytes, bom_enc)
+    head = buf[:head_end]
+    tail = buf[tail_start:]
+    count("bytes_read", len(head) + len(tail))
+    newlines = _count_newlines(buf, size)
+    bom = buf[:4] if bom_enc == "utf-32" else buf[:2] if bom_enc == "utf-16" else b""
+
+    head_text, enc = _decode(head, truncated=True)
+    if bom:
+        # the tail has no BOM of its own to tell the byte order
+        tail_text = (bom + tail).decode(enc, errors="replace")
+    else:
+        tail_text = tail.decode(enc, errors="replace")
+    omitted = newlines - head.count(b"\n") - tail.count(b"\n")
+    marker = f"\n[... {tail_start - head_end} bytes, {omitted} lines omitted ...]\n"
+    return head_text + marker + tail_text, enc, _line_count(newlines, tail_text), True
+
+
+def _char_boundary(buf, pos: int, enc: Optional[str]) -> int:
+    """Move `pos` back to the start of a character (code unit for UTF-16/32)."""
+    if enc == "utf-16":
+        return pos - pos % 2
+    if enc == "utf-32":
+        return pos - pos % 4
+    # skip back over at most three UTF-8 continuation bytes (10xxxxxx)
+    for _ in range(3):
+        if pos <= 0 or buf[pos] & 0xC0 != 0x80:
+            break
+        pos -= 1
+    return pos
+
+
+def _count_newlines(buf, size: int, chunk: int = 1 << 20) -> int:
+    return sum(buf[i:i + chunk].count(b"\n") for i in range(0, size, chunk))
+
+
+def _line_count(newlines: int, text_end: str) -> int:
+    # a final line without a trailing newline still counts
+    return newlines + (1 if text_end and not text_end.endswith("\n") else 0)
+
+
+def _looks_binary(chunk: bytes) -> bool:
+    if b"\x00" in chunk:
+        return True
+    # If the chunk has a lot of non-text bytes, consider it binary
+    non_text_count = len(chunk.translate(None, _TEXT_BYTES))
+    if non_text_count <= max(1, len(chunk) // 3):
+        return False
+    # mostly non-ASCII is still text when it is valid UTF-8 (the sniffed
+    # window may end mid character); then only control bytes count against it
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(chunk, final=False)
+    except UnicodeDecodeError:
+        return True
+    return len(chunk.translate(None, _UTF8_TEXT_BYTES)) > max(1, len(chunk) // 3)
+
+
+def _bom_encoding(raw: bytes) -> Optional[str]:
+    for bom, enc in _BOMS:
+        if raw.startswith(bom):
+            return enc
+    return None
+
+
+def _trusted_bom(raw: bytes, truncated: bool) -> Optional[str]:
+    """The codec of `raw`'s BOM if the buffer really decodes with it, else None.
+
+    A character cut off by truncation at the end does not count against it.
+    """
+    enc = _bom_encoding(raw)
+    if enc is None:
+        return None
+    try:
+        codecs.getincrementaldecoder(enc)().decode(raw, final=not truncated)
+    except UnicodeDecodeError:
+        return None
+    return enc
+
+
+def _decode(raw: bytes, truncated: bool) -> Tuple[str, str]:
+    """Decode with the BOM's codec, else UTF-8, else latin-1 (which never fails).
+
+    A multi-byte character cut in half by truncation is dropped rather than
+    sending the whole buffer to the fallback codec.
+    """
+    enc = _bom_encoding(raw)
+    if enc in ("utf-16", "utf-32"):
         try:
-            text = raw.decode(enc)
-            return text, enc, truncated
-        except Exception:
-            continue
-    # Fallback: replace errors with utf-8
-    text = raw.decode("utf-8", errors="replace")
-    return text, "utf-8", truncated
\ No newline at end of file
+            # a truncated buffer can end mid code unit or mid surrogate pair
+            return raw.decode(enc, errors="replace" if truncated else "strict"), enc
+        except UnicodeDecodeError:
+            # bytes that only happen to start like a BOM
+            count("encoding_fallbacks")
+            return raw.decode("latin-1"), "latin-1"
+    enc = enc or "utf-8"
+    try:
+        return raw.decode(enc), enc
+    except UnicodeDecodeError as exc:
+        if truncated and exc.end == len(raw) and exc.reason == "unexpected end of data":
+            try:
+                return raw[:exc.start].decode(enc), enc
+            except UnicodeDecodeError:
+                pass
+    count("encoding_fallbacks")
+    return raw.decode("latin-1"), "latin-1"
@@ -1,129 +1,363 @@
 from __future__ import annotations
 
+import io
+import os
 import sys
 from pathlib import Path
-from typing import Iterable, Tuple
+from typing import Any, Dict, Iterable, Tuple, Union
 
+from rcpack.cache import ContentCache, cached_read
+from rcpack.config_loader import load_config
 from rcpack.discover import discover_files
-from rcpack.gitinfo import get_git_info, is_git_repo
-from rcpack.io_utils import read_text_safely, is_binary_file
-from rcpack.renderer import markdown as md_renderer
-from rcpack.renderer.jsonyaml import render_json, render_yaml
+from rcpack.gitinfo import get_file_commits, get_git_info
+from rcpack.ingest import bounded_map
+from rcpack.profiling import count, span
+from rcpack.io_utils import classify_bytes, content_digest, excerpt_bytes, read_excerpt, read_head
+from rcpack.tokens import BUDGET_NOTE, get_estimator, pack_to_budget, reserve_for
+from rcpack.recent import human_readable_age, recent_changes
+from rcpack.renderer import call_renderer, get_binary_writer, get_renderer, get_writer
 from rcpack.treeview import render_tree
 
+# Ingestion limits shared by the CLI and build_package. Each can be set in
+# .repo-contextor.toml; None means unlimited (or, for max_in_flight, 4 x jobs).
+DEFAULT_LIMITS: Dict[str, Any] = {
+    "max_file_bytes": 1024 * 1024,  # larger files are cut down to a head/tail excerpt
+    "max_files": None,              # package at most this many files, in path order
+    "max_total_bytes": None,        # stop adding files once their content reaches this
+    "jobs": 1,                      # files read in parallel
+    "max_in_flight": None,          # files read ahead of the output
+}
+
+
+def load_limits(cli_cfg: Dict[str, Any] | None = None, dotfile: str = ".repo-contextor.toml") -> Dict[str, Any]:
+    """Resolve DEFAULT_LIMITS with CLI > TOML > defaults precedence.
+
+    `dotfile` is read from the current directory, so only entry points (the
+    CLI, batch and serve) call this; build_package takes the limits as
+    arguments. `cli_cfg` values of None mean "not given". Raises ValueError
+    for a dotfile that is not valid TOML or a value that is not a positive
+    integer.
+    """
+    limits = load_config(
+        dotfile=dotfile, defaults=DEFAULT_LIMITS, cli_cfg=cli_cfg, known_keys=DEFAULT_LIMITS
+    )
+    _check_limits(limits)
+    return limits
+
+
+def _check_limits(limits: Dict[str, Any]) -> None:
+    for key, value in limits.items():
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < 1):
+            raise ValueError(f"{key} must be a positive integer, got {value!r}")
+
 
 def _find_root(inputs: list[str]) -> Path:
     paths = [Path(p) for p in inputs]
     if len(paths) == 1 and Path(paths[0]).is_dir():
         return paths[0].resolve()
     parents = [p if p.is_dir() else p.parent for p in paths]
-    root = Path(*Path.commonpath([str(p.resolve()) for p in parents]).split("/"))
-    return root.resolve()
+    return Path(os.path.commonpath([str(p.resolve()) for p in parents]))
 
 
 def build_package(
     inputs: list[str],
     include_patterns: list[str] | None,
     exclude_patterns: list[str] | None,
-    max_file_bytes: int,
+    max_file_bytes: int | None = None,
     fmt: str = "markdown",
-) -> Tuple[str, dict]:
+    jobs: int | None = None,
+    max_in_flight: int | None = None,
+    cache: ContentCache | None = None,
+    file_commits: bool = False,
+    dedupe: bool = True,
+    max_tokens: int | None = None,
+    tokenizer: str = "heuristic",
+    tree_depth: int | None = None,
+    tree_max_entries: int | None = None,
+    max_files: int | None = None,
+    max_total_bytes: int | None = None,
+    recent_window: float | None = None,
+) -> Tuple[Union[str, bytes], dict]:
+    """Discover, read and render `inputs` as one package; returns (output, stats).
+
+    Limits left as None (max_file_bytes, jobs, max_in_flight, max_files,
+    max_total_bytes) take their DEFAULT_LIMITS value; callers that honour
+    .repo-contextor.toml resolve them with load_limits first. Raises
+    ValueError for a limit that is not a positive integer. `recent_window`
+    (seconds) keeps only files changed within it, as --recent does. Formats
+    with only a streaming writer (jsonl) are rendered into memory; binary
+    formats such as rcpack return bytes.
+    """
+    given = {
+        "max_file_bytes": max_file_bytes, "jobs": jobs, "max_in_flight": max_in_flight,
+        "max_files": max_files, "max_total_bytes": max_total_bytes,
+    }
+    limits = {key: DEFAULT_LIMITS[key] if value is None else value for key, value in given.items()}
+    _check_limits(limits)
+    max_file_bytes, max_files, max_total_bytes = (
+        limits["max_file_bytes"], limits["max_files"], limits["max_total_bytes"]
+    )
     root = _find_root(inputs)
     root_abs = root.resolve()
 
-    repo_info = (
-        get_git_info(root_abs) if is_git_repo(root_abs) else {
-            "is_repo": False,
-            "commit": None,
-            "branch": None,
-            "author": None,
-            "date": None,
-            "note": "Not a git repository",
-        }
-    )
+    # get_git_info already reports non-repositories, so no separate probe
+    with span("git_info"):
+        repo_info = get_git_info(root_abs)
 
-    files = discover_files(
-        inputs=[Path(p) for p in inputs],
-        root=root_abs,
-        include_patterns=include_patterns or [],
-        exclude_patterns=exclude_patterns or [],
-    )
+    with span("discover"):
+        files = discover_files(
+            inputs=[Path(p) for p in inputs],
+            root=root_abs,
+            include_patterns=include_patterns or [],
+            exclude_patterns=exclude_patterns or [],
+        )
+    # a symlink can resolve outside the root; it has no path in the package
+    files = [f for f in files if f.is_relative_to(root_abs)]
+    recent_files: Dict[str, str] = {}
+    if recent_window is not None:
+        from datetime import datetime
+
+        with span("recent"):
+            changed = recent_changes(root_abs, files, recent_window)
+        files = [f for f in files if f in changed]
+        recent_files = {
+            f.relative_to(root_abs).as_posix(): human_readable_age(datetime.fromtimestamp(changed[f]))
+            for f in files
+        }
+    over_limit = 0
+    if max_files is not None and len(files) > max_files:
+        over_limit = len(files) - max_files
+        files = files[:max_files]
     rel_files = [f.relative_to(root_abs) for f in files]
 
-    project_tree = render_tree([p.as_posix() for p in rel_files])
+    with span("tree"):
+        project_tree = render_tree([p.as_posix() for p in rel_files], tree_depth, tree_max_entries)
+
+    commits = {}
+    if file_commits and repo_info["is_repo"]:
+        with span("file_commits"):
+            commits = get_file_commits(root_abs, [p.as_posix() for p in rel_files])
 
     file_sections: list[dict] = []
-    total_lines = 0
-    total_chars = 0
-
-    for f in files:
-        rel = f.relative_to(root_abs).as_posix()
-        try:
-            if is_binary_file(f):
-                content = f"[binary file skipped: {f.name}, {f.stat().st_size} bytes]"
-                file_sections.append({
-                    "path": rel,
-                    "language": _language_from_ext(f.suffix),
-                    "content": content,
-                    "is_truncated": False,
-                })
-                total_chars += len(content)
+    loaded_by_path: dict[str, dict] = {}
+
+    def read_one(f: Path):
+        return _read_section(f, f.relative_to(root_abs).as_posix(), max_file_bytes, cache)
+
+    def weigh(result) -> int:
+        section = result[0]
+        return len(section["content"].encode("utf-8")) if section is not None else 0
+
+    consumed = 0
+    with span("read"):
+        results = bounded_map(
+            read_one, files, weigh, limits["jobs"], limits["max_in_flight"], max_total_bytes
+        )
+        for section, loaded, error in results:
+            consumed += 1
+            if error is not None:
+                print(error, file=sys.stderr)
                 continue
+            if loaded["binary"]:
+                count("binary_skipped")
+            if section["path"] in commits:
+                section["last_commit"] = commits[section["path"]]
+            file_sections.append(section)
+            loaded_by_path[section["path"]] = loaded
+    if consumed < len(files):
+        # max_total_bytes ended the read early; list only what made it in
+        over_limit += len(files) - consumed
+        project_tree = render_tree([s["path"] for s in file_sections], tree_depth, tree_max_entries)
+    if over_limit:
+        count("files_over_limit", over_limit)
 
-            content, used_encoding, truncated = read_text_safely(f, max_bytes=max_file_bytes)
-            total_lines += content.count("\n") + (1 if content and not content.endswith("\n") else 0)
-            total_chars += len(content)
-
-            if truncated:
-                note = f"\n\n[... TRUNCATED to first {max_file_bytes} bytes ...]"
-                content = content + note
-                total_chars += len(note)
-
-            file_sections.append({
-                "path": rel,
-                "language": _language_from_ext(f.suffix),
-                "content": content,
-                "is_truncated": truncated,
-            })
-        except Exception as exc:
-            print(f"[rcpack] error reading {rel}: {exc}", file=sys.stderr)
-            continue
+    estimate = get_estimator(tokenizer)
+    dropped = 0
+    if max_tokens is not None:
+        with span("token_budget"):
+            # the tree of everything discovered is an upper bound for the final one
+            file_sections, _, dropped = pack_to_budget(
+                file_sections, max_tokens, estimate, recent=recent_files,
+                reserved=reserve_for(project_tree, estimate),
+            )
+            project_tree = render_tree(
+                [s["path"] for s in file_sections], tree_depth, tree_max_entries
+            )
+            for s in file_sections:
+                if s["content"].endswith(BUDGET_NOTE):
+                    # cut down: no longer the body its digest describes
+                    loaded_by_path[s["path"]] = {
+                        "lines": s["content"].count("\n") + 1, "digest": None, "bytes": 0
+                    }
+
+    total_lines = sum(loaded_by_path[s["path"]]["lines"] for s in file_sections)
+    bytes_saved = None
+    binary = get_binary_writer(fmt)
+    # a binary container stores each distinct body once by itself
+    if dedupe and binary is None:
+        with span("dedupe"):
+            bytes_saved = _dedupe(file_sections, loaded_by_path)
+    total_chars = sum(len(s.get("content", "")) for s in file_sections)
 
     # render in chosen format
-    if fmt == "markdown":
-        out_text = md_renderer.render_markdown(
-            root=str(root_abs),
-            repo_info=repo_info,
-            tree_text=project_tree,
-            files=file_sections,
-            total_files=len(file_sections),
-            total_lines=total_lines,
-        )
-    elif fmt == "json":
-        out_text = render_json(
-            root=str(root_abs),
-            repo_info=repo_info,
-            tree_text=project_tree,
-            files=file_sections,
-            total_files=len(file_sections),
-            total_lines=total_lines,
-        )
-    elif fmt == "yaml":
-        out_text = render_yaml(
-            root=str(root_abs),
-            repo_info=repo_info,
-            tree_text=project_tree,
-            files=file_sections,
-            total_files=len(file_sections),
-            total_lines=total_lines,
-        )
-    else:
-        raise ValueError(f"Unsupported format: {fmt}")
+    extras: Dict[str, Any] = {"recent_files": recent_files} if recent_files else {}
+    with span("render"):
+        if binary is not None:
+            buf = io.BytesIO()
+            binary(buf, str(root_abs), repo_info, project_tree, file_sections, **extras)
+            out_text = buf.getvalue()
+        elif fmt == "jsonl":
+            buf = io.StringIO()
+            get_writer(fmt)(buf, str(root_abs), repo_info, project_tree, file_sections, **extras)
+            out_text = buf.getvalue()
+        else:
+            out_text = call_renderer(
+                get_renderer(fmt), str(root_abs), repo_info, project_tree, file_sections,
+                len(file_sections), total_lines, bytes_saved=bytes_saved, **extras,
+            )
 
-    stats = {"files": len(file_sections), "lines": total_lines, "chars": total_chars}
+    stats = {
+        "files": len(file_sections),
+        "lines": total_lines,
+        "chars": total_chars,
+        "tokens": estimate(out_text) if isinstance(out_text, str)
+        else sum(estimate(s["content"]) for s in file_sections),
+    }
+    if max_tokens is not None:
+        stats["files_dropped"] = dropped
+    if max_files is not None or max_total_bytes is not None:
+        stats["files_over_limit"] = over_limit
+    if bytes_saved is not None:
+        stats["bytes_saved"] = bytes_saved
     return out_text, stats
 
 
+def _dedupe(sections: list[dict], loaded_by_path: dict[str, dict]) -> int:
+    """Replace repeated file bodies with a reference to their first occurrence.
+
+    Files are matched by the digest of the bytes read for them; a later copy
+    keeps its own path and metadata but its content becomes
+    `content_ref: <first path>`. Returns the number of content bytes saved.
+    """
+    first_seen: dict[str, str] = {}
+    saved = 0
+    for i, section in enumerate(sections):
+        loaded = loaded_by_path[section["path"]]
+        digest = loaded.get("digest")
+        if digest is None or not loaded["bytes"]:
+            continue
+        if digest not in first_seen:
+            first_seen[digest] = section["path"]
+            continue
+        ref = {k: v for k, v in section.items() if k != "content"}
+        ref["content_ref"] = first_seen[digest]
+        sections[i] = ref
+        saved += loaded["bytes"]
+    return saved
+
+
+def _read_section(f: Path, rel: str, max_file_bytes: int, cache: ContentCache | None = None):
+    """Read one file for the package.
+
+    Returns (section, loaded record, error); safe to call from worker threads.
+    """
+    try:
+        st = os.stat(f)
+        loaded = cached_read(
+            cache, f, f"file:{max_file_bytes}", lambda: load_file(f, max_file_bytes, st.st_size), st
+        )
+    except Exception as exc:
+        return None, None, f"[rcpack] error reading {rel}: {exc}"
+
+    section = {
+        "path": rel,
+        "language": _language_from_ext(f.suffix),
+        "content": loaded["content"],
+        "is_truncated": loaded["truncated"],
+    }
+    return section, loaded, None
+
+
+def load_file(f: Path, max_file_bytes: int, size: int | None = None) -> dict:
+    """Classify, decode and hash one file into a cacheable record.
+
+    The one reader behind the CLI and build_package. A file of at most
+    `max_file_bytes` is read with a single open and sniffed for binary
+    content; a larger one becomes a memory-mapped excerpt of `max_file_bytes`,
+    two thirds from its start and one third from its end. `size` may carry
+    the size the caller already has.
+
+    "digest" identifies the emitted body; binary files get None since only a
+    placeholder is emitted.
+    """
+    if size is None:
+        size = os.stat(f).st_size
+    if size > max_file_bytes:
+        content, encoding, lines, elided = read_excerpt(f, *_excerpt_windows(max_file_bytes))
+        return _excerpt_record(f.name, size, content, encoding, lines, elided)
+    raw, truncated = read_head(f, max_file_bytes)
+    return _text_record(f.name, size, raw, truncated)
+
+
+def load_bytes(raw: bytes, name: str, max_file_bytes: int) -> dict:
+    """load_file for content already in memory, such as a blob read from git."""
+    if len(raw) > max_file_bytes:
+        content, encoding, lines, elided = excerpt_bytes(raw, *_excerpt_windows(max_file_bytes))
+        return _excerpt_record(name, len(raw), content, encoding, lines, elided)
+    return _text_record(name, len(raw), raw, False)
+
+
+def _excerpt_windows(max_file_bytes: int) -> Tuple[int, int]:
+    # two thirds head, one third tail: the excerpt shows as much as the limit allows
+    head = max_file_bytes * 2 // 3
+    return head, max_file_bytes - head
+
+
+def _text_record(name: str, size: int, raw: bytes, truncated: bool) -> dict:
+    content, encoding = classify_bytes(raw, truncated)
+    if content is None:
+        return _binary_record(name, size)
+    lines = content.count("\n") + (1 if content and not content.endswith("\n") else 0)
+    return {
+        "binary": False,
+        "encoding": encoding,
+        "content": content,
+        "truncated": truncated,
+        "lines": lines,
+        "digest": content_digest(raw) + ("+" if truncated else ""),
+        "bytes": len(raw),
+        "size": size,
+    }
+
+
+def _excerpt_record(name: str, size: int, content, encoding, lines: int, elided: bool) -> dict:
+    if content is None:
+        return _binary_record(name, size)
+    body = content.encode("utf-8")
+    return {
+        "binary": False,
+        "encoding": encoding,
+        "content": content,
+        "truncated": elided,
+        "lines": lines,
+        "digest": content_digest(body) + ("+" if elided else ""),
+        "bytes": len(body),
+        "size": size,
+    }
+
+
+def _binary_record(name: str, size: int) -> dict:
+    return {
+        "binary": True, "encoding": None, "content": binary_placeholder(name), "truncated": False,
+        "lines": 0, "digest": None, "bytes": 0, "size": size,
+    }
+
+
+def binary_placeholder(name: str) -> str:
+    """What a binary or unreadable file is packaged as."""
+    return f"[Binary or unreadable file: {name}]"
+
+
 def _language_from_ext(ext: str) -> str:
     ext = ext.lower().lstrip(".")
     mapping = {
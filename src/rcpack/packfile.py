@@ -0,0 +1,356 @@
+"""The rcpack container: a package that can be read one file at a time.
+
+Layout (integers little-endian):
+
+    magic     b"RCPACK" + version (u16)
+    blobs     file contents, UTF-8, each stored raw or compressed on its own
+    metadata  JSON: root, repo_info, structure, recent_changes, summary, ...
+    index     one fixed-size record per file, sorted by path (UTF-8 bytes)
+    names     the paths of the index records, concatenated
+    trailer   offsets and counts of the parts above, then the magic again
+
+The trailer is at the end so a pack can be written in one pass to a pipe.
+A reader memory-maps the file, binary-searches the index and decompresses only
+the blobs it is asked for, so extracting one file from a huge pack is
+O(log n) and touches a few pages. Identical contents are stored once.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import stat
+import struct
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from .io_utils import content_digest
+
+MAGIC = b"RCPACK"
+VERSION = 1
+
+_HEADER = struct.Struct("<6sH")
+# name offset, name length, codec, blob offset, stored length, content length, file size (-1: unknown)
+_ENTRY = struct.Struct("<QIB3xQQQq")
+# metadata offset and length, index offset, entry count, names length, magic, version
+_TRAILER = struct.Struct("<QQQQQ6sH")
+
+# blob codecs, by the names --compress uses; gzip means a bare zlib stream per blob
+_CODEC_IDS = {None: 0, "gzip": 1, "bz2": 2, "xz": 3, "zstd": 4}
+_CODEC_NAMES = {number: name for name, number in _CODEC_IDS.items()}
+
+# smaller blobs are not worth compressing
+_MIN_COMPRESS = 64
+
+
+class PackError(ValueError):
+    """The file is not an rcpack container, or it is truncated or corrupt."""
+
+
+class PackEntry(NamedTuple):
+    path: str
+    size: Optional[int]  # size of the file on disk, if known
+    length: int  # bytes of UTF-8 content
+    stored: int  # bytes in the pack
+    codec: Optional[str]
+
+
+def write_pack(out: BinaryIO, root, repo_info, tree_text, files: Iterable[Dict[str, Any]],
+               recent_files=None, file_commits=None, compression: Optional[str] = "gzip",
+               changes=None, patch=None) -> Tuple[int, int]:
+    """Write an rcpack container to the binary stream `out`, in one pass.
+
+    `files` yields section dicts with "path", "content" and "size" keys and is
+    consumed lazily: each blob is written as soon as it arrives and only the
+    index is kept in memory. `compression` is a codec from rcpack.compress
+    (gzip, bz2, xz or zstd) applied to each blob where it saves space, or None.
+    Returns (total_files, total_lines).
+    """
+    compress = _blob_compressor(compression)
+    pos = out.write(_HEADER.pack(MAGIC, VERSION))
+    entries: Dict[bytes, Tuple[int, int, int, int, int]] = {}
+    stored: Dict[str, Tuple[int, int, int]] = {}
+    total_lines = 0
+    for section in files:
+        data = section["content"].encode("utf-8")
+        total_lines += len(section["content"].splitlines())
+        digest = content_digest(data)
+        if digest not in stored:
+            codec, blob = None, data
+            if compress is not None and len(data) >= _MIN_COMPRESS:
+                packed = compress(data)
+                if len(packed) < len(data):
+                    codec, blob = compression, packed
+            out.write(blob)
+            stored[digest] = (pos, len(blob), _CODEC_IDS[codec])
+            pos += len(blob)
+        offset, length, codec_id = stored[digest]
+        size = section.get("size")
+        entries[section["path"].encode("utf-8")] = (
+            codec_id, offset, length, len(data), -1 if size is None else size
+        )
+
+    meta: Dict[str, Any] = {
+        "root": root,
+        "repo_info": repo_info,
+        "structure": tree_text,
+        "recent_changes": recent_files or {},
+    }
+    if file_commits:
+        meta["file_commits"] = file_commits
+    if changes:
+        meta["changes"] = changes
+    if patch:
+        meta["patch"] = patch
+    meta["summary"] = {"total_files": len(entries), "total_lines": total_lines}
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    meta_offset = pos
+    pos += out.write(meta_bytes)
+
+    index_offset = pos
+    names = sorted(entries)
+    name_offset = 0
+    for name in names:
+        codec_id, offset, length, content_length, size = entries[name]
+        out.write(_ENTRY.pack(name_offset, len(name), codec_id, offset, length, content_length, size))
+        name_offset += len(name)
+    out.write(b"".join(names))
+    out.write(_TRAILER.pack(
+        meta_offset, len(meta_bytes), index_offset, len(names), name_offset, MAGIC, VERSION
+    ))
+    return len(entries), total_lines
+
+
+class PackReader:
+    """Random access to an rcpack file through a memory map.
+
+    Usage:
+        with PackReader("context.rcpack") as pack:
+            text = pack.read("src/main.py")
+
+    Lookups binary-search the sorted index; only the requested blob is read
+    and decompressed. Every index record is checked against the file when it
+    is opened; PackError is raised for a file that is not an rcpack container
+    or is corrupt, there or when a blob fails to decompress.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if not stat.S_ISREG(os.fstat(f.fileno()).st_mode):
+                raise PackError(f"not a regular file (rcpack files are memory-mapped): {path}")
+            try:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                raise PackError(f"not an rcpack file: {path}") from None
+        self._path = path
+        try:
+            self._parse_trailer(path)
+            self._check_index(path)
+        except BaseException:
+            self._mm.close()
+            raise
+        self._meta: Optional[Dict[str, Any]] = None
+
+    def _parse_trailer(self, path) -> None:
+        mm = self._mm
+        if len(mm) < _HEADER.size + _TRAILER.size:
+            raise PackError(f"not an rcpack file: {path}")
+        magic, version = _HEADER.unpack_from(mm, 0)
+        (self._meta_offset, self._meta_length, self._index_offset, self._count,
+         names_length, end_magic, end_version) = _TRAILER.unpack_from(mm, len(mm) - _TRAILER.size)
+        if magic != MAGIC or end_magic != MAGIC:
+            raise PackError(f"not an rcpack file: {path}")
+        if version != VERSION or end_version != VERSION:
+            raise PackError(f"unsupported rcpack version {version} in {path}")
+        self._names_offset = self._index_offset + self._count * _ENTRY.size
+        self._names_length = names_length
+        if (self._names_offset + names_length + _TRAILER.size != len(mm)
+                or self._meta_offset < _HEADER.size
+                or self._meta_offset + self._meta_length != self._index_offset):
+            raise PackError(f"truncated or corrupt rcpack file: {path}")
+
+    def _check_index(self, path) -> None:
+        """Check that every record's name and blob lie in their sections; O(n), in C mostly."""
+        index = self._mm[self._index_offset:self._names_offset]
+        for name_offset, name_length, codec_id, offset, stored, _, _ in _ENTRY.iter_unpack(index):
+            if (name_offset + name_length > self._names_length
+                    or codec_id not in _CODEC_NAMES
+                    or offset < _HEADER.size or offset + stored > self._meta_offset):
+                raise PackError(f"corrupt index in rcpack file: {path}")
+
+    def __enter__(self) -> "PackReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, path: str) -> bool:
+        return self._find(path) is not None
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        """Everything but the file contents: root, repo_info, structure, summary, ..."""
+        if self._meta is None:
+            start = self._meta_offset
+            try:
+                self._meta = json.loads(self._mm[start:start + self._meta_length].decode("utf-8"))
+            except ValueError:
+                raise PackError(f"corrupt metadata in rcpack file: {self._path}") from None
+        return self._meta
+
+    def paths(self) -> Iterator[str]:
+        """Every path, in sorted order."""
+        for i in range(self._count):
+            yield self._name(i).decode("utf-8")
+
+    def entries(self) -> Iterator[PackEntry]:
+        """Every index record, in path order."""
+        for i in range(self._count):
+            yield self._entry(i)
+
+    def entry(self, path: str) -> PackEntry:
+        """Index record for `path`; raises KeyError if it is not in the pack."""
+        i = self._find(path)
+        if i is None:
+            raise KeyError(path)
+        return self._entry(i)
+
+    def read(self, path: str) -> str:
+        """Content of `path` as text; raises KeyError if it is not in the pack."""
+        return self._text(self.read_bytes(path))
+
+    def read_bytes(self, path: str) -> bytes:
+        """Content of `path` as UTF-8 bytes; raises KeyError if it is not in the pack."""
+        i = self._find(path)
+        if i is None:
+            raise KeyError(path)
+        return self._blob(i)
+
+    def sections(self) -> Iterator[Dict[str, Any]]:
+        """Yield {"path", "content", "size"} for every file in path order, one blob at a time."""
+        for i in range(self._count):
+            entry = self._entry(i)
+            yield {"path": entry.path, "content": self._text(self._blob(i)), "size": entry.size}
+
+    def _find(self, path: str) -> Optional[int]:
+        key = path.encode("utf-8")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            name = self._name(mid)
+            if name < key:
+                lo = mid + 1
+            elif name > key:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def _record(self, i: int):
+        return _ENTRY.unpack_from(self._mm, self._index_offset + i * _ENTRY.size)
+
+    def _name(self, i: int) -> bytes:
+        name_offset, name_length = self._record(i)[:2]
+        start = self._names_offset + name_offset
+        return self._mm[start:start + name_length]
+
+    def _entry(self, i: int) -> PackEntry:
+        _, _, codec_id, _, stored, length, size = self._record(i)
+        return PackEntry(
+            self._name(i).decode("utf-8"), None if size < 0 else size, length, stored,
+            _CODEC_NAMES[codec_id]
+        )
+
+    def _blob(self, i: int) -> bytes:
+        _, _, codec_id, offset, stored, length, _ = self._record(i)
+        data = self._mm[offset:offset + stored]
+        codec = _CODEC_NAMES[codec_id]
+        if codec is not None:
+            decompress = _blob_decompressor(codec)
+            try:
+                data = decompress(data)
+            except Exception as e:  # zlib.error, OSError, LZMAError, ZstdError ...
+                raise PackError(f"corrupt blob in rcpack file: {self._path}: {e}") from None
+        if len(data) != length:
+            raise PackError(f"corrupt blob in rcpack file: {self._path}")
+        return data
+
+    def _text(self, data: bytes) -> str:
+        try:
+            return data.decode("utf-8")
+        except UnicodeDecodeError:
+            raise PackError(f"corrupt blob in rcpack file: {self._path}") from None
+
+
+def is_pack(path) -> bool:
+    """True if `path` starts like an rcpack container."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def convert_pack(pack: PackReader, fmt: str, out) -> Tuple[int, int]:
+    """Stream `pack` to the text sink `out` as markdown, json or jsonl.
+
+    Files are decompressed one at a time, so converting a large pack needs
+    about as much memory as its largest file. Returns (total_files, total_lines).
+    """
+    from .renderer import get_writer
+
+    writer = get_writer(fmt)
+    if writer is None:
+        raise ValueError(f"cannot convert an rcpack file to {fmt}")
+    meta = pack.meta
+    extras = {key: meta[key] for key in ("changes", "patch") if key in meta}
+    return writer(
+        out, meta["root"], meta["repo_info"], meta["structure"], pack.sections(),
+        recent_files=meta.get("recent_changes"), file_commits=meta.get("file_commits"), **extras
+    )
+
+
+def _blob_compressor(codec: Optional[str]):
+    if codec is None:
+        return None
+    if codec == "gzip":
+        import zlib
+        return zlib.compress
+    if codec == "bz2":
+        import bz2
+        return bz2.compress
+    if codec == "xz":
+        import lzma
+        return lzma.compress
+    if codec == "zstd":
+        from .compress import _zstd
+
+        zstd = _zstd()
+        if zstd.__name__ == "zstandard":
+            return zstd.ZstdCompressor().compress
+        return zstd.compress
+    raise ValueError(f"Unknown compression: {codec}")
+
+
+def _blob_decompressor(codec: str):
+    if codec == "gzip":
+        import zlib
+        return zlib.decompress
+    if codec == "bz2":
+        import bz2
+        return bz2.decompress
+    if codec == "xz":
+        import lzma
+        return lzma.decompress
+    from .compress import _zstd
+
+    zstd = _zstd()
+    if zstd.__name__ == "zstandard":
+        return zstd.ZstdDecompressor().decompress
+    return zstd.decompress
@@ -0,0 +1,222 @@
+"""Compiled include/exclude and .gitignore matching for file discovery.
+
+Every rule set is compiled into a single regular expression, so matching a path
+costs one C-level regex call instead of one fnmatch call per pattern.
+"""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional
+
+
+class _Rule(NamedTuple):
+    regex: str
+    negated: bool
+    dir_only: bool
+
+
+def _translate(pat: str, *, cross_slash: bool, escapes: bool) -> str:
+    """Translate a glob into a regex body (no anchors).
+
+    `cross_slash` selects fnmatch semantics, where `*` and `?` (and so `**`) also
+    match `/` but a literal `/` must still be present: `**/*.md` does not match a
+    top-level `README.md`. Otherwise they stay within one path segment as in
+    .gitignore, and a whole `**` segment matches any number of directories,
+    including none.
+    """
+    star = ".*" if cross_slash else "[^/]*"
+    qmark = "." if cross_slash else "[^/]"
+    out: List[str] = []
+    i, n = 0, len(pat)
+    while i < n:
+        c = pat[i]
+        if c == "*":
+            j = i
+            while j < n and pat[j] == "*":
+                j += 1
+            seg_start = i == 0 or pat[i - 1] == "/"
+            seg_end = j == n or pat[j] == "/"
+            if j - i >= 2 and seg_start and seg_end and not cross_slash:
+                if j == n:
+                    out.append(".*")
+                    i = j
+                else:
+                    out.append("(?:.*/)?")
+                    i = j + 1
+                continue
+            out.append(star)
+            i = j
+        elif c == "?":
+            out.append(qmark)
+            i += 1
+        elif c == "[":
+            j = i + 1
+            if j < n and pat[j] in "!^":
+                j += 1
+            if j < n and pat[j] == "]":
+                j += 1
+            while j < n and pat[j] != "]":
+                j += 1
+            if j >= n:
+                out.append("\\[")
+                i += 1
+                continue
+            body = pat[i + 1:j].replace("\\", "\\\\")
+            if body[:1] in ("!", "^"):
+                body = "^" + body[1:]
+            out.append(f"[{body}]")
+            i = j + 1
+        elif c == "\\" and escapes and i + 1 < n:
+            out.append(re.escape(pat[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return "".join(out)
+
+
+def _compile(rules: List[_Rule]) -> Optional["re.Pattern[str]"]:
+    if not rules:
+        return None
+    # Reversed, so the first alternative that matches is the last rule listed
+    # (last match wins); the group name tells us which rule that was.
+    alts = "|".join(f"(?P<r{i}>{rules[i].regex})" for i in reversed(range(len(rules))))
+    return re.compile(f"(?:{alts})", re.DOTALL)
+
+
+class GlobSet:
+    """An ordered list of glob rules where the last matching rule wins.
+
+    `match()` returns True when a positive rule matched, False when a negated
+    (`!pattern`) rule matched, and None when nothing matched.
+    """
+
+    def __init__(self, rules: Iterable[_Rule]):
+        self._rules = list(rules)
+        self.has_negations = any(r.negated for r in self._rules)
+        # dir-only rules (trailing "/" in .gitignore) never apply to files
+        self._file_rules = [r for r in self._rules if not r.dir_only]
+        self._file_rx = _compile(self._file_rules)
+        self._dir_rx = _compile(self._rules)
+
+    def __bool__(self) -> bool:
+        return bool(self._rules)
+
+    def match(self, rel_posix: str, is_dir: bool = False) -> Optional[bool]:
+        rx, rules = (self._dir_rx, self._rules) if is_dir else (self._file_rx, self._file_rules)
+        if rx is None:
+            return None
+        m = rx.fullmatch(rel_posix)
+        if m is None:
+            return None
+        return not rules[int(m.lastgroup[1:])].negated
+
+    @classmethod
+    def from_globs(cls, patterns: Iterable[str]) -> "GlobSet":
+        """Compile include/exclude patterns (fnmatch semantics, `!` negates)."""
+        rules = []
+        for pat in patterns:
+            negated = pat.startswith("!")
+            if negated:
+                pat = pat[1:]
+            rules.append(_Rule(_translate(pat, cross_slash=True, escapes=False), negated, False))
+        return cls(rules)
+
+    @classmethod
+    def from_gitignore(cls, lines: Iterable[str], base: str = "") -> "GlobSet":
+        """Compile .gitignore lines; `base` is the POSIX dir they are relative to."""
+        prefix = re.escape(base.rstrip("/") + "/") if base else ""
+        rules = []
+        for line in lines:
+            line = line.rstrip("\n\r")
+            # trailing spaces are ignored unless escaped
+            while line.endswith(" ") and not line.endswith("\\ "):
+                line = line[:-1]
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            elif line.startswith(("\\!", "\\#")):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            anchored = "/" in line
+            line = line.lstrip("/")
+            regex = _translate(line, cross_slash=False, escapes=True)
+            if not anchored:
+                regex = "(?:.*/)?" + regex
+            rules.append(_Rule(prefix + regex, negated, dir_only))
+        return cls(rules)
+
+
+def load_git_ignores(root: Path) -> GlobSet:
+    """Read `root/.git/info/exclude` and `root/.gitignore` into one GlobSet.
+
+    .gitignore rules come last so they take precedence, as in git itself.
+    Nested .gitignore files are not consulted.
+    """
+    lines: List[str] = []
+    for ignore_file in (root / ".git" / "info" / "exclude", root / ".gitignore"):
+        try:
+            with open(ignore_file, "r", encoding="utf-8", errors="replace") as f:
+                lines.extend(f.read().splitlines())
+        except OSError:
+            continue
+    return GlobSet.from_gitignore(lines)
+
+
+class PathFilter:
+    """Include/exclude globs and ignore rules, compiled once per discovery run.
+
+    Paths are POSIX strings relative to the discovery root.
+    """
+
+    def __init__(
+        self,
+        include_patterns: Iterable[str] = (),
+        exclude_patterns: Iterable[str] = (),
+        ignores: Optional[GlobSet] = None,
+    ):
+        exclude_patterns = list(exclude_patterns)
+        self.includes = GlobSet.from_globs(include_patterns)
+        self.excludes = GlobSet.from_globs(exclude_patterns)
+        self.ignores = ignores or GlobSet([])
+        # An exclude glob ending in "*" matches everything below any directory
+        # `d` for which it already matches "d/", so such directories can be
+        # pruned -- unless a negated exclude could re-include something there.
+        prune = []
+        if not self.excludes.has_negations:
+            prune = [p for p in exclude_patterns if p.endswith("*")]
+        self._prune = GlobSet.from_globs(prune)
+
+    def skip_dir(self, rel_dir: str) -> bool:
+        """True if nothing below `rel_dir` can ever be selected."""
+        return bool(self.ignores.match(rel_dir, is_dir=True)) or bool(
+            self._prune.match(rel_dir + "/")
+        )
+
+    def excluded(self, rel_posix: str, check_parents: bool = False) -> bool:
+        """True if an exclude glob or ignore rule rejects the file `rel_posix`.
+
+        With `check_parents`, ancestor directories are tested too; the directory
+        walker does not need this since it never enters skipped directories.
+        """
+        if self.excludes.match(rel_posix):
+            return True
+        if self.ignores.match(rel_posix):
+            return True
+        if check_parents:
+            parts = rel_posix.split("/")[:-1]
+            for i in range(1, len(parts) + 1):
+                if self.skip_dir("/".join(parts[:i])):
+                    return True
+        return False
+
+    def included(self, rel_posix: str) -> bool:
+        """True if an include glob selects `rel_posix` (callers check `includes` first)."""
+        return bool(self.includes.match(rel_posix))
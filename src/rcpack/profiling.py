@@ -0,0 +1,122 @@
+"""Stage spans and counters for --profile.
+
+Instrumented code calls the module-level span() and count(). They only record
+while a Profiler is active (see `profiling()`); otherwise span() hands back a
+shared no-op context manager and count() returns at once, so the hooks cost a
+function call and nothing more.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+_NULL_SPAN = nullcontext()
+_active: Optional["Profiler"] = None
+
+
+class Profiler:
+    """Collects (name, start, end, thread) spans and named counters; thread-safe."""
+
+    def __init__(self):
+        self.spans: List[Tuple[str, int, int, int]] = []
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            with self._lock:
+                self.spans.append((name, start, end, threading.get_ident()))
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self) -> Dict[str, Any]:
+        """Plain JSON summary: spans in start order, per-stage totals and counters."""
+        spans = sorted(self.spans, key=lambda s: s[1])
+        totals: Dict[str, float] = {}
+        for name, start, end, _ in spans:
+            totals[name] = totals.get(name, 0.0) + (end - start) / 1e6
+        return {
+            "spans": [
+                {
+                    "name": name,
+                    "start_ms": round((start - self._origin) / 1e6, 3),
+                    "duration_ms": round((end - start) / 1e6, 3),
+                    "thread": self._thread_ids().get(tid, 0),
+                }
+                for name, start, end, tid in spans
+            ],
+            "totals_ms": {name: round(ms, 3) for name, ms in totals.items()},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Trace Event Format, loadable in chrome://tracing or Perfetto."""
+        pid = os.getpid()
+        threads = self._thread_ids()
+        events = [
+            {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self._origin) / 1e3,
+                "dur": (end - start) / 1e3,
+                "pid": pid,
+                "tid": threads[tid],
+            }
+            for name, start, end, tid in sorted(self.spans, key=lambda s: s[1])
+        ]
+        end_ts = max((e["ts"] + e["dur"] for e in events), default=0)
+        events.extend(
+            {"name": name, "ph": "C", "ts": end_ts, "pid": pid, "args": {name: value}}
+            for name, value in sorted(self.counters.items())
+        )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: str, fmt: str = "json") -> None:
+        data = self.chrome_trace() if fmt == "chrome" else self.report()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+            f.write("\n")
+
+    def _thread_ids(self) -> Dict[int, int]:
+        # small stable ids in order of first appearance
+        ids: Dict[int, int] = {}
+        for _, _, _, tid in sorted(self.spans, key=lambda s: s[1]):
+            ids.setdefault(tid, len(ids))
+        return ids
+
+
+@contextmanager
+def profiling(profiler: Optional[Profiler]) -> Iterator[Optional[Profiler]]:
+    """Make `profiler` the active one for the duration of the block (None disables)."""
+    global _active
+    previous, _active = _active, profiler
+    try:
+        yield profiler
+    finally:
+        _active = previous
+
+
+def span(name: str) -> ContextManager[None]:
+    """Time the enclosed block as stage `name` when profiling is active."""
+    profiler = _active
+    return _NULL_SPAN if profiler is None else profiler.span(name)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add `n` to counter `name` when profiling is active."""
+    profiler = _active
+    if profiler is not None:
+        profiler.count(name, n)
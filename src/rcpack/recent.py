@@ -0,0 +1,94 @@
+"""Recent-changes selection for --recent / --since."""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+
+from .gitinfo import get_dirty_files, get_recent_commits
+
+if TYPE_CHECKING:
+    from datetime import datetime
+
+DEFAULT_WINDOW = "7d"
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+_WINDOW_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*$", re.IGNORECASE)
+
+
+def parse_window(text: str) -> float:
+    """Parse a window like "3d", "12h", "90m" or "2w" into seconds (bare numbers are days)."""
+    m = _WINDOW_RE.match(text)
+    if not m:
+        raise argparse.ArgumentTypeError(
+            f"invalid window {text!r}; use a number with s, m, h, d or w (e.g. 3d)"
+        )
+    return float(m.group(1)) * _UNITS[(m.group(2) or "d").lower()]
+
+
+def recent_changes(
+    root: Path,
+    files: Iterable[Path],
+    window_seconds: float,
+    stats: Optional[Dict[Path, os.stat_result]] = None,
+) -> Dict[Path, float]:
+    """Return {file: timestamp} for the files changed within the window.
+
+    In a git work tree the timestamp is the newest commit touching the file,
+    taken from one `git log --since --name-only` pass, so a fresh clone does
+    not make every file look new. Files with uncommitted changes (one
+    `git status` call) use their mtime instead. Outside git every file is
+    stat'ed once; the results are stored in `stats` for the read stage to reuse.
+    """
+    since = time.time() - window_seconds
+    if stats is None:
+        stats = {}
+    committed = get_recent_commits(root, window_seconds)
+    dirty = get_dirty_files(root) if committed is not None else None
+
+    changed: Dict[Path, float] = {}
+    if committed is None or dirty is None:
+        for f in files:
+            try:
+                st = stats[f] = os.stat(f)
+            except OSError:
+                continue
+            if st.st_mtime >= since:
+                changed[f] = st.st_mtime
+        return changed
+
+    dirty_set = set(dirty)
+    for f in files:
+        rel = f.relative_to(root).as_posix()
+        timestamp = committed.get(rel)
+        if rel in dirty_set:
+            try:
+                st = stats[f] = os.stat(f)
+            except OSError:
+                continue
+            timestamp = max(timestamp or 0, st.st_mtime)
+        if timestamp is not None and timestamp >= since:
+            changed[f] = timestamp
+    return changed
+
+
+def human_readable_age(mtime: datetime) -> str:
+    from datetime import datetime
+
+    delta = datetime.now() - mtime
+    days = delta.days
+    seconds = delta.seconds
+    if days > 0:
+        return f"{days} day{'s' if days != 1 else ''} ago"
+    elif seconds >= 3600:
+        hours = seconds // 3600
+        return f"{hours} hour{'s' if hours != 1 else ''} ago"
+    elif seconds >= 60:
+        minutes = seconds // 60
+        return f"{minutes} minute{'s' if minutes != 1 else ''} ago"
+    else:
+        return "just now"
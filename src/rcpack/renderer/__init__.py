@@ -0,0 +1,128 @@
+"""Registry of output renderers, imported only when their format is used.
+
+Built-in formats are listed as "module:attribute" strings, so choosing one
+format never imports the others (or PyYAML). Third-party packages can add
+formats through the "rcpack.renderers" entry point group:
+
+    [project.entry-points."rcpack.renderers"]
+    toml = "mypkg.render:render_toml"
+
+A renderer is called like the built-in ones:
+render(root, repo_info, tree_text, files, total_files, total_lines, **extras)
+and returns the whole document as a string. The CLI always passes
+recent_files and file_sizes. The later extras (file_commits, bytes_saved,
+changes and patch) are passed when set and only if the renderer accepts
+them (see call_renderer), so a renderer that predates them keeps working.
+Entry points are only scanned when a name is not a built-in format.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Union
+
+ENTRY_POINT_GROUP = "rcpack.renderers"
+
+_RENDERERS: Dict[str, Union[str, Callable]] = {
+    "markdown": "rcpack.renderer.markdown:render_markdown",
+    "json": "rcpack.renderer.jsonyaml:render_json",
+    "yaml": "rcpack.renderer.jsonyaml:render_yaml",
+}
+
+# streaming writers: write(out, root, repo_info, tree_text, sections, ...) -> (files, lines)
+_WRITERS: Dict[str, Union[str, Callable]] = {
+    "markdown": "rcpack.renderer.markdown:write_markdown",
+    "json": "rcpack.renderer.jsonyaml:write_json",
+    "jsonl": "rcpack.renderer.jsonyaml:write_jsonl",
+}
+
+# binary containers: write(out_binary, root, repo_info, tree_text, sections, ...) -> (files, lines)
+_BINARY_WRITERS: Dict[str, Union[str, Callable]] = {
+    "rcpack": "rcpack.packfile:write_pack",
+}
+
+_ALIASES = {"text": "markdown"}
+
+_plugins_loaded = False
+
+
+def register_renderer(name: str, renderer: Union[str, Callable]) -> None:
+    """Add or replace format `name`; `renderer` is a callable or a "module:attribute" string."""
+    _RENDERERS[name] = renderer
+
+
+def call_renderer(render: Callable, *args: Any, **extras: Any) -> str:
+    """Call `render` with the keyword arguments in `extras` that are set (not None).
+
+    A plugin that does not accept one of them gets it left out rather than
+    failing with TypeError; built-in renderers take them all.
+    """
+    extras = {key: value for key, value in extras.items() if value is not None}
+    if extras and not getattr(render, "__module__", "").startswith("rcpack.renderer."):
+        import inspect
+
+        params = inspect.signature(render).parameters
+        if not any(p.kind is p.VAR_KEYWORD for p in params.values()):
+            extras = {key: value for key, value in extras.items() if key in params}
+    return render(*args, **extras)
+
+
+def get_renderer(name: str) -> Callable:
+    """Return the renderer for format `name`, importing it on first use."""
+    name = _ALIASES.get(name, name)
+    if name not in _RENDERERS:
+        _load_plugins()
+    if name not in _RENDERERS:
+        raise ValueError(f"Unsupported format: {name}")
+    return _resolve(_RENDERERS, name)
+
+
+def get_writer(name: str) -> Optional[Callable]:
+    """Return the streaming writer for format `name`, or None if it has none."""
+    name = _ALIASES.get(name, name)
+    return _resolve(_WRITERS, name) if name in _WRITERS else None
+
+
+def get_binary_writer(name: str) -> Optional[Callable]:
+    """Return the writer for binary format `name` (such as rcpack), or None for text formats."""
+    return _resolve(_BINARY_WRITERS, name) if name in _BINARY_WRITERS else None
+
+
+def available_formats() -> List[str]:
+    """Names of every built-in and installed format, sorted."""
+    _load_plugins()
+    return sorted(set(_RENDERERS) | set(_WRITERS) | set(_BINARY_WRITERS) | set(_ALIASES))
+
+
+def is_format(name: str) -> bool:
+    """True if `name` can be rendered or streamed, scanning plugins only when needed."""
+    name = _ALIASES.get(name, name)
+    if name in _RENDERERS or name in _WRITERS or name in _BINARY_WRITERS:
+        return True
+    _load_plugins()
+    return name in _RENDERERS
+
+
+def _resolve(table: Dict[str, Union[str, Callable]], name: str) -> Callable:
+    target = table[name]
+    if isinstance(target, str):
+        from importlib import import_module
+
+        module, _, attr = target.partition(":")
+        target = table[name] = getattr(import_module(module), attr)
+    return target
+
+
+def _load_plugins() -> None:
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    _plugins_loaded = True
+    from importlib.metadata import entry_points
+
+    try:
+        found = entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:  # Python < 3.10
+        found = entry_points().get(ENTRY_POINT_GROUP, [])
+    for ep in found:
+        # built-ins win over plugins with the same name; ep.value is "module:attr"
+        _RENDERERS.setdefault(ep.name, ep.value)
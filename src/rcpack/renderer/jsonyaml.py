@@ -1,13 +1,9 @@
 from __future__ import annotations
 import json
+from typing import Any, Dict, Iterable, TextIO, Tuple
 
-try:
-    import yaml
-except ImportError:
-    yaml = None
 
-
-def render_json(root, repo_info, tree_text, files, total_files, total_lines,recent_files=None, file_sizes=None) -> str:
+def render_json(root, repo_info, tree_text, files, total_files, total_lines,recent_files=None, file_sizes=None, file_commits=None, bytes_saved=None, changes=None, patch=None) -> str:
     data = {
         "root": root,
         "repo_info": repo_info,
@@ -18,12 +14,18 @@ def render_json(root, repo_info, tree_text, files, total_files, total_lines,rece
         "summary": {"total_files": total_files, "total_lines": total_lines},
         
     }
+    _add_file_commits(data, file_commits)
+    _add_diff(data, changes, patch)
+    if bytes_saved is not None:
+        data["summary"]["bytes_saved"] = bytes_saved
     return json.dumps(data, indent=2, ensure_ascii=False)
 
 
-def render_yaml(root, repo_info, tree_text, files, total_files, total_lines,recent_files=None, file_sizes=None) -> str:
-    if yaml is None:
-        raise RuntimeError("PyYAML not installed; run `pip install pyyaml`")
+def render_yaml(root, repo_info, tree_text, files, total_files, total_lines,recent_files=None, file_sizes=None, file_commits=None, bytes_saved=None, changes=None, patch=None) -> str:
+    try:
+        import yaml  # imported here so json output never pays for PyYAML
+    except ImportError:
+        raise RuntimeError("PyYAML not installed; run `pip install pyyaml`") from None
     data = {
         "root": root,
         "repo_info": repo_info,
@@ -34,4 +36,109 @@ def render_yaml(root, repo_info, tree_text, files, total_files, total_lines,rece
         "summary": {"total_files": total_files, "total_lines": total_lines},
         
     }
+    _add_file_commits(data, file_commits)
+    _add_diff(data, changes, patch)
+    if bytes_saved is not None:
+        data["summary"]["bytes_saved"] = bytes_saved
     return yaml.safe_dump(data, sort_keys=False, allow_unicode=True)
+
+
+def write_json(out: TextIO, root, repo_info, tree_text, files: Iterable[Dict[str, Any]],
+               recent_files=None, file_commits=None, changes=None, patch=None) -> Tuple[int, int]:
+    """Stream the same document as render_json to `out` without building it in memory.
+
+    `files` yields section dicts with "path", "content" and "size" keys and is
+    consumed lazily; "files" is written as a {path: content} object, like the
+    CLI's render_json output. Returns (total_files, total_lines).
+    """
+    out.write("{\n")
+    out.write(f'  "root": {_dump(root, 1)},\n')
+    out.write(f'  "repo_info": {_dump(repo_info, 1)},\n')
+    out.write(f'  "structure": {_dump(tree_text, 1)},\n')
+    out.write(f'  "recent_changes": {_dump(recent_files or [], 1)},\n')
+
+    total_files = 0
+    total_lines = 0
+    file_sizes = {}
+    out.write('  "files": {')
+    for section in files:
+        out.write(",\n    " if total_files else "\n    ")
+        out.write(f'{_dump(section["path"], 2)}: {_dump(section["content"], 2)}')
+        file_sizes[section["path"]] = section.get("size")
+        total_files += 1
+        total_lines += len(section["content"].splitlines())
+    out.write("\n  },\n" if total_files else "},\n")
+
+    out.write(f'  "file_sizes": {_dump(file_sizes, 1)},\n')
+    if file_commits:
+        out.write(f'  "file_commits": {_dump(file_commits, 1)},\n')
+    if changes:
+        out.write(f'  "changes": {_dump(changes, 1)},\n')
+    if patch:
+        out.write(f'  "patch": {_dump(patch, 1)},\n')
+    summary = {"total_files": total_files, "total_lines": total_lines}
+    out.write(f'  "summary": {_dump(summary, 1)}\n')
+    out.write("}")
+    return total_files, total_lines
+
+
+def write_jsonl(out: TextIO, root, repo_info, tree_text, files: Iterable[Dict[str, Any]],
+                recent_files=None, file_commits=None, changes=None, patch=None) -> Tuple[int, int]:
+    """Stream JSON Lines: a header record, one record per file, then a summary record.
+
+    Every record has a "type" key ("header", "file" or "summary"), so consumers
+    can process a package record by record. Returns (total_files, total_lines).
+    """
+    header = {
+        "type": "header",
+        "root": root,
+        "repo_info": repo_info,
+        "structure": tree_text,
+        "recent_changes": recent_files or {},
+    }
+    if changes:
+        header["changes"] = changes
+    if patch:
+        header["patch"] = patch
+    _write_record(out, header)
+    total_files = 0
+    total_lines = 0
+    for section in files:
+        record = {"type": "file", **section}
+        if file_commits and section["path"] in file_commits:
+            record["last_commit"] = file_commits[section["path"]]
+        _write_record(out, record)
+        total_files += 1
+        total_lines += len(section.get("content", "").splitlines())
+    _write_record(out, {"type": "summary", "total_files": total_files, "total_lines": total_lines})
+    return total_files, total_lines
+
+
+def _add_file_commits(data: Dict[str, Any], file_commits) -> None:
+    """Insert "file_commits" before "summary", only when per-file commits were requested."""
+    if file_commits:
+        summary = data.pop("summary")
+        data["file_commits"] = file_commits
+        data["summary"] = summary
+
+
+def _add_diff(data: Dict[str, Any], changes, patch) -> None:
+    """Insert "changes" and "patch" before "summary" for diff-scoped packages."""
+    if changes or patch:
+        summary = data.pop("summary")
+        if changes:
+            data["changes"] = changes
+        if patch:
+            data["patch"] = patch
+        data["summary"] = summary
+
+
+def _dump(value, level: int) -> str:
+    # json.dumps escapes newlines inside strings, so every "\n" here is
+    # structural and can be re-indented for the nesting level
+    return json.dumps(value, indent=2, ensure_ascii=False).replace("\n", "\n" + "  " * level)
+
+
+def _write_record(out: TextIO, record: Dict[str, Any]) -> None:
+    out.write(json.dumps(record, ensure_ascii=False))
+    out.write("\n")
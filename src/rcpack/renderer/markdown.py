@@ -1,18 +1,97 @@
 """Markdown renderer for repository context."""
 
-from typing import Dict, Any
+from typing import Any, Dict, Iterable, List, Mapping, TextIO, Tuple
 
 
-def render_markdown(root: str, repo_info: Dict[str, Any], tree_text: str, 
-                   files: Dict[str, str], total_files: int, total_lines: int, recent_files=None, file_sizes=None) -> str:
-    """Render repository context as markdown."""
-    
+LANG_MAP = {
+    'py': 'python', 'js': 'javascript', 'ts': 'typescript',
+    'java': 'java', 'cpp': 'cpp', 'c': 'c', 'h': 'c',
+    'cs': 'csharp', 'php': 'php', 'rb': 'ruby',
+    'go': 'go', 'rs': 'rust', 'swift': 'swift',
+    'html': 'html', 'css': 'css', 'scss': 'scss',
+    'json': 'json', 'yaml': 'yaml', 'yml': 'yaml',
+    'xml': 'xml', 'sql': 'sql', 'sh': 'bash',
+    'md': 'markdown', 'dockerfile': 'dockerfile'
+}
+
+
+def render_markdown(root: str, repo_info: Dict[str, Any], tree_text: str,
+                   files, total_files: int, total_lines: int, recent_files=None, file_sizes=None,
+                   file_commits=None, bytes_saved=None, changes=None, patch=None) -> str:
+    """Render repository context as markdown.
+
+    `files` is either a {path: content} mapping (rendered in path order) or a
+    list of section dicts with "path" and "content" keys (rendered as given).
+    A section with "content_ref" instead of "content" repeats an earlier file's
+    body and is rendered as a reference to it. `changes` and `patch` describe a
+    diff-scoped package (--since-ref / --diff).
+    """
+
+    lines = _header_lines(root, repo_info)
+
+    # Summary
+    lines.extend(_summary_lines(total_files, total_lines, bytes_saved))
+
+    lines.extend(_structure_lines(tree_text, recent_files))
+    if changes:
+        lines.extend(_changes_lines(changes))
+
+    # File contents
+    lines.append("## File Contents")
+    lines.append("")
+
+    for section in _iter_sections(files):
+        lines.extend(_file_lines(section, file_sizes, file_commits))
+
+    if patch:
+        lines.extend(_patch_lines(patch))
+
+    return "\n".join(lines)
+
+
+def write_markdown(out: TextIO, root: str, repo_info: Dict[str, Any], tree_text: str,
+                   files: Iterable[Dict[str, Any]], recent_files=None, file_sizes=None,
+                   file_commits=None, changes=None, patch=None) -> Tuple[int, int]:
+    """Stream repository context as markdown to the file-like `out`.
+
+    `files` is consumed lazily, so each section is written as soon as it has
+    been read. Totals are not known up front, so the summary is written after
+    the file contents instead of before them. Returns (total_files, total_lines).
+    """
+    out.write("\n".join(_header_lines(root, repo_info)) + "\n")
+    out.write("\n".join(_structure_lines(tree_text, recent_files)) + "\n")
+    if changes:
+        out.write("\n".join(_changes_lines(changes)) + "\n")
+    out.write("## File Contents\n\n")
+
+    total_files = 0
+    total_lines = 0
+    for section in _iter_sections(files):
+        out.write("\n".join(_file_lines(section, file_sizes, file_commits)) + "\n")
+        total_files += 1
+        total_lines += len(section.get("content", "").splitlines())
+
+    if patch:
+        out.write("\n".join(_patch_lines(patch)) + "\n")
+    out.write("\n".join(_summary_lines(total_files, total_lines)))
+    return total_files, total_lines
+
+
+def _iter_sections(files) -> Iterable[Dict[str, Any]]:
+    if isinstance(files, Mapping):
+        for file_path, content in sorted(files.items()):
+            yield {"path": file_path, "content": content}
+    else:
+        yield from files
+
+
+def _header_lines(root: str, repo_info: Dict[str, Any]) -> List[str]:
     lines = []
-    
+
     # Header
     lines.append(f"# Repository Context: {root}")
     lines.append("")
-    
+
     # Repository info
     if repo_info.get("is_repo"):
         lines.append("## Git Repository Information")
@@ -24,13 +103,24 @@ def render_markdown(root: str, repo_info: Dict[str, Any], tree_text: str,
         lines.append("## Repository Information")
         lines.append(f"- **Note**: {repo_info.get('note', 'Not a git repository')}")
     lines.append("")
-    
-    # Summary
-    lines.append("## Summary")
-    lines.append(f"- **Total Files**: {total_files}")
-    lines.append(f"- **Total Lines**: {total_lines}")
+    return lines
+
+
+def _summary_lines(total_files: int, total_lines: int, bytes_saved=None) -> List[str]:
+    lines = [
+        "## Summary",
+        f"- **Total Files**: {total_files}",
+        f"- **Total Lines**: {total_lines}",
+    ]
+    if bytes_saved:
+        lines.append(f"- **Duplicate Content Saved**: {bytes_saved} bytes")
     lines.append("")
-    
+    return lines
+
+
+def _structure_lines(tree_text: str, recent_files) -> List[str]:
+    lines = []
+
     # Directory structure
     lines.append("## Directory Structure")
     lines.append("```")
@@ -38,43 +128,61 @@ def render_markdown(root: str, repo_info: Dict[str, Any], tree_text: str,
     lines.append("```")
     lines.append("")
 
-    # will produce recent files 
+    # will produce recent files
     # Recent files (fixed)
     if recent_files:
         lines.append("## Recent Changes")
         for file, age in recent_files.items():
             lines.append(f"- {file} (modified {age})")
         lines.append("")
-    
-    # File contents
-    lines.append("## File Contents")
-    lines.append("")
-    
-    for file_path, content in sorted(files.items()):
-        if file_sizes and file_path in file_sizes:
-            size_bytes = file_sizes[file_path]
-            lines.append(f"### {file_path} ({size_bytes} bytes)")
+    return lines
+
+
+def _changes_lines(changes: Dict[str, Any]) -> List[str]:
+    if "range" in changes:
+        lines = [f"## Changes in {changes['range']}"]
+    else:
+        lines = [f"## Changes since {changes['since']}"]
+    for change in changes["files"]:
+        if "old_path" in change:
+            lines.append(f"- {change['status']} {change['old_path']} -> {change['path']}")
         else:
-            lines.append(f"### {file_path}")
+            lines.append(f"- {change['status']} {change['path']}")
+    lines.append("")
+    return lines
+
+
+def _patch_lines(patch: str) -> List[str]:
+    return ["## Patch", "```diff", patch.rstrip("\n"), "```", ""]
+
+
+def _file_lines(section: Dict[str, Any], file_sizes, file_commits=None) -> List[str]:
+    lines = []
+    file_path = section["path"]
+    size_bytes = section.get("size")
+    if size_bytes is None and file_sizes and file_path in file_sizes:
+        size_bytes = file_sizes[file_path]
+    if size_bytes is not None:
+        lines.append(f"### {file_path} ({size_bytes} bytes)")
+    else:
+        lines.append(f"### {file_path}")
+    lines.append("")
+
+    last_commit = section.get("last_commit") or (file_commits or {}).get(file_path)
+    if last_commit:
+        lines.append(f"*Last commit: {last_commit['date']} by {last_commit['author']}*")
         lines.append("")
-        
-        # Detect language for syntax highlighting
-        ext = file_path.split('.')[-1].lower() if '.' in file_path else ''
-        lang_map = {
-            'py': 'python', 'js': 'javascript', 'ts': 'typescript',
-            'java': 'java', 'cpp': 'cpp', 'c': 'c', 'h': 'c',
-            'cs': 'csharp', 'php': 'php', 'rb': 'ruby',
-            'go': 'go', 'rs': 'rust', 'swift': 'swift',
-            'html': 'html', 'css': 'css', 'scss': 'scss',
-            'json': 'json', 'yaml': 'yaml', 'yml': 'yaml',
-            'xml': 'xml', 'sql': 'sql', 'sh': 'bash',
-            'md': 'markdown', 'dockerfile': 'dockerfile'
-        }
-        
-        language = lang_map.get(ext, '')
-        lines.append(f"```{language}")
-        lines.append(content)
-        lines.append("```")
+
+    if "content_ref" in section:
+        lines.append(f"content_ref: {section['content_ref']}")
         lines.append("")
-    
-    return "\n".join(lines)
+        return lines
+
+    # Detect language for syntax highlighting
+    ext = file_path.split('.')[-1].lower() if '.' in file_path else ''
+    language = LANG_MAP.get(ext, '')
+    lines.append(f"```{language}")
+    lines.append(section["content"])
+    lines.append("```")
+    lines.append("")
+    return lines
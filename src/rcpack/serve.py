@@ -0,0 +1,320 @@
+"""`repo-contextor serve`: render packages of one repository over HTTP.
+
+    GET /package?format=json&include=src/**&exclude=*.lock&since=3d
+
+Rendered packages are kept in an in-memory LRU cache keyed by the options and
+the repository's state: the HEAD commit from get_git_info plus a digest of the
+uncommitted changes (outside git, the size and mtime of every file). A request
+for an unchanged repository is answered from memory, and with a 304 when the
+client already holds the ETag. Identical requests that arrive while a package
+is being built wait for that build instead of starting their own.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .argtypes import positive_int
+from .cache import ContentCache
+from .discover import discover_files
+from .gitinfo import get_git_info, get_worktree_state
+from .packager import DEFAULT_LIMITS, build_package, load_limits
+from .recent import DEFAULT_WINDOW, parse_window
+from .renderer import is_format
+
+_CONTENT_TYPES = {
+    "markdown": "text/markdown; charset=utf-8",
+    "json": "application/json",
+    "jsonl": "application/x-ndjson",
+    "yaml": "application/yaml; charset=utf-8",
+    "rcpack": "application/octet-stream",
+}
+
+_PARAMS = {"format", "include", "exclude", "recent", "since", "max_tokens", "max_files",
+           "file_commits"}
+
+# recent-file packages are rebuilt at least this often, as files age out of the window
+_RECENT_TTL = 60
+
+
+class Package(NamedTuple):
+    body: bytes
+    etag: str
+    content_type: str
+    stats: Dict[str, Any]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="repo-contextor serve",
+        description="Serve packages of a repository over HTTP, cached until the repository changes"
+    )
+    parser.add_argument("path", nargs="?", default=".", help="Repository path (default: .)")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Address to listen on (default: 127.0.0.1, this machine only)")
+    parser.add_argument("-p", "--port", type=int, default=8765,
+                        help="Port to listen on (default: 8765; 0 picks a free one)")
+    parser.add_argument("--cache-entries", type=positive_int, default=32, metavar="N",
+                        help="Rendered packages kept in memory, least recently used dropped first "
+                             "(default: 32)")
+    parser.add_argument("--max-file-bytes", type=positive_int, default=None, metavar="BYTES",
+                        help="Truncate files larger than this (default: 1 MiB)")
+    parser.add_argument("--max-files", type=positive_int, default=None, metavar="N",
+                        help="Package at most N files unless a request asks for fewer")
+    parser.add_argument("--max-total-bytes", type=positive_int, default=None, metavar="BYTES",
+                        help="Stop adding files to a package once their content reaches BYTES")
+    parser.add_argument("-j", "--jobs", type=positive_int, default=None,
+                        help="Threads reading files for each build (default: 1)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not use the persistent file content cache")
+    args = parser.parse_args(argv)
+
+    root = Path(args.path).resolve()
+    if not root.is_dir():
+        parser.error(f"not a directory: {args.path}")
+    try:
+        limits = load_limits({key: getattr(args, key, None) for key in DEFAULT_LIMITS})
+    except ValueError as e:
+        parser.error(f"{e} (check .repo-contextor.toml)")
+
+    service = PackageService(root, limits, args.cache_entries, not args.no_cache)
+    try:
+        server = ThreadingHTTPServer((args.host, args.port), _Handler)
+    except OSError as e:
+        print(f"Error: cannot listen on {args.host}:{args.port}: {e}", file=sys.stderr)
+        sys.exit(1)
+    server.service = service
+    print(f"Serving {root} on http://{args.host}:{server.server_port}/package", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def parse_query(query: str) -> Dict[str, Any]:
+    """Build options from a query string; raises ValueError with a message for the client.
+
+    include and exclude may be repeated or comma-separated; recent and
+    file_commits take 1/true/yes; since (e.g. 3d) implies recent.
+    """
+    params = parse_qs(query, keep_blank_values=True)
+    unknown = sorted(set(params) - _PARAMS)
+    if unknown:
+        raise ValueError(f"unknown parameter: {unknown[0]} (use {', '.join(sorted(_PARAMS))})")
+
+    def last(name: str, default: Optional[str] = None) -> Optional[str]:
+        return params[name][-1] if name in params else default
+
+    fmt = last("format", "markdown")
+    fmt = "markdown" if fmt == "text" else fmt
+    if not is_format(fmt):
+        raise ValueError(f"unknown format: {fmt}")
+
+    recent = None
+    if "since" in params or _flag(last("recent")):
+        try:
+            recent = parse_window(last("since") or DEFAULT_WINDOW)
+        except argparse.ArgumentTypeError as e:
+            raise ValueError(str(e)) from None
+
+    return {
+        "format": fmt,
+        "include": _patterns(params.get("include", [])),
+        "exclude": _patterns(params.get("exclude", [])),
+        "recent": recent,
+        "max_tokens": _count(last("max_tokens"), "max_tokens"),
+        "max_files": _count(last("max_files"), "max_files"),
+        "file_commits": _flag(last("file_commits")),
+    }
+
+
+class PackageService:
+    """Builds packages for the server, cached by repository state and coalesced while building."""
+
+    def __init__(self, root: Path, limits: Dict[str, Any], max_entries: int = 32,
+                 use_cache: bool = True):
+        self.root = root
+        self.limits = limits
+        self.max_entries = max_entries
+        self.use_cache = use_cache
+        self._lock = threading.Lock()
+        self._packages: "OrderedDict[Tuple, Package]" = OrderedDict()
+        self._building: Dict[Tuple, _Build] = {}
+
+    def get(self, options: Dict[str, Any]) -> Tuple[Package, str]:
+        """Return (package, how) where how is "hit", "miss" or "coalesced"."""
+        key = (self.state(options), *sorted(options.items()))
+        if options["recent"] is not None:
+            key += (int(time.time() // _RECENT_TTL),)
+
+        with self._lock:
+            package = self._packages.get(key)
+            if package is not None:
+                self._packages.move_to_end(key)
+                return package, "hit"
+            build = self._building.get(key)
+            owner = build is None
+            if owner:
+                build = self._building[key] = _Build()
+        if not owner:
+            build.done.wait()
+            if build.error is not None:
+                raise build.error
+            return build.package, "coalesced"
+
+        try:
+            build.package = self.build(options)
+        except BaseException as e:
+            build.error = e
+            raise
+        finally:
+            with self._lock:
+                if build.package is not None:
+                    self._packages[key] = build.package
+                    while len(self._packages) > self.max_entries:
+                        self._packages.popitem(last=False)
+                del self._building[key]
+            build.done.set()
+        return build.package, "miss"
+
+    def state(self, options: Dict[str, Any]) -> Tuple:
+        """What the package depends on besides the options: commit and work tree."""
+        info = get_git_info(self.root)
+        if info["is_repo"]:
+            worktree = get_worktree_state(self.root)
+            if worktree is not None:
+                return info["commit"], worktree
+        # outside git: the size and modification time of every candidate file
+        digest = hashlib.blake2b(digest_size=16)
+        files = discover_files([self.root], self.root, list(options["include"]),
+                               list(options["exclude"]))
+        for f in files:
+            try:
+                st = f.stat()
+            except OSError:
+                continue
+            digest.update(b"%s\0%d:%d\0" % (bytes(f), st.st_size, st.st_mtime_ns))
+        return None, digest.hexdigest()
+
+    def build(self, options: Dict[str, Any]) -> Package:
+        limits = self.limits
+        max_files = options["max_files"]
+        if limits["max_files"] is not None:
+            max_files = min(max_files or limits["max_files"], limits["max_files"])
+        cache = ContentCache() if self.use_cache else None
+        try:
+            out, stats = build_package(
+                [str(self.root)], list(options["include"]), list(options["exclude"]),
+                limits["max_file_bytes"], fmt=options["format"], jobs=limits["jobs"],
+                max_in_flight=limits["max_in_flight"], cache=cache,
+                file_commits=options["file_commits"], max_tokens=options["max_tokens"],
+                max_files=max_files, max_total_bytes=limits["max_total_bytes"],
+                recent_window=options["recent"],
+            )
+        finally:
+            if cache is not None:
+                cache.close()
+        body = out if isinstance(out, bytes) else out.encode("utf-8")
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        content_type = _CONTENT_TYPES.get(options["format"], "text/plain; charset=utf-8")
+        return Package(body, etag, content_type, stats)
+
+
+class _Build:
+    def __init__(self):
+        self.done = threading.Event()
+        self.package: Optional[Package] = None
+        self.error: Optional[BaseException] = None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "repo-contextor"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self._serve(send_body=True)
+
+    def do_HEAD(self) -> None:
+        self._serve(send_body=False)
+
+    def _serve(self, send_body: bool) -> None:
+        url = urlsplit(self.path)
+        if url.path not in ("/", "/package"):
+            self._send_error(404, "not found; use /package?format=...", send_body)
+            return
+        try:
+            options = parse_query(url.query)
+        except ValueError as e:
+            self._send_error(400, str(e), send_body)
+            return
+        try:
+            package, how = self.server.service.get(options)
+        except Exception as e:
+            self._send_error(500, f"{type(e).__name__}: {e}", send_body)
+            return
+
+        if _etag_matches(self.headers.get("If-None-Match"), package.etag):
+            self.send_response(304)
+            self.send_header("ETag", package.etag)
+            self.send_header("X-Rcpack-Cache", how)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", package.content_type)
+        self.send_header("Content-Length", str(len(package.body)))
+        self.send_header("ETag", package.etag)
+        # clients may keep the body but must check back: the repository can change
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("X-Rcpack-Cache", how)
+        self.send_header("X-Rcpack-Files", str(package.stats["files"]))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(package.body)
+
+    def _send_error(self, status: int, message: str, send_body: bool) -> None:
+        body = (message + "\n").encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    # If-None-Match uses weak comparison
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def _patterns(values: List[str]) -> Tuple[str, ...]:
+    return tuple(p.strip() for value in values for p in value.split(",") if p.strip())
+
+
+def _flag(value: Optional[str]) -> bool:
+    return value is not None and value.lower() in ("", "1", "true", "yes", "on")
+
+
+def _count(value: Optional[str], name: str) -> Optional[int]:
+    if value is None:
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise ValueError(f"{name} must be a positive integer, got {value!r}")
+    return number
@@ -0,0 +1,144 @@
+"""Split a package into numbered shards for --shard-size.
+
+Files are kept whole and in path order: a shard takes files until the next one
+would push it past the size, and a file bigger than a whole shard gets a shard
+of its own. Every shard repeats the header (repository info and the tree), and
+a JSON manifest records which paths went into which shard. Shards are rendered
+and written on a process pool, so rendering and compression use every core;
+each worker is sent only the files of the shards it writes.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .compress import SUFFIXES
+from .io_utils import write_output
+
+# Rough per-file cost in bytes of the heading, size, fence and blank lines
+FILE_OVERHEAD_BYTES = 64
+
+# set in each pool worker by _init_worker
+_render: Optional[Callable[[Any], str]] = None
+
+_SIZE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmg]?)\s*(b|t|tok|tokens)?\s*$", re.IGNORECASE)
+
+
+def parse_shard_size(text: str) -> Tuple[int, str]:
+    """Parse "2M", "500000" or "1.5MB" (bytes) and "150kt" or "200k tokens" (tokens).
+
+    Returns (size, unit) with unit "bytes" or "tokens". K, M and G multiply by
+    1024 for bytes and by 1000 for tokens. Raises ValueError otherwise.
+    """
+    match = _SIZE_RE.match(text)
+    if not match:
+        raise ValueError(f"invalid shard size: {text!r} (e.g. 2M, 500000 or 150k tokens)")
+    number, multiplier, unit = match.groups()
+    unit = "tokens" if unit and unit[0].lower() == "t" else "bytes"
+    base = 1000 if unit == "tokens" else 1024
+    size = int(float(number) * base ** " kmg".index(multiplier.lower() or " "))
+    if size < 1:
+        raise ValueError(f"shard size must be positive, got {text!r}")
+    return size, unit
+
+
+def plan_shards(costs: Sequence[int], limit: int, header: int) -> List[List[int]]:
+    """Group item indexes, in order, into shards of about `limit` each.
+
+    Every shard costs `header` plus the costs of its items; an item is never
+    split, so one that does not fit even an empty shard is placed alone.
+    Always returns at least one (possibly empty) shard.
+    """
+    shards: List[List[int]] = []
+    current: List[int] = []
+    used = header
+    for i, cost in enumerate(costs):
+        if current and used + cost > limit:
+            shards.append(current)
+            current = []
+            used = header
+        current.append(i)
+        used += cost
+    if current or not shards:
+        shards.append(current)
+    return shards
+
+
+def shard_names(output: str, count: int) -> List[str]:
+    """Numbered file names for `output`: ctx.md -> ctx-001.md, ctx.md.gz -> ctx-001.md.gz."""
+    path = Path(output)
+    stem, suffix = _split_name(path.name)
+    width = max(3, len(str(count)))
+    return [str(path.with_name(f"{stem}-{i:0{width}d}{suffix}")) for i in range(1, count + 1)]
+
+
+def manifest_name(output: str) -> str:
+    """ctx.md (or ctx.md.gz) -> ctx.manifest.json, next to the shards."""
+    path = Path(output)
+    return str(path.with_name(f"{_split_name(path.name)[0]}.manifest.json"))
+
+
+def write_shards(render: Callable[[Any], str], shards: Sequence[Any], names: List[str],
+                 compress: Optional[str] = None, workers: Optional[int] = None) -> List[int]:
+    """Render shards[i] with render(shards[i]) and write it to names[i]; returns characters per shard.
+
+    Runs on a process pool when there is more than one shard and core. `render`
+    should only hold what every shard shares (such as the header); it is
+    pickled to each worker once, when the worker starts. Each task carries
+    just its own shard, so no worker is sent the whole package.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(names))
+    if workers <= 1:
+        return [_write_one(render, name, compress, shard) for name, shard in zip(names, shards)]
+    from concurrent.futures import ProcessPoolExecutor  # multiprocessing is slow to import
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(render,)) as pool:
+        return list(pool.map(_write_worker, names, [compress] * len(names), shards))
+
+
+def write_manifest(path: str, root: str, size: int, unit: str, names: List[str],
+                   shards: List[List[str]], sizes: List[int]) -> None:
+    manifest: Dict[str, Any] = {
+        "root": root,
+        "shard_size": size,
+        "unit": unit,
+        "shards": [
+            {"file": Path(name).name, "paths": paths, "chars": chars}
+            for name, paths, chars in zip(names, shards, sizes)
+        ],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+_COMPRESSED = set(SUFFIXES.values()) | {".gzip", ".lzma", ".zstd"}
+
+
+def _split_name(name: str) -> Tuple[str, str]:
+    """("ctx", ".md.gz") for ctx.md.gz: the format suffix plus any compression suffix."""
+    suffixes = Path(name).suffixes
+    keep = 2 if suffixes and suffixes[-1].lower() in _COMPRESSED else 1
+    suffix = "".join(suffixes[-keep:])
+    if not suffix or suffix == name:
+        return name, ""
+    return name[: -len(suffix)], suffix
+
+
+def _init_worker(render: Callable[[Any], str]) -> None:
+    global _render
+    _render = render
+
+
+def _write_worker(name: str, compress: Optional[str], shard: Any) -> int:
+    return _write_one(_render, name, compress, shard)
+
+
+def _write_one(render: Callable[[Any], str], name: str, compress: Optional[str], shard: Any) -> int:
+    text = render(shard)
+    write_output(name, text, compress)
+    return len(text)
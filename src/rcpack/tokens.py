@@ -0,0 +1,118 @@
+"""Token estimation and token-budget packing for --max-tokens."""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Container, Dict, List, Optional, Tuple
+
+Estimator = Callable[[str], int]
+
+# Rough per-file cost of the heading, blank lines and code fence around a file
+FILE_OVERHEAD_TOKENS = 12
+# Cost of the header, repository info and summary sections
+HEADER_TOKENS = 80
+# Below this many remaining tokens a file is dropped rather than cut down
+MIN_PARTIAL_TOKENS = 64
+# Appended to a file cut down to fit the budget
+BUDGET_NOTE = "\n\n[... TRUNCATED to fit the token budget ...]"
+
+_PRIORITY_NAMES = {
+    "readme", "license", "changelog", "contributing", "makefile", "dockerfile",
+    "package.json", "pyproject.toml", "setup.py", "setup.cfg", "requirements.txt",
+    "cargo.toml", "go.mod", "pom.xml", "build.gradle", "tsconfig.json",
+}
+_PRIORITY_EXTS = (".toml", ".cfg", ".ini", ".yaml", ".yml")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap offline estimate: about four characters per token."""
+    return (len(text) + 3) // 4
+
+
+_ESTIMATORS: Dict[str, Callable[[], Estimator]] = {
+    "heuristic": lambda: estimate_tokens,
+}
+
+
+def register_estimator(name: str, factory: Callable[[], Estimator]) -> None:
+    """Make a tokenizer available to get_estimator(); `factory` is called lazily."""
+    _ESTIMATORS[name] = factory
+
+
+def get_estimator(name: str = "heuristic") -> Estimator:
+    """Return a token counter by name.
+
+    "heuristic" needs nothing; "tiktoken" or "tiktoken:<encoding>" uses the
+    optional tiktoken package.
+    """
+    if name in _ESTIMATORS:
+        return _ESTIMATORS[name]()
+    if name == "tiktoken" or name.startswith("tiktoken:"):
+        try:
+            import tiktoken
+        except ImportError:
+            raise RuntimeError("tiktoken not installed; run `pip install tiktoken`")
+        encoding = tiktoken.get_encoding(name.partition(":")[2] or "cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    raise ValueError(f"Unknown tokenizer: {name}")
+
+
+def _priority(section: Dict[str, Any], tokens: int, recent: Container[str]) -> Tuple:
+    path = section["path"]
+    name = path.rsplit("/", 1)[-1].lower()
+    top_level = "/" not in path
+    if name.split(".", 1)[0] == "readme" or name in _PRIORITY_NAMES or (
+        top_level and name.endswith(_PRIORITY_EXTS)
+    ):
+        group = 0
+    elif path in recent:
+        group = 1
+    else:
+        group = 2
+    return group, tokens, path
+
+
+def pack_to_budget(
+    sections: List[Dict[str, Any]],
+    budget: int,
+    estimate: Estimator = estimate_tokens,
+    recent: Container[str] = (),
+    reserved: int = 0,
+) -> Tuple[List[Dict[str, Any]], int, int]:
+    """Pick (and if needed cut down) sections so they fit in `budget` tokens.
+
+    Sections are dicts with "path" and "content". They are taken in priority
+    order: README and config files, then paths in `recent`, then the rest,
+    with smaller files first inside each group. A file that does not fit is
+    truncated to the remaining budget, or dropped if too little is left.
+    `reserved` tokens (tree, headers) are taken off the budget first.
+
+    Returns (selected sections in their original order, tokens used, dropped).
+    Each file is estimated once, so this is O(n log n) in the number of files.
+    """
+    remaining = budget - reserved
+    costs = [estimate(s["content"]) + FILE_OVERHEAD_TOKENS for s in sections]
+    order = sorted(range(len(sections)), key=lambda i: _priority(sections[i], costs[i], recent))
+
+    chosen: Dict[int, Dict[str, Any]] = {}
+    for i in order:
+        cost = costs[i]
+        if cost <= remaining:
+            chosen[i] = sections[i]
+            remaining -= cost
+        elif remaining >= MIN_PARTIAL_TOKENS:
+            section = dict(sections[i])
+            content = section["content"]
+            room = remaining - FILE_OVERHEAD_TOKENS - estimate(BUDGET_NOTE)
+            keep = max(int(len(content) * room / max(cost - FILE_OVERHEAD_TOKENS, 1)), 0)
+            section["content"] = content[:keep] + BUDGET_NOTE
+            section["is_truncated"] = True
+            chosen[i] = section
+            remaining -= estimate(section["content"]) + FILE_OVERHEAD_TOKENS
+
+    selected = [chosen[i] for i in sorted(chosen)]
+    return selected, budget - remaining, len(sections) - len(selected)
+
+
+def reserve_for(tree_text: str, estimate: Optional[Estimator] = None) -> int:
+    """Tokens to set aside for everything but the file contents."""
+    return HEADER_TOKENS + (estimate or estimate_tokens)(tree_text)
@@ -1,40 +1,163 @@
 """Tree view generation for repository structure."""
 
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence
 
 
-def create_tree_view(repo_path: Path, files_data: Dict[str, str]) -> str:
+def create_tree_view(repo_path: Path, files_data: Dict[str, str], max_depth: Optional[int] = None,
+                     max_entries: Optional[int] = None, sizes: Optional[Mapping[str, int]] = None) -> str:
     """Create a tree view of the repository structure."""
     paths = list(files_data.keys())
-    return render_tree(paths)
+    return render_tree(paths, max_depth, max_entries, sizes)
 
 
-def render_tree(paths: List[str]) -> str:
-    """Render a tree view from a list of relative POSIX paths."""
-    tree_structure: dict = {}
+def render_tree(paths: List[str], max_depth: Optional[int] = None,
+                max_entries: Optional[int] = None, sizes: Optional[Mapping[str, int]] = None) -> str:
+    """Render a tree view from a list of relative POSIX paths.
 
+    Directories come before files at every level, each sorted by name. See
+    iter_tree_lines for `max_depth`, `max_entries` and `sizes`.
+    """
+    text = "\n".join(iter_tree_lines(paths, max_depth, max_entries, sizes))
+    return text or "No files found"
+
+
+# Node fields: depth, name, is_dir, files below (1 for a file), bytes below, child count
+_Node = List
+
+
+def iter_tree_lines(paths: Sequence[str], max_depth: Optional[int] = None,
+                    max_entries: Optional[int] = None,
+                    sizes: Optional[Mapping[str, int]] = None) -> Iterator[str]:
+    """Yield the lines of the tree one at a time.
+
+    - max_depth: show entries at most this many levels deep; the contents of
+      deeper directories are summarized in a single "… N files" line
+    - max_entries: list at most this many entries of a directory, then one
+      "… N more files" line for the rest, so huge directories stay small
+    - sizes: optional {path: bytes}; summaries then include the total size
+
+    Paths are sorted once into display order, after which the tree is built
+    and rendered in linear passes with no per-directory sorting.
+    """
+    nodes = _build_nodes(paths, sizes)
+    root_children = sum(1 for node in nodes if node[0] == 0)
+
+    # per open level: children listed so far, child count, prefix for its children
+    shown = [0]
+    counts = [root_children]
+    prefixes = [""]
+    i = 0
+    while i < len(nodes):
+        depth, name, is_dir, files, size, children = nodes[i]
+        if len(shown) > depth + 1:
+            del shown[depth + 1:], counts[depth + 1:], prefixes[depth + 1:]
+        prefix = prefixes[depth]
+
+        if max_entries is not None and shown[depth] >= max_entries:
+            # collapse this entry and every later sibling into one line
+            hidden_files = 0
+            hidden_bytes = 0
+            while i < len(nodes) and nodes[i][0] >= depth:
+                if nodes[i][0] == depth:
+                    hidden_files += nodes[i][3]
+                    hidden_bytes += nodes[i][4]
+                i += 1
+            shown[depth] = counts[depth]
+            yield f"{prefix}└── … {_summary(hidden_files, hidden_bytes, sizes, 'more ')}"
+            continue
+
+        shown[depth] += 1
+        is_last = shown[depth] == counts[depth]
+        yield f"{prefix}{'└── ' if is_last else '├── '}{name}"
+        i += 1
+        if not is_dir:
+            continue
+
+        child_prefix = prefix + ("    " if is_last else "│   ")
+        if max_depth is not None and depth + 1 >= max_depth:
+            # skip the subtree, leaving a summary of what it holds
+            while i < len(nodes) and nodes[i][0] > depth:
+                i += 1
+            yield f"{child_prefix}└── … {_summary(files, size, sizes)}"
+            continue
+        shown.append(0)
+        counts.append(children)
+        prefixes.append(child_prefix)
+
+
+def _build_nodes(paths: Sequence[str], sizes: Optional[Mapping[str, int]]) -> List[_Node]:
+    """Flatten the tree into nodes in display (depth-first) order in one pass."""
+    split = []
     for p in paths:
-        parts = Path(p).parts
-        current = tree_structure
-        for part in parts[:-1]:
-            if part not in current:
-                current[part] = {}
-            current = current[part]
-        if parts:
-            current[parts[-1]] = None
-
-    def _render(structure: dict, prefix: str = "") -> str:
-        lines = []
-        items = sorted(structure.items(), key=lambda x: (x[1] is None, x[0]))
-        for i, (name, subtree) in enumerate(items):
-            is_last = i == len(items) - 1
-            lines.append(f"{prefix}{'└── ' if is_last else '├── '}{name}")
-            if subtree is not None:
-                extension = ("    " if is_last else "│   ")
-                lines.append(_render(subtree, prefix + extension))
-        return "\n".join(filter(None, lines))
-
-    if not tree_structure:
-        return "No files found"
-    return _render(tree_structure)
\ No newline at end of file
+        if "//" in p or "./" in p or p.endswith("/"):
+            parts = list(Path(p).parts)  # normalize unusual spellings like Path does
+        else:
+            parts = p.split("/")
+        if parts and parts[0]:
+            # one string per path that sorts directories before files at every
+            # level: "0dir" < "1file", and "\0" ends a name before any other char
+            dirs = parts[:-1]
+            key = ("0" + "\0" "0".join(dirs) + "\0" if dirs else "") + "1" + parts[-1]
+            split.append((key, dirs, parts[-1], p))
+    split.sort(key=lambda item: item[0])
+
+    nodes: List[_Node] = []
+    open_names: List[str] = []  # open directories, outermost first
+    open_nodes: List[_Node] = []
+    previous = None
+    for key, dirs, name, p in split:
+        if key == previous:
+            continue
+        previous = key
+
+        if dirs != open_names:
+            # close directories that are not ancestors of this path
+            common = 0
+            limit = min(len(open_names), len(dirs))
+            while common < limit and open_names[common] == dirs[common]:
+                common += 1
+            while len(open_nodes) > common:
+                node = open_nodes.pop()
+                open_names.pop()
+                if open_nodes:
+                    # a closed directory's totals are final; roll them into its parent
+                    open_nodes[-1][3] += node[3]
+                    open_nodes[-1][4] += node[4]
+            for d in dirs[common:]:
+                node = [len(open_nodes), d, True, 0, 0, 0]
+                if open_nodes:
+                    open_nodes[-1][5] += 1
+                nodes.append(node)
+                open_nodes.append(node)
+                open_names.append(d)
+
+        size = (sizes.get(p) or 0) if sizes else 0
+        nodes.append([len(open_nodes), name, False, 1, size, 0])
+        if open_nodes:
+            parent = open_nodes[-1]
+            parent[3] += 1
+            parent[4] += size
+            parent[5] += 1
+
+    while open_nodes:
+        node = open_nodes.pop()
+        if open_nodes:
+            open_nodes[-1][3] += node[3]
+            open_nodes[-1][4] += node[4]
+    return nodes
+
+
+def _summary(files: int, size: int, sizes, more: str = "") -> str:
+    text = f"{files:,} {more}file{'s' if files != 1 else ''}"
+    if sizes:
+        text += f" ({_human_size(size)})"
+    return text
+
+
+def _human_size(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
@@ -0,0 +1,254 @@
+"""Watch mode: keep the package inputs resident and refresh only what changed."""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# inotify(7) event bits
+_IN_MODIFY = 0x002
+_IN_ATTRIB = 0x004
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_IGNORED = 0x8000
+_IN_WATCH_MASK = (
+    _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+# how long to keep collecting events after the first one, so that a burst of
+# writes (e.g. an editor's save) produces a single refresh
+_SETTLE_SECONDS = 0.05
+
+
+def _stat_key(path: Path) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class LiveIndex:
+    """The discovered files and their read results, kept in memory.
+
+    `discover(inputs)` selects files below the given paths (like
+    discover_files) and `read(path)` produces the entry stored for a file.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        discover: Callable[[List[Path]], List[Path]],
+        read: Callable[[Path], Any],
+    ):
+        self.root = root
+        self._discover = discover
+        self._read = read
+        self.entries: Dict[Path, Any] = {}
+        self._keys: Dict[Path, Optional[Tuple[int, int, int]]] = {}
+        self._dir_keys: Dict[Path, Optional[Tuple[int, int, int]]] = {}
+        for f in discover([root]):
+            self._load(f)
+        self._track_dirs()
+
+    @property
+    def files(self) -> List[Path]:
+        return sorted(self.entries)
+
+    @property
+    def dirs(self) -> Set[Path]:
+        return set(self._dir_keys)
+
+    def _load(self, f: Path) -> None:
+        self._keys[f] = _stat_key(f)
+        self.entries[f] = self._read(f)
+
+    def _drop(self, f: Path) -> None:
+        self._keys.pop(f, None)
+        self.entries.pop(f, None)
+
+    def _track_dirs(self) -> None:
+        dirs = {self.root}
+        for f in self.entries:
+            for parent in f.parents:
+                if parent in dirs or parent == self.root.parent:
+                    break
+                dirs.add(parent)
+        self._dir_keys = {d: self._dir_keys.get(d) or _stat_key(d) for d in dirs}
+
+    def refresh(self, touched: Optional[Iterable[Path]] = None, rescan: bool = False) -> bool:
+        """Bring the index up to date; returns True if any entry changed.
+
+        Known files (only the touched ones, when the notifier reports paths)
+        are re-stat'ed and re-read only when their (mtime, size, inode)
+        changed. New paths come from `touched`, from directories whose mtime
+        changed (polling), or from a full rediscovery when `rescan` is set.
+        """
+        changed = False
+        suspects: Iterable[Path] = list(self._keys)
+        if touched is not None and not rescan:
+            touched = set(touched)
+            # a vanished path that is not a known file may be a removed
+            # directory of known files, so everything has to be checked; one
+            # that never held any (replace_output's temp file) is harmless
+            if all(p in self._keys or p not in self._dir_keys or p.exists() for p in touched):
+                suspects = [p for p in touched if p in self._keys]
+        for f in suspects:
+            key = self._keys[f]
+            new_key = _stat_key(f)
+            if new_key == key:
+                continue
+            changed = True
+            if new_key is None:
+                self._drop(f)
+            else:
+                self._load(f)
+
+        candidates: Set[Path] = set(touched or ())
+        if touched is None:
+            for d, key in list(self._dir_keys.items()):
+                new_key = _stat_key(d)
+                if new_key != key:
+                    self._dir_keys[d] = new_key
+                    candidates.update(_list_dir(d))
+
+        if rescan:
+            found = set(self._discover([self.root]))
+            for f in set(self.entries) - found:
+                self._drop(f)
+                changed = True
+            new = found - set(self.entries)
+        else:
+            new = set()
+            for p in candidates:
+                if p in self.entries or not p.exists():
+                    continue
+                new.update(self._discover([p]))
+        for f in new - set(self.entries):
+            self._load(f)
+            changed = True
+
+        if changed:
+            self._track_dirs()
+        return changed
+
+
+def _list_dir(d: Path) -> List[Path]:
+    try:
+        with os.scandir(d) as it:
+            return [Path(entry.path) for entry in it]
+    except OSError:
+        return []
+
+
+class _Inotify:
+    """Minimal non-recursive inotify(7) wrapper over ctypes (Linux only)."""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name or not hasattr(select, "poll"):
+            raise OSError("inotify is not available")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        # macOS and the BSDs have a libc and poll() but no inotify symbols
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[int, Path] = {}
+        self._poll = select.poll()
+        self._poll.register(self.fd, select.POLLIN)
+
+    def watch(self, dirs: Iterable[Path]) -> None:
+        known = set(self._dirs.values())
+        for d in dirs:
+            if d in known:
+                continue
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(d)), _IN_WATCH_MASK)
+            # out of watches (ENOSPC) etc.: periodic rescans still cover it
+            if wd >= 0:
+                self._dirs[wd] = d
+
+    def wait(self, timeout: float) -> Optional[Set[Path]]:
+        """Block until events arrive; returns the touched paths, or None on timeout."""
+        if not self._poll.poll(timeout * 1000):
+            return None
+        touched: Set[Path] = set()
+        deadline = time.monotonic() + _SETTLE_SECONDS
+        while True:
+            self._drain(touched)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._poll.poll(remaining * 1000):
+                return touched
+
+    def _drain(self, touched: Set[Path]) -> None:
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(buf):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, offset)
+                offset += _EVENT_HEADER.size
+                name = buf[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & _IN_IGNORED:
+                    # the watched directory itself is gone
+                    self._dirs.pop(wd, None)
+                    continue
+                d = self._dirs.get(wd)
+                if d is not None and name:
+                    touched.add(d / os.fsdecode(name))
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def watch(
+    index: LiveIndex,
+    on_update: Callable[[], None],
+    interval: float = 0.5,
+    rescan_seconds: float = 30.0,
+) -> None:
+    """Call on_update() whenever the index changes; runs until interrupted.
+
+    Uses inotify when available and stat polling every `interval` seconds
+    otherwise. A full rediscovery runs every `rescan_seconds` to catch files
+    in directories that hold no selected files yet.
+    """
+    try:
+        notifier: Optional[_Inotify] = _Inotify()
+    except OSError:
+        notifier = None
+
+    try:
+        last_rescan = time.monotonic()
+        while True:
+            if notifier is not None:
+                notifier.watch(index.dirs)
+                timeout = max(rescan_seconds - (time.monotonic() - last_rescan), 0)
+                touched = notifier.wait(timeout)
+                if touched is None:
+                    touched = set()
+            else:
+                time.sleep(interval)
+                touched = None
+            rescan = time.monotonic() - last_rescan >= rescan_seconds
+            if rescan:
+                last_rescan = time.monotonic()
+            if index.refresh(touched, rescan=rescan):
+                on_update()
+    finally:
+        if notifier is not None:
+            notifier.close()
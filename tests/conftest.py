@@ -0,0 +1,43 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+_GIT_ENV = {
+    "GIT_AUTHOR_NAME": "Test", "GIT_AUTHOR_EMAIL": "test@example.com",
+    "GIT_COMMITTER_NAME": "Test", "GIT_COMMITTER_EMAIL": "test@example.com",
+    "GIT_CONFIG_GLOBAL": os.devnull, "GIT_CONFIG_NOSYSTEM": "1",
+}
+
+
+class GitRepo:
+    """A throwaway git repository; `git(...)` runs a command in it."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def git(self, *args):
+        return subprocess.run(
+            ["git", *args], cwd=self.path, check=True, capture_output=True,
+            env={**os.environ, **_GIT_ENV},
+        ).stdout.decode()
+
+    def write(self, rel, content):
+        target = self.path / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content.encode() if isinstance(content, str) else content)
+        return target
+
+    def commit(self, message="change"):
+        self.git("add", "-A")
+        self.git("commit", "-q", "-m", message)
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    if shutil.which("git") is None:
+        pytest.skip("git is not installed")
+    repo = GitRepo(tmp_path)
+    repo.git("init", "-q", "-b", "main")
+    return repo
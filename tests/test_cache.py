@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import sys
+import time
+
+import pytest
+
+from rcpack import cache as cache_mod
+from rcpack import cli
+from rcpack.cache import ContentCache, cached_read
+
+OLD = time.time_ns() - 3600 * 10**9
+
+
+def _file(tmp_path, content="hello\n", name="a.txt"):
+    path = tmp_path / name
+    path.write_text(content)
+    # outside the racy window, so put() actually stores it
+    os.utime(path, ns=(OLD, OLD))
+    return path
+
+
+def _read(path, reads):
+    def read():
+        reads.append(path)
+        return {"content": path.read_text()}
+    return read
+
+
+def _cached(cache_dir, path, reads):
+    with ContentCache(cache_dir) as cache:
+        return cached_read(cache, path, "v", _read(path, reads)), cache
+
+
+def test_unchanged_file_is_served_from_the_cache(tmp_path):
+    path = _file(tmp_path)
+    reads = []
+    _cached(tmp_path / "cache", path, reads)
+    record, cache = _cached(tmp_path / "cache", path, reads)
+    assert record == {"content": "hello\n"}
+    assert len(reads) == 1
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_variants_are_cached_separately(tmp_path):
+    path = _file(tmp_path)
+    reads = []
+    with ContentCache(tmp_path / "cache") as cache:
+        cached_read(cache, path, "v", _read(path, reads))
+    with ContentCache(tmp_path / "cache") as cache:
+        cached_read(cache, path, "other", _read(path, reads))
+    assert len(reads) == 2
+
+
+def _touch_mtime(path):
+    os.utime(path, ns=(OLD, OLD + 10**9))
+
+
+def _grow(path):
+    path.write_text("hello, world\n")
+    os.utime(path, ns=(OLD, OLD))
+
+
+def _replace_inode(path):
+    # same size and mtime, different inode: an editor's atomic save
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text("HELLO\n")
+    os.utime(tmp, ns=(OLD, OLD))
+    os.replace(tmp, path)
+
+
+@pytest.mark.parametrize("change", [_touch_mtime, _grow, _replace_inode])
+def test_changed_file_is_read_again(tmp_path, change):
+    path = _file(tmp_path)
+    reads = []
+    _cached(tmp_path / "cache", path, reads)
+    change(path)
+    record, cache = _cached(tmp_path / "cache", path, reads)
+    assert record == {"content": path.read_text()}
+    assert len(reads) == 2
+    assert cache.misses == 1
+
+
+def test_recently_modified_file_is_not_stored(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("fresh\n")
+    reads = []
+    _cached(tmp_path / "cache", path, reads)
+    _cached(tmp_path / "cache", path, reads)
+    assert len(reads) == 2
+
+
+def test_corrupt_database_is_recreated(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    (cache_dir / "contents.sqlite3").write_bytes(b"not a database" * 100)
+    path = _file(tmp_path)
+    reads = []
+    _cached(cache_dir, path, reads)
+    record, cache = _cached(cache_dir, path, reads)
+    assert record == {"content": "hello\n"}
+    assert cache.hits == 1
+
+
+def test_locked_database_is_skipped_not_deleted(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_mod, "_BUSY_TIMEOUT", 0.05)
+    cache_dir = tmp_path / "cache"
+    path = _file(tmp_path)
+    reads = []
+    _cached(cache_dir, path, reads)
+
+    other_file = _file(tmp_path, "other\n", "b.txt")
+    other = sqlite3.connect(str(cache_dir / "contents.sqlite3"))
+    other.execute("BEGIN EXCLUSIVE")
+    try:
+        record, cache = _cached(cache_dir, other_file, reads)
+    finally:
+        other.rollback()
+        other.close()
+    assert record == {"content": "other\n"}
+    assert len(reads) == 2
+
+    # the entry written before the lock survived
+    _, cache = _cached(cache_dir, path, reads)
+    assert cache.hits == 1
+
+
+def test_database_locked_after_open_reads_as_a_miss(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_mod, "_BUSY_TIMEOUT", 0.05)
+    cache_dir = tmp_path / "cache"
+    path = _file(tmp_path)
+    reads = []
+    _cached(cache_dir, path, reads)
+
+    with ContentCache(cache_dir) as cache:
+        other = sqlite3.connect(str(cache_dir / "contents.sqlite3"))
+        other.execute("BEGIN EXCLUSIVE")
+        try:
+            record = cached_read(cache, path, "v", _read(path, reads))
+        finally:
+            other.rollback()
+            other.close()
+    assert record == {"content": "hello\n"}
+    assert cache.misses == 1
+
+
+def _run_cli(monkeypatch, tmp_path, *args):
+    repo = tmp_path / "repo"
+    repo.mkdir(exist_ok=True)
+    _file(repo, "print('hi')\n", "main.py")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+    monkeypatch.setattr(sys, "argv", ["repo-contextor", str(repo), "-o", str(tmp_path / "out.md"),
+                                      *args])
+    cli.main()
+    return (tmp_path / "xdg" / "rcpack" / "contents.sqlite3").exists()
+
+
+def test_no_cache_never_creates_the_database(tmp_path, monkeypatch):
+    assert not _run_cli(monkeypatch, tmp_path, "--no-cache")
+    assert "print('hi')" in (tmp_path / "out.md").read_text()
+    assert _run_cli(monkeypatch, tmp_path)
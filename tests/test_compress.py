@@ -0,0 +1,124 @@
+import gzip
+import io
+import threading
+
+import pytest
+
+from rcpack import compress
+from rcpack.compress import CompressedWriter, codec_for, read_package
+
+TEXT = "".join(f"line {i}: héllo wörld\n" for i in range(20000))
+
+
+def _available(codec):
+    try:
+        compress.check_codec(codec)
+    except RuntimeError:
+        return False
+    return True
+
+
+@pytest.mark.parametrize("codec", [c for c in compress.CODECS if _available(c)])
+def test_round_trip(tmp_path, codec, monkeypatch):
+    monkeypatch.setattr(compress, "_CHUNK", 4096)
+    path = tmp_path / ("out" + compress.SUFFIXES[codec])
+    with CompressedWriter(open(path, "wb"), codec) as out:
+        for start in range(0, len(TEXT), 1000):
+            out.write(TEXT[start:start + 1000])
+    assert read_package(path) == TEXT
+
+
+def test_gzip_output_is_reproducible():
+    outputs = []
+    for _ in range(2):
+        raw = io.BytesIO()
+        writer = CompressedWriter(raw, "gzip", close_raw=False)
+        writer.write(TEXT)
+        writer.close()
+        assert not raw.closed
+        outputs.append(raw.getvalue())
+    assert outputs[0] == outputs[1]
+    assert gzip.decompress(outputs[0]).decode("utf-8") == TEXT
+
+
+class _FailingRaw(io.RawIOBase):
+    """Accepts a few writes, then fails like a full disk."""
+
+    def __init__(self, ok_writes=2):
+        self.ok_writes = ok_writes
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self.ok_writes == 0:
+            raise OSError(28, "No space left on device")
+        self.ok_writes -= 1
+        return len(data)
+
+
+def test_compressor_error_surfaces_on_write_or_close(monkeypatch):
+    monkeypatch.setattr(compress, "_CHUNK", 1024)
+    monkeypatch.setattr(compress, "_QUEUE_CHUNKS", 1)
+    writer = CompressedWriter(_FailingRaw(), "xz")
+    noise = "".join(chr(0x4E00 + (i * 7919) % 20000) for i in range(50000))
+    with pytest.raises(OSError, match="No space"):
+        # the error must stop the writer, not leave it blocked on a full queue
+        for _ in range(200):
+            writer.write(noise)
+    with pytest.raises(OSError, match="No space"):
+        writer.close()
+    writer.close()
+    assert writer.closed
+    assert not any(t.name == "rcpack-compress" for t in threading.enumerate())
+
+
+def test_error_after_the_last_chunk_does_not_hang_close():
+    class BrokenClose(io.BytesIO):
+        def flush(self):
+            raise OSError("flush failed")
+
+    writer = CompressedWriter(BrokenClose(), "gzip", close_raw=False)
+    writer.write("hello\n")
+    # the compressor has already seen the end of the stream when this fails
+    with pytest.raises(OSError, match="flush failed"):
+        writer.close()
+    writer.close()
+    assert not any(t.name == "rcpack-compress" for t in threading.enumerate())
+
+
+def test_write_after_close_raises():
+    writer = CompressedWriter(io.BytesIO(), "gzip")
+    writer.close()
+    with pytest.raises(ValueError):
+        writer.write("late")
+
+
+def test_unknown_codec_closes_the_raw_file():
+    raw = io.BytesIO()
+    with pytest.raises(ValueError):
+        CompressedWriter(raw, "rar")
+    assert raw.closed
+
+
+@pytest.mark.parametrize("path, flag, codec", [
+    ("out.md.gz", None, "gzip"),
+    ("out.ZST", None, "zstd"),
+    ("out.md", None, None),
+    (None, None, None),
+    ("out.md.gz", "none", None),
+    ("out.md", "xz", "xz"),
+])
+def test_codec_for(path, flag, codec):
+    assert codec_for(path, flag) == codec
+
+
+def test_codec_for_rejects_unknown_names():
+    with pytest.raises(ValueError):
+        codec_for("out.md", "rar")
+
+
+def test_read_package_detects_uncompressed_files(tmp_path):
+    path = tmp_path / "out.gz"
+    path.write_text("plain\r\ntext\n", newline="")
+    assert read_package(path) == "plain\r\ntext\n"
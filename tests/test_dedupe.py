@@ -0,0 +1,74 @@
+import json
+
+from rcpack.packager import _dedupe, build_package
+
+BODY = "def helper():\n    return 42\n"
+
+
+def _repo(tmp_path, files):
+    repo = tmp_path / "repo"
+    for rel, content in files.items():
+        path = repo / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content) if isinstance(content, str) else path.write_bytes(content)
+    return str(repo)
+
+
+def _package(repo, **kwargs):
+    out, stats = build_package([repo], None, None, fmt="json", **kwargs)
+    return {f["path"]: f for f in json.loads(out)["files"]}, json.loads(out)["summary"], stats
+
+
+def test_repeated_files_reference_the_first_copy(tmp_path):
+    repo = _repo(tmp_path, {"a.py": BODY, "vendor/a.py": BODY, "x/copy.py": BODY, "b.py": "other\n"})
+    files, summary, stats = _package(repo)
+    assert files["a.py"]["content"] == BODY
+    for path in ("vendor/a.py", "x/copy.py"):
+        assert "content" not in files[path]
+        assert files[path]["content_ref"] == "a.py"
+        assert files[path]["language"] == "python"
+    assert "content_ref" not in files["b.py"]
+    assert stats["bytes_saved"] == summary["bytes_saved"] == 2 * len(BODY)
+
+
+def test_dedupe_can_be_turned_off(tmp_path):
+    repo = _repo(tmp_path, {"a.py": BODY, "b.py": BODY})
+    files, summary, stats = _package(repo, dedupe=False)
+    assert files["b.py"]["content"] == BODY
+    assert "bytes_saved" not in stats and "bytes_saved" not in summary
+
+
+def test_empty_and_binary_files_are_never_references(tmp_path):
+    repo = _repo(tmp_path, {"a.txt": "", "b.txt": "", "c.bin": b"\0\1\2" * 10, "d.bin": b"\0\1\2" * 10})
+    files, _, stats = _package(repo)
+    assert not any("content_ref" in f for f in files.values())
+    assert stats["bytes_saved"] == 0
+
+
+def test_markdown_names_the_original(tmp_path):
+    repo = _repo(tmp_path, {"a.py": BODY, "b.py": BODY})
+    out, _ = build_package([repo], None, None)
+    assert out.count(BODY.strip()) == 1
+    assert "content_ref: a.py" in out
+
+
+def test_budget_truncated_files_are_not_references(tmp_path):
+    big = "x = 1\n" * 2000
+    repo = _repo(tmp_path, {"a.py": big, "b.py": big})
+    files, _, stats = _package(repo, max_tokens=4500)
+    assert files["a.py"]["content"] == big
+    assert files["b.py"]["content"].startswith("x = 1\n") and files["b.py"]["content"] != big
+    assert stats["bytes_saved"] == 0
+
+
+def test_dedupe_keeps_order_and_counts_bytes():
+    sections = [{"path": p, "content": c} for p, c in [("a", "x"), ("b", "y"), ("c", "x")]]
+    loaded = {
+        "a": {"digest": "d1", "bytes": 5},
+        "b": {"digest": "d2", "bytes": 7},
+        "c": {"digest": "d1", "bytes": 5},
+    }
+    assert _dedupe(sections, loaded) == 5
+    assert sections == [
+        {"path": "a", "content": "x"}, {"path": "b", "content": "y"}, {"path": "c", "content_ref": "a"},
+    ]
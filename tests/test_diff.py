@@ -0,0 +1,71 @@
+import pytest
+
+from rcpack.gitinfo import get_changed_files, get_diff_patch, range_end, read_blobs
+
+
+@pytest.fixture
+def history(git_repo):
+    git_repo.write("keep.py", "keep\n")
+    git_repo.write("old name.py", "".join(f"line {i}\n" for i in range(40)))
+    git_repo.write("gone.py", "bye\n")
+    git_repo.write("sub/mod.py", "a = 1\n")
+    git_repo.commit("base")
+    git_repo.git("tag", "base")
+    git_repo.git("mv", "old name.py", "new name.py")
+    git_repo.path.joinpath("gone.py").unlink()
+    git_repo.write("sub/mod.py", "a = 2\n")
+    git_repo.write("added.py", "new\n")
+    git_repo.commit("next")
+    return git_repo
+
+
+def test_changed_files_in_a_range(history):
+    changes = get_changed_files(history.path, "base..HEAD")
+    assert sorted(changes, key=lambda c: c["path"]) == [
+        {"status": "A", "path": "added.py"},
+        {"status": "D", "path": "gone.py"},
+        {"status": "R", "old_path": "old name.py", "path": "new name.py"},
+        {"status": "M", "path": "sub/mod.py"},
+    ]
+
+
+def test_changed_files_since_a_ref_include_work_tree_and_untracked(history):
+    history.write("keep.py", "edited\n")
+    history.write("untracked.py", "u\n")
+    changes = get_changed_files(history.path, "HEAD")
+    assert {"status": "M", "path": "keep.py"} in changes
+    assert {"status": "A", "path": "untracked.py"} in changes
+    assert len(changes) == 2
+
+
+def test_changed_files_are_relative_to_a_subdirectory(history):
+    changes = get_changed_files(history.path / "sub", "base..HEAD")
+    assert changes == [{"status": "M", "path": "mod.py"}]
+
+
+def test_changed_files_unknown_rev(history):
+    assert get_changed_files(history.path, "no-such-ref") is None
+    with pytest.raises(ValueError):
+        get_changed_files(history.path, "--output=x")
+
+
+def test_diff_patch(history):
+    patch = get_diff_patch(history.path, "base..HEAD")
+    assert "-a = 1\n+a = 2\n" in patch
+    assert "rename from old name.py" in patch
+
+
+def test_read_blobs_at_a_commit(history):
+    blobs = read_blobs(history.path, "base", ["sub/mod.py", "old name.py", "added.py"])
+    assert blobs["sub/mod.py"] == b"a = 1\n"
+    assert blobs["old name.py"].startswith(b"line 0\n")
+    assert "added.py" not in blobs
+    assert read_blobs(history.path / "sub", "HEAD", ["mod.py"]) == {"mod.py": b"a = 2\n"}
+
+
+@pytest.mark.parametrize("rev, end", [
+    ("HEAD~2", None), ("main..feature", "feature"), ("main...feature", "feature"),
+    ("main..", "HEAD"), ("main...", "HEAD"),
+])
+def test_range_end(rev, end):
+    assert range_end(rev) == end
@@ -0,0 +1,34 @@
+import os
+
+from rcpack.discover import discover_files
+
+
+def _discover(root, **kwargs):
+    return [f.relative_to(root).as_posix() for f in discover_files([root], root, [], [], **kwargs)]
+
+
+def test_git_discovery_drops_symlinks_leaving_the_root(git_repo, tmp_path_factory):
+    outside = tmp_path_factory.mktemp("outside") / "outside.txt"
+    outside.write_text("SECRET")
+    git_repo.write("inside.txt", "hello")
+    os.symlink(outside, git_repo.path / "link.txt")
+    os.symlink(git_repo.path / "inside.txt", git_repo.path / "alias.txt")
+    git_repo.commit()
+    root = git_repo.path.resolve()
+    assert _discover(root) == ["inside.txt"]
+    assert _discover(root, use_git=False) == ["inside.txt"]
+
+
+def test_git_and_walker_discovery_agree(git_repo):
+    git_repo.write(".gitignore", "build/\n*.log\n")
+    git_repo.write("src/a.py", "a")
+    git_repo.write("src/pkg/b.py", "b")
+    git_repo.write("README.md", "r")
+    git_repo.write("build/out.py", "o")
+    git_repo.write("debug.log", "d")
+    git_repo.write("node_modules/x/index.js", "x")
+    git_repo.commit()
+    root = git_repo.path.resolve()
+    assert _discover(root) == _discover(root, use_git=False) == [
+        ".gitignore", "README.md", "src/a.py", "src/pkg/b.py",
+    ]
@@ -0,0 +1,90 @@
+import re
+
+import pytest
+
+from rcpack.io_utils import excerpt_bytes, read_excerpt
+from rcpack.packager import load_bytes, load_file
+
+_MARKER = re.compile(r"\n\[\.\.\. \d+ bytes, \d+ lines omitted \.\.\.\]\n")
+
+
+def _lines(n):
+    return "".join(f"line {i:05}\n" for i in range(n)).encode()
+
+
+def test_file_within_the_windows_is_read_whole(tmp_path):
+    raw = _lines(100)
+    path = tmp_path / "a.txt"
+    path.write_bytes(raw)
+    assert read_excerpt(path, len(raw) - 10, 10) == (raw.decode(), "utf-8", 100, False)
+
+
+def test_one_byte_over_the_windows_is_excerpted(tmp_path):
+    raw = _lines(100) + b"x"
+    path = tmp_path / "a.txt"
+    path.write_bytes(raw)
+    content, encoding, lines, elided = read_excerpt(path, 600, len(raw) - 601)
+    assert elided and encoding == "utf-8" and lines == 101
+    head, marker, tail = content.partition("\n[... 1 bytes, ")
+    assert head == raw[:600].decode()
+    assert tail.endswith(raw[601:].decode())
+
+
+def test_excerpt_cuts_on_character_boundaries():
+    raw = "€".encode() * 100
+    content, encoding, _, elided = excerpt_bytes(raw, 10, 10)
+    assert elided and encoding == "utf-8"
+    assert "�" not in content
+    head, _, tail = content.partition("\n[...")
+    assert head == "€" * 3
+    assert tail.endswith("€" * 3)
+
+
+def test_excerpt_of_binary_content():
+    assert excerpt_bytes(b"\x00" * 100, 10, 10) == (None, None, 0, False)
+
+
+@pytest.mark.parametrize("limit", [1, 7, 100, 12_288, 100_000])
+def test_load_file_around_the_limit(tmp_path, limit):
+    raw = b"x" * (limit - 1) + b"\n"
+    path = tmp_path / "a.txt"
+    path.write_bytes(raw)
+    record = load_file(path, limit)
+    assert record["content"] == raw.decode() and not record["truncated"]
+
+    path.write_bytes(raw + b"y")
+    record = load_file(path, limit)
+    assert record["truncated"] and record["size"] == limit + 1
+    # the excerpt holds at most `limit` bytes of the file, plus the marker
+    shown = _MARKER.sub("", record["content"])
+    assert len(shown.encode()) <= limit
+
+
+def test_large_limit_keeps_most_of_the_file(tmp_path):
+    raw = _lines(20_000)
+    path = tmp_path / "big.txt"
+    path.write_bytes(raw)
+    limit = 100_000
+    record = load_file(path, limit)
+    assert record["truncated"] and record["lines"] == 20_000
+    assert record["content"].startswith(raw[:limit * 2 // 3 - 11].decode())
+    assert len(record["content"].encode()) > limit - 100
+
+
+def test_load_bytes_matches_load_file(tmp_path):
+    raw = _lines(500)
+    path = tmp_path / "a.txt"
+    path.write_bytes(raw)
+    for limit in (100, len(raw)):
+        from_disk = load_file(path, limit)
+        in_memory = load_bytes(raw, "a.txt", limit)
+        assert from_disk == in_memory
+
+
+def test_binary_file_gets_a_placeholder(tmp_path):
+    path = tmp_path / "blob.bin"
+    path.write_bytes(b"\x00\x01" * 50)
+    for limit in (10, 1000):
+        record = load_file(path, limit)
+        assert record["binary"] and record["content"] == "[Binary or unreadable file: blob.bin]"
+        assert record["size"] == 100
@@ -0,0 +1,45 @@
+from rcpack.gitinfo import _git_records, get_file_commits, list_worktree_files
+
+
+def test_git_records_splits_on_nul(git_repo):
+    git_repo.write("a b.txt", "1")
+    git_repo.write("line\nbreak.txt", "2")
+    git_repo.write("sub/c.py", "3")
+    git_repo.commit()
+    records = list(_git_records(["ls-files", "-z"], git_repo.path))
+    assert records == [b"a b.txt", b"line\nbreak.txt", b"sub/c.py"]
+
+
+def test_git_records_stops_git_when_closed_early(git_repo):
+    for i in range(50):
+        git_repo.write(f"f{i:02}.txt", str(i))
+    git_repo.commit()
+    records = _git_records(["ls-files", "-z"], git_repo.path)
+    assert next(records) == b"f00.txt"
+    records.close()
+
+
+def test_list_worktree_files_includes_untracked_not_ignored(git_repo):
+    git_repo.write(".gitignore", "*.log\n")
+    git_repo.write("tracked.py", "x")
+    git_repo.commit()
+    git_repo.write("new.py", "y")
+    git_repo.write("debug.log", "z")
+    assert sorted(list_worktree_files(git_repo.path)) == [".gitignore", "new.py", "tracked.py"]
+
+
+def test_get_file_commits_reports_last_commit_per_file(git_repo):
+    git_repo.write("a.py", "1")
+    git_repo.write("b.py", "1")
+    git_repo.commit("first")
+    git_repo.write("a.py", "2")
+    git_repo.commit("second")
+    commits = get_file_commits(git_repo.path)
+    assert set(commits) == {"a.py", "b.py"}
+    assert commits["a.py"]["author"] == "Test <test@example.com>"
+    assert get_file_commits(git_repo.path, ["b.py"]).keys() == {"b.py"}
+    assert get_file_commits(git_repo.path, []) == {}
+
+
+def test_get_file_commits_outside_git(tmp_path):
+    assert get_file_commits(tmp_path) == {}
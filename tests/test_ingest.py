@@ -0,0 +1,92 @@
+import random
+import threading
+import time
+
+import pytest
+
+from rcpack.ingest import bounded_map, ordered_map
+
+
+def _jittery(x):
+    time.sleep(random.random() / 1000)
+    return x * 10
+
+
+class _Source:
+    """An iterable that counts how many items have been taken from it."""
+
+    def __init__(self, n):
+        self.n = n
+        self.taken = 0
+
+    def __iter__(self):
+        for i in range(self.n):
+            self.taken += 1
+            yield i
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_results_come_back_in_input_order(jobs):
+    assert list(ordered_map(_jittery, range(50), jobs=jobs)) == [x * 10 for x in range(50)]
+
+
+def test_at_most_max_in_flight_items_run_ahead():
+    source = _Source(40)
+    consumed = 0
+    for _ in ordered_map(_jittery, source, jobs=4, max_in_flight=3):
+        assert source.taken - consumed <= 3
+        consumed += 1
+    assert consumed == 40
+
+
+def test_closing_early_stops_taking_items():
+    source = _Source(1000)
+    results = ordered_map(_jittery, source, jobs=4, max_in_flight=5)
+    assert [next(results), next(results)] == [0, 10]
+    results.close()
+    assert source.taken <= 2 + 5
+
+
+def test_closing_early_waits_for_running_calls():
+    running = threading.Event()
+    release = threading.Event()
+    finished = []
+
+    def slow(x):
+        if x == 1:
+            running.set()
+            release.wait(5)
+        finished.append(x)
+        return x
+
+    results = ordered_map(slow, range(3), jobs=2, max_in_flight=2)
+    assert next(results) == 0
+    running.wait(5)
+    threading.Timer(0.05, release.set).start()
+    results.close()
+    assert 1 in finished
+
+
+def test_bounded_map_stops_before_the_total_is_exceeded():
+    source = _Source(1000)
+    out = list(bounded_map(lambda x: x, source, weigh=lambda r: 10, jobs=4,
+                           max_in_flight=4, max_total=35))
+    assert out == [0, 1, 2]
+    assert source.taken <= 4 + 4
+
+
+def test_bounded_map_without_a_total_is_ordered_map():
+    assert list(bounded_map(_jittery, range(20), weigh=len, jobs=3)) == [x * 10 for x in range(20)]
+
+
+def test_errors_propagate_in_order():
+    def boom(x):
+        if x == 3:
+            raise ValueError(x)
+        return x
+
+    out = []
+    with pytest.raises(ValueError):
+        for r in ordered_map(boom, range(10), jobs=4):
+            out.append(r)
+    assert out == [0, 1, 2]
@@ -0,0 +1,65 @@
+import codecs
+
+import pytest
+
+from rcpack.io_utils import classify_bytes, is_binary_file, read_classified
+
+
+@pytest.mark.parametrize("raw, content, encoding", [
+    (b"plain ascii\n", "plain ascii\n", "utf-8"),
+    ("ünïcödé\n".encode(), "ünïcödé\n", "utf-8"),
+    ("日本語のテキスト".encode(), "日本語のテキスト", "utf-8"),
+    (codecs.BOM_UTF8 + b"hi", "hi", "utf-8-sig"),
+    (codecs.BOM_UTF16_LE + "hi".encode("utf-16-le"), "hi", "utf-16"),
+    (codecs.BOM_UTF16_BE + "hi".encode("utf-16-be"), "hi", "utf-16"),
+    (codecs.BOM_UTF32_LE + "hi".encode("utf-32-le"), "hi", "utf-32"),
+    (b"caf\xe9 au lait\n", "caf\xe9 au lait\n", "latin-1"),
+    (b"", "", "utf-8"),
+])
+def test_classify_text(raw, content, encoding):
+    assert classify_bytes(raw) == (content, encoding)
+
+
+@pytest.mark.parametrize("raw", [
+    b"a\x00b",
+    bytes(range(1, 32)) * 4,
+    bytes(range(128, 256)),
+    # a BOM followed by bytes its codec cannot decode is not a promise of text
+    codecs.BOM_UTF16_LE + b"abc",
+    codecs.BOM_UTF8 + b"\xff\xfe\x00\x01",
+])
+def test_classify_binary(raw):
+    assert classify_bytes(raw) == (None, None)
+
+
+def test_truncated_utf8_tail_is_dropped():
+    raw = "ab€".encode()[:-1]
+    assert classify_bytes(raw, truncated=True) == ("ab", "utf-8")
+    # not truncated: the broken tail is real, so the text falls back to latin-1
+    assert classify_bytes(raw) == (raw.decode("latin-1"), "latin-1")
+
+
+def test_truncated_utf16_odd_length():
+    raw = codecs.BOM_UTF16_LE + "hi".encode("utf-16-le") + b"x"
+    content, encoding = classify_bytes(raw, truncated=True)
+    assert encoding == "utf-16" and content.startswith("hi")
+
+
+def test_odd_length_utf16_file_is_binary_not_an_error(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"\xff\xfeabc")
+    assert read_classified(path) == (None, None, False)
+    assert is_binary_file(path)
+
+
+def test_is_binary_file(tmp_path):
+    text = tmp_path / "t.txt"
+    text.write_text("hello\n" * 1000)
+    utf16 = tmp_path / "u.txt"
+    utf16.write_bytes("hello\n".encode("utf-16"))
+    blob = tmp_path / "b.bin"
+    blob.write_bytes(b"\x00\x01\x02" * 100)
+    assert not is_binary_file(text)
+    assert not is_binary_file(utf16)
+    assert is_binary_file(blob)
+    assert is_binary_file(tmp_path / "missing")
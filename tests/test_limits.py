@@ -0,0 +1,52 @@
+import pytest
+
+from rcpack.packager import DEFAULT_LIMITS, build_package, load_limits
+
+
+def _dotfile(tmp_path, text):
+    path = tmp_path / ".repo-contextor.toml"
+    path.write_text(text)
+    return str(path)
+
+
+def test_defaults_without_a_dotfile(tmp_path):
+    assert load_limits({}, dotfile=str(tmp_path / "missing.toml")) == DEFAULT_LIMITS
+
+
+def test_cli_overrides_toml_overrides_defaults(tmp_path):
+    dotfile = _dotfile(tmp_path, "max_file_bytes = 2048\njobs = 4\nunknown = 1\n")
+    limits = load_limits({"jobs": 8, "max_files": None}, dotfile=dotfile)
+    assert limits["jobs"] == 8
+    assert limits["max_file_bytes"] == 2048
+    assert limits["max_files"] is None
+    assert limits["max_in_flight"] == DEFAULT_LIMITS["max_in_flight"]
+    assert "unknown" not in limits
+
+
+@pytest.mark.parametrize("text", ["jobs = 0", "jobs = -1", "jobs = true", "max_files = 1.5",
+                                  'max_file_bytes = "1M"'])
+def test_bad_values_are_rejected(tmp_path, text):
+    with pytest.raises(ValueError):
+        load_limits({}, dotfile=_dotfile(tmp_path, text))
+
+
+def test_bad_cli_value_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        load_limits({"max_files": 0}, dotfile=str(tmp_path / "missing.toml"))
+
+
+def test_invalid_toml_raises_instead_of_exiting(tmp_path):
+    with pytest.raises(ValueError, match="TOML"):
+        load_limits({}, dotfile=_dotfile(tmp_path, "jobs = = 2"))
+
+
+def test_build_package_ignores_the_dotfile_in_the_working_directory(tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("x" * 500)
+    monkeypatch.chdir(tmp_path)
+    _dotfile(tmp_path, "max_file_bytes = = broken")
+    text, stats = build_package([str(repo)], None, None)
+    assert "x" * 500 in text
+    with pytest.raises(ValueError):
+        build_package([str(repo)], None, None, max_file_bytes=0)
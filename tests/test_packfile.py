@@ -0,0 +1,177 @@
+import io
+
+import pytest
+
+from rcpack import extract
+from rcpack.packfile import (
+    _ENTRY, _TRAILER, PackError, PackReader, convert_pack, is_pack, write_pack,
+)
+from rcpack.renderer.jsonyaml import write_json, write_jsonl
+from rcpack.renderer.markdown import write_markdown
+
+REPO_INFO = {"is_repo": True, "commit": "abc123", "branch": "main", "author": "A", "date": "today"}
+TREE = "├── b.py\n└── src/\n    └── a.py"
+FILES = [
+    {"path": "b.py", "content": "print('b')\n" * 20, "size": 220},
+    {"path": "src/a.py", "content": "# ünïcode\n" + "x = 1\n" * 50, "size": None},
+    {"path": "src/copy.py", "content": "print('b')\n" * 20, "size": 220},
+    {"path": "tiny.txt", "content": "hi", "size": 2},
+    {"path": "empty.txt", "content": "", "size": 0},
+]
+
+
+def _pack(tmp_path, compression="gzip", **kwargs):
+    path = tmp_path / "ctx.rcpack"
+    with open(path, "wb") as out:
+        write_pack(out, "/repo", REPO_INFO, TREE, iter(FILES), compression=compression, **kwargs)
+    return path
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "bz2", "xz"])
+def test_round_trip(tmp_path, compression):
+    with PackReader(_pack(tmp_path, compression)) as pack:
+        assert len(pack) == len(FILES)
+        assert list(pack.paths()) == sorted(f["path"] for f in FILES)
+        for f in FILES:
+            assert f["path"] in pack
+            assert pack.read(f["path"]) == f["content"]
+            assert pack.entry(f["path"]).size == f["size"]
+        assert pack.meta["repo_info"] == REPO_INFO
+        assert pack.meta["structure"] == TREE
+        assert pack.meta["summary"]["total_files"] == len(FILES)
+
+
+def test_compression(tmp_path):
+    with PackReader(_pack(tmp_path)) as pack:
+        entry = pack.entry("b.py")
+        assert entry.codec == "gzip" and entry.stored < entry.length
+        # too small to be worth compressing
+        assert pack.entry("tiny.txt").codec is None
+
+
+def test_identical_bodies_are_stored_once(tmp_path):
+    def size(files):
+        out = io.BytesIO()
+        write_pack(out, "/repo", {}, "", files, compression=None)
+        return len(out.getvalue())
+
+    body = "y = 2\n" * 1000
+    one = size([{"path": "a.py", "content": body}])
+    two = size([{"path": "a.py", "content": body}, {"path": "b.py", "content": body}])
+    assert two - one < 100
+
+
+def test_missing_path(tmp_path):
+    with PackReader(_pack(tmp_path)) as pack:
+        assert "nope.py" not in pack
+        with pytest.raises(KeyError):
+            pack.read("nope.py")
+        with pytest.raises(KeyError):
+            pack.entry("a.py")
+
+
+def test_not_a_pack(tmp_path):
+    bad = tmp_path / "bad.rcpack"
+    bad.write_bytes(b"RCPACK not really")
+    assert is_pack(bad)
+    with pytest.raises(PackError):
+        PackReader(bad)
+    empty = tmp_path / "empty.rcpack"
+    empty.write_bytes(b"")
+    assert not is_pack(empty)
+    with pytest.raises(ValueError):
+        PackReader(empty)
+
+
+def test_truncated_pack(tmp_path):
+    path = _pack(tmp_path)
+    data = path.read_bytes()
+    path.write_bytes(data[:40] + data[-50:])
+    with pytest.raises(ValueError):
+        PackReader(path)
+
+
+@pytest.mark.parametrize("fmt, writer", [
+    ("markdown", write_markdown), ("json", write_json), ("jsonl", write_jsonl),
+])
+def test_convert_matches_the_streaming_writer(tmp_path, fmt, writer):
+    changes = {"since": "HEAD~1", "files": [{"status": "M", "path": "b.py"}]}
+    recent = {"b.py": "2 hours ago"}
+    commits = {"b.py": {"author": "A", "date": "today"}}
+    path = _pack(tmp_path, recent_files=recent, file_commits=commits, changes=changes)
+    expected = io.StringIO()
+    writer(expected, "/repo", REPO_INFO, TREE, sorted(FILES, key=lambda f: f["path"]),
+           recent_files=recent, file_commits=commits, changes=changes)
+    converted = io.StringIO()
+    with PackReader(path) as pack:
+        convert_pack(pack, fmt, converted)
+    assert converted.getvalue() == expected.getvalue()
+
+
+def test_convert_rejects_yaml(tmp_path):
+    with PackReader(_pack(tmp_path)) as pack:
+        with pytest.raises(ValueError):
+            convert_pack(pack, "yaml", io.StringIO())
+
+
+def _corrupt_entry(path, name, **fields):
+    """Overwrite fields of the index record for `name` in the pack at `path`."""
+    data = bytearray(path.read_bytes())
+    with PackReader(path) as pack:
+        i = list(pack.paths()).index(name)
+    index_offset = _TRAILER.unpack_from(data, len(data) - _TRAILER.size)[2]
+    pos = index_offset + i * _ENTRY.size
+    keys = ("name_offset", "name_length", "codec", "offset", "stored", "length", "size")
+    record = dict(zip(keys, _ENTRY.unpack_from(data, pos)))
+    record.update(fields)
+    _ENTRY.pack_into(data, pos, *record.values())
+    path.write_bytes(bytes(data))
+
+
+@pytest.mark.parametrize("fields", [
+    {"offset": 10 ** 9}, {"stored": 10 ** 9}, {"offset": 0}, {"codec": 99},
+    {"name_length": 10 ** 6},
+])
+def test_corrupt_index_is_rejected_on_open(tmp_path, fields):
+    path = _pack(tmp_path)
+    _corrupt_entry(path, "b.py", **fields)
+    with pytest.raises(PackError):
+        PackReader(path)
+
+
+def test_corrupt_blob_raises_pack_error(tmp_path):
+    path = _pack(tmp_path)
+    # cut b.py's gzip blob short
+    _corrupt_entry(path, "b.py", stored=2)
+    with PackReader(path) as pack:
+        with pytest.raises(PackError):
+            pack.read("b.py")
+
+
+def test_wrong_length_raises_pack_error(tmp_path):
+    path = _pack(tmp_path)
+    _corrupt_entry(path, "tiny.txt", length=3)
+    with PackReader(path) as pack:
+        with pytest.raises(PackError):
+            pack.read("tiny.txt")
+
+
+def test_extract_lists_and_extracts(tmp_path, capsys):
+    path = _pack(tmp_path)
+    extract.main([str(path), "--list"])
+    listed = capsys.readouterr().out.splitlines()
+    assert [line.split()[-1] for line in listed] == sorted(f["path"] for f in FILES)
+    assert listed[-1].split()[:3] == ["2", "2", "stored"]
+    extract.main([str(path), "tiny.txt", "b.py"])
+    assert capsys.readouterr().out == "hi" + "print('b')\n" * 20
+
+
+def test_extract_reports_missing_paths_and_corruption(tmp_path, capsys):
+    path = _pack(tmp_path)
+    with pytest.raises(SystemExit):
+        extract.main([str(path), "nope.py"])
+    assert "not in" in capsys.readouterr().err
+    _corrupt_entry(path, "b.py", codec=99)
+    with pytest.raises(SystemExit):
+        extract.main([str(path), "b.py"])
+    assert "corrupt" in capsys.readouterr().err
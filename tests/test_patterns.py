@@ -0,0 +1,109 @@
+import fnmatch
+
+import pytest
+
+from rcpack.patterns import GlobSet, PathFilter
+
+GLOBS = ["*.py", "src/*", "*/test_*.py", "[ab]*.txt", "[!a]*.md", "?.cfg", "docs/*.rst", "*"]
+PATHS = [
+    "main.py", "src/main.py", "src/pkg/mod.py", "tests/test_cli.py", "a.txt", "b/c.txt",
+    "c.txt", "README.md", "a.md", "x.cfg", "xy.cfg", "docs/index.rst", "docs/api/ref.rst", "",
+]
+
+
+@pytest.mark.parametrize("pattern", GLOBS)
+def test_globs_agree_with_fnmatch(pattern):
+    globs = GlobSet.from_globs([pattern])
+    for path in PATHS:
+        expected = True if fnmatch.fnmatchcase(path, pattern) else None
+        assert globs.match(path) is expected, (pattern, path)
+
+
+def test_last_matching_glob_wins():
+    globs = GlobSet.from_globs(["*.py", "!tests/*", "tests/keep.py"])
+    assert globs.match("src/a.py") is True
+    assert globs.match("tests/a.py") is False
+    assert globs.match("tests/keep.py") is True
+    assert globs.match("README.md") is None
+
+
+def test_double_star_glob_keeps_fnmatch_semantics():
+    globs = GlobSet.from_globs(["src/**/*.py"])
+    assert globs.match("src/x/a.py")
+    assert globs.match("src/x/y/a.py")
+    assert globs.match("src/a.py") is None
+    assert globs.match("lib/x/a.py") is None
+
+
+@pytest.mark.parametrize(
+    "pattern, path",
+    [
+        ("**/*.md", "README.md"),
+        ("**/*.md", "docs/guide.md"),
+        ("src/**/*.py", "src/a.py"),
+        ("src/**", "src/a/b.py"),
+        ("*.py", "a/b.py"),
+    ],
+)
+def test_double_star_globs_agree_with_fnmatch(pattern, path):
+    expected = True if fnmatch.fnmatchcase(path, pattern) else None
+    assert GlobSet.from_globs([pattern]).match(path) is expected
+
+
+def test_gitignore_negation_reincludes():
+    ignores = GlobSet.from_gitignore(["*.log", "!keep.log"])
+    assert ignores.match("debug.log") is True
+    assert ignores.match("sub/debug.log") is True
+    assert ignores.match("keep.log") is False
+    assert ignores.match("sub/keep.log") is False
+
+
+def test_gitignore_anchoring():
+    ignores = GlobSet.from_gitignore(["/build", "doc/tmp", "cache"])
+    assert ignores.match("build", is_dir=True)
+    assert ignores.match("src/build", is_dir=True) is None
+    assert ignores.match("doc/tmp", is_dir=True)
+    assert ignores.match("src/doc/tmp", is_dir=True) is None
+    assert ignores.match("cache", is_dir=True)
+    assert ignores.match("src/cache", is_dir=True)
+
+
+def test_gitignore_star_stays_within_a_segment():
+    ignores = GlobSet.from_gitignore(["doc/*.txt"])
+    assert ignores.match("doc/a.txt")
+    assert ignores.match("doc/sub/a.txt") is None
+
+
+def test_gitignore_double_star():
+    ignores = GlobSet.from_gitignore(["**/logs", "a/**/b", "out/**"])
+    assert ignores.match("logs", is_dir=True)
+    assert ignores.match("x/y/logs", is_dir=True)
+    assert ignores.match("a/b")
+    assert ignores.match("a/x/y/b")
+    assert ignores.match("out/x/y.txt")
+    assert ignores.match("out") is None
+
+
+def test_gitignore_dir_only_rules_skip_files():
+    ignores = GlobSet.from_gitignore(["tmp/"])
+    assert ignores.match("tmp", is_dir=True)
+    assert ignores.match("tmp") is None
+
+
+def test_gitignore_comments_escapes_and_base():
+    ignores = GlobSet.from_gitignore(["# comment", "\\#notes", "\\!bang", "trail  "], base="sub")
+    assert ignores.match("sub/#notes")
+    assert ignores.match("sub/!bang")
+    assert ignores.match("sub/trail")
+    assert ignores.match("# comment") is None
+    assert ignores.match("#notes") is None
+
+
+def test_path_filter_prunes_excluded_directories():
+    flt = PathFilter(exclude_patterns=["node_modules/*"])
+    assert flt.skip_dir("node_modules")
+    assert flt.excluded("node_modules/x/index.js", check_parents=True)
+    # a negated exclude may re-include something below, so nothing is pruned
+    flt = PathFilter(exclude_patterns=["vendor/*", "!vendor/keep.py"])
+    assert not flt.skip_dir("vendor")
+    assert not flt.excluded("vendor/keep.py")
@@ -0,0 +1,53 @@
+import pytest
+
+from rcpack import renderer
+from rcpack.cli import _render_format
+from rcpack.packager import build_package
+from rcpack.renderer import call_renderer, get_binary_writer, get_renderer, get_writer, is_format
+
+
+def _legacy_render(root, repo_info, tree_text, files, total_files, total_lines,
+                   recent_files=None, file_sizes=None):
+    """A plugin written against the original renderer signature."""
+    return f"{total_files} files, {total_lines} lines"
+
+
+@pytest.fixture
+def legacy_format(monkeypatch):
+    monkeypatch.setitem(renderer._RENDERERS, "legacy", _legacy_render)
+    return "legacy"
+
+
+def test_cli_render_passes_only_the_original_keywords_by_default(legacy_format):
+    text = _render_format(legacy_format, "/repo", {}, "tree", {"a.py": "x\ny\n"}, {"a.py": 4}, {})
+    assert text == "1 files, 2 lines"
+
+
+def test_build_package_works_with_a_legacy_renderer(tmp_path, legacy_format):
+    (tmp_path / "a.py").write_text("x\n")
+    (tmp_path / "b.py").write_text("x\n")
+    text, stats = build_package([str(tmp_path)], None, None, fmt=legacy_format)
+    assert text == "2 files, 2 lines"
+    assert stats["files"] == 2
+
+
+def test_call_renderer_drops_unset_and_unknown_extras():
+    def plugin(*args, recent_files=None, changes=None):
+        return {"recent_files": recent_files, "changes": changes}
+
+    def flexible(*args, **extras):
+        return extras
+
+    assert call_renderer(plugin, 1, recent_files={}, changes=None, bytes_saved=0) == {
+        "recent_files": {}, "changes": None,
+    }
+    assert call_renderer(flexible, bytes_saved=0, patch=None) == {"bytes_saved": 0}
+
+
+def test_registry_lookups():
+    assert get_renderer("text") is get_renderer("markdown")
+    assert get_writer("jsonl") is not None and get_writer("yaml") is None
+    assert get_binary_writer("rcpack") is not None and get_binary_writer("json") is None
+    assert is_format("yaml") and is_format("rcpack") and not is_format("no-such-format")
+    with pytest.raises(ValueError):
+        get_renderer("no-such-format")
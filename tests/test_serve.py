@@ -0,0 +1,216 @@
+import http.client
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from rcpack.packager import DEFAULT_LIMITS
+from rcpack.serve import Package, PackageService, _etag_matches, _Handler, parse_query
+
+
+class _CountingService(PackageService):
+    """Builds a tiny package per options, counting builds; state never changes."""
+
+    def __init__(self, max_entries=32):
+        super().__init__(None, DEFAULT_LIMITS, max_entries)
+        self.builds = []
+
+    def state(self, options):
+        return "state"
+
+    def build(self, options):
+        self.builds.append(options["format"])
+        body = options["format"].encode()
+        return Package(body, '"%s"' % options["format"], "text/plain", {"files": 0})
+
+
+def test_repeated_request_is_a_hit():
+    service = _CountingService()
+    options = parse_query("format=json")
+    assert service.get(options)[1] == "miss"
+    package, how = service.get(options)
+    assert how == "hit"
+    assert package.body == b"json"
+    assert service.builds == ["json"]
+
+
+def test_least_recently_used_package_is_evicted():
+    service = _CountingService(max_entries=2)
+    json, yaml, markdown = (parse_query(f"format={fmt}") for fmt in ("json", "yaml", "markdown"))
+    service.get(json)
+    service.get(yaml)
+    service.get(json)  # yaml is now the least recently used
+    service.get(markdown)
+    assert service.get(json)[1] == "hit"
+    assert service.get(yaml)[1] == "miss"
+    assert service.builds == ["json", "yaml", "markdown", "yaml"]
+
+
+def test_identical_requests_share_one_build():
+    started = threading.Event()
+    release = threading.Event()
+
+    class Slow(_CountingService):
+        def build(self, options):
+            started.set()
+            release.wait(5)
+            return super().build(options)
+
+    service = Slow()
+    options = parse_query("format=json")
+    results = []
+    first = threading.Thread(target=lambda: results.append(service.get(options)))
+    first.start()
+    started.wait(5)
+    waiting = _watch_waiters(service)
+    second = threading.Thread(target=lambda: results.append(service.get(options)))
+    second.start()
+    assert waiting.wait(5)
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert sorted(how for _, how in results) == ["coalesced", "miss"]
+    assert results[0][0] is results[1][0]
+    assert service.builds == ["json"]
+
+
+def _watch_waiters(service):
+    """Return an event set once a request starts waiting for the running build."""
+    waiting = threading.Event()
+    (build,) = service._building.values()
+    wait = build.done.wait
+
+    def watched(*args):
+        waiting.set()
+        return wait(*args)
+
+    build.done.wait = watched
+    return waiting
+
+
+def test_build_error_reaches_coalesced_requests_and_is_not_cached():
+    started = threading.Event()
+    release = threading.Event()
+
+    class Failing(_CountingService):
+        def build(self, options):
+            self.builds.append(options["format"])
+            started.set()
+            release.wait(5)
+            raise RuntimeError("boom")
+
+    service = Failing()
+    options = parse_query("format=json")
+    errors = []
+
+    def request():
+        try:
+            service.get(options)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=request) for _ in range(2)]
+    threads[0].start()
+    started.wait(5)
+    waiting = _watch_waiters(service)
+    threads[1].start()
+    assert waiting.wait(5)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert len(errors) == 2
+    assert service.builds == ["json"]
+    assert not service._packages and not service._building
+
+
+def test_changed_files_are_rebuilt(tmp_path):
+    (tmp_path / "a.py").write_text("one\n")
+    service = PackageService(tmp_path, DEFAULT_LIMITS, use_cache=False)
+    options = parse_query("format=json")
+    first, _ = service.get(options)
+    assert service.get(options)[1] == "hit"
+    (tmp_path / "a.py").write_text("one\ntwo\n")
+    second, how = service.get(options)
+    assert how == "miss"
+    assert second.etag != first.etag
+
+
+def test_new_commit_is_rebuilt(git_repo):
+    git_repo.write("a.py", "one\n")
+    git_repo.commit("first")
+    service = PackageService(git_repo.path, DEFAULT_LIMITS, use_cache=False)
+    options = parse_query("format=markdown")
+    service.get(options)
+    assert service.get(options)[1] == "hit"
+    git_repo.write("b.py", "two\n")
+    assert service.get(options)[1] == "miss"
+    git_repo.commit("second")
+    assert service.get(options)[1] == "miss"
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.service = _CountingService()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _get(httpd, path, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", httpd.server_port, timeout=5)
+    try:
+        conn.request("GET", path, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+def test_etag_round_trip_gives_304(server):
+    status, headers, body = _get(server, "/package?format=json")
+    assert (status, body) == (200, b"json")
+    assert headers["X-Rcpack-Cache"] == "miss"
+    etag = headers["ETag"]
+
+    status, headers, body = _get(server, "/package?format=json", {"If-None-Match": etag})
+    assert (status, body) == (304, b"")
+    assert headers["X-Rcpack-Cache"] == "hit"
+
+    status, _, _ = _get(server, "/package?format=json", {"If-None-Match": '"other"'})
+    assert status == 200
+
+
+def test_bad_requests(server):
+    status, _, body = _get(server, "/package?colour=red")
+    assert status == 400 and b"unknown parameter: colour" in body
+    assert _get(server, "/elsewhere")[0] == 404
+
+
+@pytest.mark.parametrize("header, matches", [
+    (None, False),
+    ('"a"', True),
+    ('W/"a"', True),
+    ('"b", "a"', True),
+    ("*", True),
+    ('"b"', False),
+])
+def test_etag_matching(header, matches):
+    assert _etag_matches(header, '"a"') is matches
+
+
+def test_parse_query():
+    options = parse_query("format=text&include=src/**,*.md&include=x.py&since=2d&max_files=3")
+    assert options["format"] == "markdown"
+    assert options["include"] == ("src/**", "*.md", "x.py")
+    assert options["recent"] is not None
+    assert options["max_files"] == 3
+    assert options["file_commits"] is False
+
+
+@pytest.mark.parametrize("query", ["format=nope", "max_tokens=0", "max_files=x", "since=soon"])
+def test_parse_query_rejects_bad_values(query):
+    with pytest.raises(ValueError):
+        parse_query(query)
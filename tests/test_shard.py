@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from rcpack.shard import (
+    manifest_name, parse_shard_size, plan_shards, shard_names, write_manifest, write_shards,
+)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("500000", (500000, "bytes")),
+    ("2M", (2 * 1024 ** 2, "bytes")),
+    ("1.5MB", (int(1.5 * 1024 ** 2), "bytes")),
+    ("64k", (64 * 1024, "bytes")),
+    ("1g", (1024 ** 3, "bytes")),
+    ("150kt", (150000, "tokens")),
+    ("200k tokens", (200000, "tokens")),
+    ("5000 tok", (5000, "tokens")),
+    (" 3 M ", (3 * 1024 ** 2, "bytes")),
+])
+def test_parse_shard_size(text, expected):
+    assert parse_shard_size(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "0", "0.0001k", "-5", "2X", "1.5.2M", "M", "10 words"])
+def test_parse_shard_size_rejects(text):
+    with pytest.raises(ValueError):
+        parse_shard_size(text)
+
+
+def test_plan_shards_fills_up_to_the_limit_exactly():
+    # header 10: 10 + 30 + 60 == 100 fits, the next item starts a new shard
+    assert plan_shards([30, 60, 1], 100, 10) == [[0, 1], [2]]
+    assert plan_shards([30, 61], 100, 10) == [[0], [1]]
+
+
+def test_plan_shards_gives_an_oversized_item_its_own_shard():
+    assert plan_shards([10, 500, 10], 100, 10) == [[0], [1], [2]]
+    assert plan_shards([500], 100, 10) == [[0]]
+
+
+def test_plan_shards_header_larger_than_the_limit():
+    assert plan_shards([1, 1], 5, 10) == [[0], [1]]
+
+
+def test_plan_shards_with_nothing_to_place():
+    assert plan_shards([], 100, 10) == [[]]
+
+
+def test_shard_and_manifest_names(tmp_path):
+    assert shard_names("out/ctx.md", 2) == ["out/ctx-001.md", "out/ctx-002.md"]
+    assert shard_names("ctx.md.gz", 1) == ["ctx-001.md.gz"]
+    assert shard_names("ctx.json", 1000)[-1] == "ctx-1000.json"
+    assert manifest_name("out/ctx.md.gz") == "out/ctx.manifest.json"
+
+
+def _render(shard):
+    return "".join(f"{path}={content}\n" for path, content in shard)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_write_shards_sends_each_shard_to_render(tmp_path, workers):
+    shards = [[("a", "1"), ("b", "2")], [("c", "3")], []]
+    names = [str(tmp_path / f"ctx-{i}.md") for i in range(len(shards))]
+    sizes = write_shards(_render, shards, names, workers=workers)
+    texts = [open(name, encoding="utf-8").read() for name in names]
+    assert texts == ["a=1\nb=2\n", "c=3\n", ""]
+    assert sizes == [len(t) for t in texts]
+
+
+def test_write_manifest(tmp_path):
+    path = tmp_path / "ctx.manifest.json"
+    write_manifest(str(path), "/repo", 100, "bytes", ["d/ctx-001.md"], [["a.py"]], [42])
+    assert json.loads(path.read_text()) == {
+        "root": "/repo", "shard_size": 100, "unit": "bytes",
+        "shards": [{"file": "ctx-001.md", "paths": ["a.py"], "chars": 42}],
+    }
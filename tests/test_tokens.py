@@ -0,0 +1,90 @@
+import pytest
+
+from rcpack import tokens
+from rcpack.tokens import (
+    BUDGET_NOTE, FILE_OVERHEAD_TOKENS, MIN_PARTIAL_TOKENS, get_estimator, pack_to_budget,
+    register_estimator,
+)
+
+OVERHEAD = FILE_OVERHEAD_TOKENS
+
+
+def chars(text):
+    """One token per character keeps the arithmetic exact."""
+    return len(text)
+
+
+def _paths(sections):
+    return [s["path"] for s in sections]
+
+
+def _pack(sections, budget, **kwargs):
+    return pack_to_budget(sections, budget, chars, **kwargs)
+
+
+def test_readme_and_config_then_recent_then_the_rest():
+    sections = [
+        {"path": "src/main.py", "content": "x" * 100},
+        {"path": "src/recent.py", "content": "x" * 100},
+        {"path": "README.md", "content": "x" * 100},
+        {"path": "settings.toml", "content": "x" * 100},
+    ]
+    selected, used, dropped = _pack(sections, 3 * (100 + OVERHEAD), recent={"src/recent.py"})
+    # chosen by priority, returned in the original order
+    assert _paths(selected) == ["src/recent.py", "README.md", "settings.toml"]
+    assert (used, dropped) == (3 * (100 + OVERHEAD), 1)
+
+
+def test_config_names_count_anywhere_but_config_extensions_only_at_the_top():
+    sections = [
+        {"path": "a/b.py", "content": "x" * 10},
+        {"path": "pkg/config.yaml", "content": "x" * 100},
+        {"path": "pkg/pyproject.toml", "content": "x" * 100},
+    ]
+    selected, _, _ = _pack(sections, 100 + OVERHEAD + 10 + OVERHEAD)
+    assert _paths(selected) == ["a/b.py", "pkg/pyproject.toml"]
+
+
+def test_smaller_files_first_within_a_group():
+    sections = [
+        {"path": "a.py", "content": "x" * 300},
+        {"path": "b.py", "content": "x" * 10},
+        {"path": "c.py", "content": "x" * 20},
+    ]
+    selected, _, dropped = _pack(sections, 10 + 20 + 2 * OVERHEAD + MIN_PARTIAL_TOKENS - 1)
+    assert _paths(selected) == ["b.py", "c.py"]
+    assert dropped == 1
+
+
+def test_file_that_does_not_fit_is_truncated():
+    sections = [{"path": "a.py", "content": "x" * 1000}]
+    selected, used, dropped = _pack(sections, 500)
+    (section,) = selected
+    assert section["is_truncated"]
+    assert section["content"].endswith(BUDGET_NOTE)
+    assert 0 < len(section["content"]) - len(BUDGET_NOTE) < 1000
+    assert used <= 500 and dropped == 0
+    # the input is left alone
+    assert sections[0]["content"] == "x" * 1000 and "is_truncated" not in sections[0]
+
+
+def test_too_little_room_drops_instead_of_truncating():
+    sections = [{"path": "a.py", "content": "x" * 1000}]
+    selected, used, dropped = _pack(sections, MIN_PARTIAL_TOKENS - 1)
+    assert (selected, used, dropped) == ([], 0, 1)
+
+
+def test_reserved_tokens_come_off_the_budget():
+    sections = [{"path": "a.py", "content": "x" * 100}]
+    assert _pack(sections, 100 + OVERHEAD)[2] == 0
+    selected, used, _ = _pack(sections, 100 + OVERHEAD, reserved=100 + OVERHEAD - 1)
+    assert selected == [] and used == 100 + OVERHEAD - 1
+
+
+def test_estimators(monkeypatch):
+    monkeypatch.setattr(tokens, "_ESTIMATORS", dict(tokens._ESTIMATORS))
+    assert get_estimator()("abcdefgh") == 2
+    register_estimator("chars", lambda: chars)
+    assert get_estimator("chars")("abc") == 3
+    with pytest.raises(ValueError):
+        get_estimator("nope")
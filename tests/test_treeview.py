@@ -0,0 +1,86 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from rcpack.treeview import render_tree
+
+
+def _baseline_render_tree(paths):
+    """render_tree as it was before the linear rewrite, kept as the reference."""
+    tree_structure: dict = {}
+    for p in paths:
+        parts = Path(p).parts
+        current = tree_structure
+        for part in parts[:-1]:
+            if part not in current:
+                current[part] = {}
+            current = current[part]
+        if parts:
+            current[parts[-1]] = None
+
+    def _render(structure: dict, prefix: str = "") -> str:
+        lines = []
+        items = sorted(structure.items(), key=lambda x: (x[1] is None, x[0]))
+        for i, (name, subtree) in enumerate(items):
+            is_last = i == len(items) - 1
+            lines.append(f"{prefix}{'└── ' if is_last else '├── '}{name}")
+            if subtree is not None:
+                extension = ("    " if is_last else "│   ")
+                lines.append(_render(subtree, prefix + extension))
+        return "\n".join(filter(None, lines))
+
+    if not tree_structure:
+        return "No files found"
+    return _render(tree_structure)
+
+
+def _random_paths(seed, count):
+    rng = random.Random(seed)
+    names = ["a", "b", "a-b", "a.b", "B", "_x", "z9", "é", "src", "tests", "a b"]
+    paths = set()
+    for _ in range(count):
+        dirs = [rng.choice(names) for _ in range(rng.randint(0, 4))]
+        paths.add("/".join(["d" + d for d in dirs] + [rng.choice(names) + rng.choice(["", ".py"])]))
+    return list(paths)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_the_baseline_renderer(seed):
+    paths = _random_paths(seed, 200)
+    assert render_tree(paths) == _baseline_render_tree(paths)
+
+
+@pytest.mark.parametrize("paths", [
+    [], ["only.py"], ["a/b/c/d.py"], ["x.py", "x.py"], ["b.py", "a/z.py", "a.py"],
+    ["./a.py", "b//c.py", "d/e/"],
+])
+def test_edge_cases_match_the_baseline(paths):
+    assert render_tree(paths) == _baseline_render_tree(paths)
+
+
+def test_max_depth_summarizes_deeper_directories():
+    tree = render_tree(["a/b/c.py", "a/b/d.py", "a/e.py", "f.py"], max_depth=2)
+    assert tree == "\n".join([
+        "├── a",
+        "│   ├── b",
+        "│   │   └── … 2 files",
+        "│   └── e.py",
+        "└── f.py",
+    ])
+
+
+def test_max_entries_collapses_the_rest():
+    tree = render_tree([f"d/f{i}.py" for i in range(5)] + ["g.py"], max_entries=2)
+    assert tree == "\n".join([
+        "├── d",
+        "│   ├── f0.py",
+        "│   ├── f1.py",
+        "│   └── … 3 more files",
+        "└── g.py",
+    ])
+
+
+def test_summaries_include_sizes():
+    tree = render_tree(["d/a.py", "d/b.py"], max_depth=1, sizes={"d/a.py": 1024, "d/b.py": 1024})
+    assert tree.splitlines()[-1].endswith("… 2 files (2.0 KB)")
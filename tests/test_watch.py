@@ -0,0 +1,80 @@
+import threading
+import time
+
+from rcpack import watch as watch_mod
+from rcpack.discover import discover_files
+from rcpack.watch import LiveIndex, watch
+
+
+def _index(root):
+    return LiveIndex(root, lambda inputs: discover_files(inputs, root, [], []),
+                     lambda f: f.read_text())
+
+
+def _files(index, root):
+    return [f.relative_to(root).as_posix() for f in index.files]
+
+
+def test_refresh_picks_up_edits_additions_and_removals(tmp_path):
+    root = tmp_path.resolve()
+    (root / "a.py").write_text("1")
+    (root / "sub").mkdir()
+    (root / "sub" / "b.py").write_text("2")
+    index = _index(root)
+    assert _files(index, root) == ["a.py", "sub/b.py"]
+    assert not index.refresh()
+
+    (root / "a.py").write_text("changed")
+    (root / "sub" / "c.py").write_text("3")
+    (root / "sub" / "b.py").unlink()
+    assert index.refresh(rescan=True)
+    assert _files(index, root) == ["a.py", "sub/c.py"]
+    assert index.entries[root / "a.py"] == "changed"
+
+
+def test_refresh_ignores_a_vanished_temp_file(tmp_path, monkeypatch):
+    root = tmp_path.resolve()
+    (root / "a.py").write_text("1")
+    index = _index(root)
+    stats = []
+    stat_key = watch_mod._stat_key
+    monkeypatch.setattr(watch_mod, "_stat_key", lambda p: (stats.append(p), stat_key(p))[1])
+    assert not index.refresh([root / ".ctx.md.123.rcpack-tmp"])
+    assert stats == []
+
+
+class _Stop(Exception):
+    pass
+
+
+class _NoInotifyLibc:
+    """A libc as ctypes sees it on macOS: loadable, without inotify symbols."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+def test_watch_falls_back_to_polling_without_inotify(tmp_path, monkeypatch):
+    monkeypatch.setattr(watch_mod.ctypes, "CDLL", _NoInotifyLibc)
+    root = tmp_path.resolve()
+    (root / "a.py").write_text("1")
+    index = _index(root)
+    updated = threading.Event()
+
+    def on_update():
+        updated.set()
+        raise _Stop  # ends the watch loop
+
+    def run():
+        try:
+            watch(index, on_update, interval=0.01)
+        except _Stop:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    time.sleep(0.05)
+    (root / "a.py").write_text("a longer body")
+    assert updated.wait(5)
+    thread.join(5)
+    assert index.entries[root / "a.py"] == "a longer body"